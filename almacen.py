@@ -0,0 +1,202 @@
+# almacen.py
+# ────────────────────────────────────────────────────────────────
+"""
+Registro persistente de promociones ya vistas (un único fichero SQLite)
+
+Clave primaria (fuente, url): cada búsqueda es una consulta por índice,
+independiente del tamaño del histórico. Guarda precio, dormitorios,
+estado ("Nuevo proyecto", "Próximamente", "Últimas unidades" o None si
+está en venta) y las fechas de primera y última vez vista.
+
+registrar() devuelve qué ha cambiado respecto a la última ejecución, lo
+que permite el modo delta: enviar sólo novedades, cambios de precio y
+cambios de estado.
+
+Histórico de precios: cada vez que una promoción aparece o cambia su
+precio, dormitorios o estado se añade una fila (fuente, url, momento,
+precio, dormitorios, estado) a 'historico'. Sólo se escribe lo que
+cambia, así que años de ejecuciones diarias ocupan poco, y los índices
+cubren las dos consultas habituales sin tocar la tabla:
+
+    python almacen.py --cambios 30        # cambios de precio en 30 días
+    python almacen.py --minimos           # precio mínimo de cada promoción
+"""
+
+import argparse
+import os
+import sqlite3
+import time
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS promociones (
+    fuente       TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    nombre       TEXT,
+    precio       INTEGER,
+    dormitorios  INTEGER,
+    estado       TEXT,
+    primera_vez  REAL NOT NULL,
+    ultima_vez   REAL NOT NULL,
+    PRIMARY KEY (fuente, url)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS historico (
+    fuente       TEXT NOT NULL,
+    url          TEXT NOT NULL,
+    momento      INTEGER NOT NULL,
+    precio       INTEGER,
+    dormitorios  INTEGER,
+    estado       TEXT,
+    PRIMARY KEY (fuente, url, momento)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS historico_momento ON historico (momento, fuente, url, precio);
+CREATE INDEX IF NOT EXISTS historico_precio  ON historico (fuente, url, precio);
+"""
+
+# Promociones de antes de existir el histórico: su estado actual es el punto de partida
+_SEMBRAR_HISTORICO = """
+INSERT OR IGNORE INTO historico
+SELECT fuente, url, CAST(ultima_vez AS INTEGER), precio, dormitorios, estado
+FROM promociones
+WHERE NOT EXISTS (SELECT 1 FROM historico h WHERE h.fuente = promociones.fuente
+                                               AND h.url = promociones.url)
+"""
+
+# Cambios de precio con momento >= :desde: cada fila con precio frente a
+# la anterior con precio de la misma promoción (aunque sea más antigua);
+# el rango sale de historico_momento y cada anterior de la clave primaria
+_CAMBIOS_PRECIO = """
+SELECT * FROM (
+    SELECT h.fuente, h.url, p.nombre, h.momento,
+           (SELECT a.precio FROM historico a
+            WHERE a.fuente = h.fuente AND a.url = h.url AND a.momento < h.momento
+                  AND a.precio IS NOT NULL
+            ORDER BY a.momento DESC LIMIT 1) AS anterior,
+           h.precio
+    FROM historico h LEFT JOIN promociones p USING (fuente, url)
+    WHERE h.momento >= :desde AND h.precio IS NOT NULL
+)
+WHERE anterior IS NOT NULL AND anterior != precio
+ORDER BY momento DESC
+"""
+
+# Tipos de cambio devueltos por registrar()
+NUEVA  = "nueva"
+PRECIO = "precio"
+ESTADO = "estado"
+
+
+class AlmacenPromociones:
+    def __init__(self, ruta: str):
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        self._con = sqlite3.connect(ruta)
+        self._con.executescript(_ESQUEMA)
+        self._con.execute(_SEMBRAR_HISTORICO)
+        self._ahora = time.time()
+
+    def __enter__(self) -> "AlmacenPromociones":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.cerrar()
+
+    def registrar(self, fuente: str, url: str, nombre: str | None = None,
+                  precio: int | None = None, dormitorios: int | None = None,
+                  estado: str | None = None) -> tuple[str, object] | None:
+        """
+        Inserta o actualiza la promoción y devuelve el cambio detectado:
+          • (NUEVA, None)                 si no se había visto nunca
+          • (PRECIO, precio_anterior)     si cambió un precio ya conocido
+          • (ESTADO, estado_anterior)     si cambió el estado
+          • None                          si no hay cambios
+        Si algo cambia se añade además al histórico.
+        """
+        fila = self._con.execute(
+            "SELECT precio, dormitorios, estado FROM promociones WHERE fuente = ? AND url = ?",
+            (fuente, url),
+        ).fetchone()
+
+        if fila is None:
+            self._con.execute(
+                "INSERT INTO promociones VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (fuente, url, nombre, precio, dormitorios, estado, self._ahora, self._ahora),
+            )
+            self._historico(fuente, url, precio, dormitorios, estado)
+            return (NUEVA, None)
+
+        # Un precio o unos dormitorios que no se pudieron leer (None) no
+        # borran el último valor conocido; el estado None sí es un valor
+        precio_ant, dormitorios_ant, estado_ant = fila
+        self._con.execute(
+            "UPDATE promociones SET nombre = ?, precio = COALESCE(?, precio), "
+            "dormitorios = COALESCE(?, dormitorios), estado = ?, "
+            "ultima_vez = ? WHERE fuente = ? AND url = ?",
+            (nombre, precio, dormitorios, estado, self._ahora, fuente, url),
+        )
+        precio = precio if precio is not None else precio_ant
+        dormitorios = dormitorios if dormitorios is not None else dormitorios_ant
+        if fila != (precio, dormitorios, estado):
+            self._historico(fuente, url, precio, dormitorios, estado)
+        if estado != estado_ant:
+            return (ESTADO, estado_ant)
+        if precio_ant is not None and precio != precio_ant:
+            return (PRECIO, precio_ant)
+        return None
+
+    def _historico(self, fuente: str, url: str, precio: int | None,
+                   dormitorios: int | None, estado: str | None) -> None:
+        # INSERT OR REPLACE: dos cambios en el mismo segundo se quedan con el último
+        self._con.execute(
+            "INSERT OR REPLACE INTO historico VALUES (?, ?, ?, ?, ?, ?)",
+            (fuente, url, int(self._ahora), precio, dormitorios, estado),
+        )
+
+    # ── consultas sobre el histórico ────────────────────────────
+    def cambios_precio(self, dias: float) -> list[tuple]:
+        """
+        Cambios de precio de los últimos 'dias', del más reciente al más
+        antiguo: (fuente, url, nombre, momento, precio_anterior, precio).
+        """
+        return self._con.execute(
+            _CAMBIOS_PRECIO, {"desde": int(self._ahora - dias * 86_400)}
+        ).fetchall()
+
+    def precio_minimo(self, fuente: str, url: str) -> int | None:
+        """Precio más bajo que ha tenido nunca la promoción."""
+        return self._con.execute(
+            "SELECT MIN(precio) FROM historico WHERE fuente = ? AND url = ?", (fuente, url)
+        ).fetchone()[0]
+
+    def minimos(self) -> list[tuple]:
+        """(fuente, url, nombre, precio mínimo, precio actual) de cada promoción."""
+        return self._con.execute(
+            "SELECT h.fuente, h.url, p.nombre, MIN(h.precio), p.precio "
+            "FROM historico h JOIN promociones p USING (fuente, url) "
+            "WHERE h.precio IS NOT NULL GROUP BY h.fuente, h.url ORDER BY h.fuente, p.nombre"
+        ).fetchall()
+
+    def cerrar(self) -> None:
+        self._con.commit()
+        self._con.close()
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Consultas sobre el histórico de precios")
+    ap.add_argument("ruta", nargs="?", default=os.path.join(
+        os.getenv("SCRAPER_DIR_ESTADO", ".estado"), "promociones.sqlite"))
+    grupo = ap.add_mutually_exclusive_group(required=True)
+    grupo.add_argument("--cambios", type=float, metavar="DIAS",
+                       help="cambios de precio en los últimos DIAS días")
+    grupo.add_argument("--minimos", action="store_true",
+                       help="precio mínimo histórico de cada promoción")
+    args = ap.parse_args()
+
+    with AlmacenPromociones(args.ruta) as almacen:
+        if args.cambios is not None:
+            for fuente, url, nombre, momento, anterior, precio in almacen.cambios_precio(args.cambios):
+                print(f"{time.strftime('%Y-%m-%d', time.localtime(momento))}  {fuente:<12} "
+                      f"{anterior:>9,} → {precio:>9,}  {nombre or url}")
+        else:
+            for fuente, url, nombre, minimo, actual in almacen.minimos():
+                actual = f"{actual:,}" if actual is not None else "—"
+                print(f"{fuente:<12} mín. {minimo:>9,}  hoy {actual:>9}  {nombre or url}")
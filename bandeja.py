@@ -0,0 +1,229 @@
+# bandeja.py
+# ────────────────────────────────────────────────────────────────
+"""
+Bandeja de salida persistente de notificaciones (un único fichero SQLite)
+
+Los mensajes se encolan ya troceados (un trozo por fila) en cuanto se
+componen, y un hilo despachador los va enviando mientras sigue el
+scraping. Lo que no se pudo enviar (Telegram caído, token ausente, el
+proceso muere) se queda en disco y sale en la siguiente ejecución: un
+fallo de envío nunca obliga a volver a descargar las webs.
+
+• Orden por chat: cada destino recibe sus trozos en orden de llegada; si
+  el primero falla, los siguientes de ese chat esperan (los demás chats
+  siguen).
+• Reintentos con espera exponencial (REINTENTO_MINIMO … REINTENTO_MAXIMO)
+  entre pasadas del despachador; cada envío tiene además los reintentos
+  inmediatos de utils.enviar_trozo_telegram.
+• Rechazos definitivos (el envío devuelve None: chat inexistente, bot
+  expulsado…) no se reintentan: el trozo pasa a 'descartados' y el chat
+  sigue con el siguiente.
+• Idempotencia: cada mensaje tiene la clave de la notificación lógica
+  (pasada y perfil, p. ej.); encolar dos veces la misma clave no duplica
+  nada, y las claves enviadas se recuerdan RETENCION segundos. Dos
+  mensajes iguales de pasadas distintas son dos notificaciones.
+"""
+
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Callable
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS mensajes (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    clave       TEXT NOT NULL UNIQUE,
+    destino     TEXT NOT NULL,
+    texto       TEXT NOT NULL,
+    parse_mode  TEXT,
+    creado      REAL NOT NULL,
+    intentos    INTEGER NOT NULL DEFAULT 0,
+    siguiente   REAL NOT NULL,
+    enviado     REAL,
+    error       TEXT
+);
+CREATE INDEX IF NOT EXISTS mensajes_pendientes ON mensajes (destino, id) WHERE enviado IS NULL;
+
+CREATE TABLE IF NOT EXISTS descartados (
+    clave       TEXT NOT NULL,
+    destino     TEXT NOT NULL,
+    texto       TEXT NOT NULL,
+    parse_mode  TEXT,
+    creado      REAL NOT NULL,
+    descartado  REAL NOT NULL,
+    error       TEXT
+);
+"""
+
+REINTENTO_MINIMO = 30                  # segundos tras el primer fallo
+REINTENTO_MAXIMO = 3_600
+RETENCION        = 6 * 3_600           # claves enviadas que se recuerdan
+CADUCIDAD        = 7 * 86_400          # un trozo sin enviar tras una semana se descarta
+
+log = logging.getLogger(__name__)
+
+# destino, texto, parse_mode → True si se envió, False si hay que
+# reintentarlo, None si se rechazó para siempre
+Envio = Callable[[str, str, "str | None"], "bool | None"]
+
+
+class Bandeja:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._con: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+        self._hay_trabajo = threading.Event()
+        self._parar = threading.Event()
+        self._hilo: threading.Thread | None = None
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._con is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._con = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._con.executescript(_ESQUEMA)
+            ahora = time.time()
+            self._con.execute(
+                "DELETE FROM mensajes WHERE (enviado IS NOT NULL AND enviado < ?) "
+                "OR (enviado IS NULL AND creado < ?)",
+                (ahora - RETENCION, ahora - CADUCIDAD))
+            self._con.execute("DELETE FROM descartados WHERE descartado < ?", (ahora - CADUCIDAD,))
+            self._con.commit()
+        return self._con
+
+    # ── cola ────────────────────────────────────────────────────
+    def encolar(self, clave: str, destino: str, trozos: list[str],
+                parse_mode: str | None = "MarkdownV2") -> int:
+        """
+        Añade los 'trozos' del mensaje 'clave' para 'destino' (un chat_id o
+        "$VARIABLE" que se resuelve al enviar); cada trozo se guarda como
+        "clave:índice". Devuelve cuántos trozos nuevos se encolaron: 0 si
+        la clave ya estaba.
+        """
+        ahora = time.time()
+        with self._lock:
+            con = self._conexion()
+            cursor = con.executemany(
+                "INSERT OR IGNORE INTO mensajes (clave, destino, texto, parse_mode, creado, siguiente) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                [(f"{clave}:{i}", destino, t, parse_mode, ahora, ahora) for i, t in enumerate(trozos)])
+            con.commit()
+        self._hay_trabajo.set()
+        return cursor.rowcount
+
+    def pendientes(self) -> int:
+        with self._lock:
+            return self._conexion().execute(
+                "SELECT COUNT(*) FROM mensajes WHERE enviado IS NULL").fetchone()[0]
+
+    def despachar(self, enviar: Envio) -> tuple[int, int]:
+        """
+        Una pasada: envía en orden los trozos ya vencidos de cada destino
+        hasta el primero que falle (los rechazados se descartan y se sigue).
+        Devuelve (enviados, fallidos).
+        """
+        with self._lock:
+            destinos = [d for (d,) in self._conexion().execute(
+                "SELECT DISTINCT destino FROM mensajes WHERE enviado IS NULL")]
+        enviados = fallidos = 0
+        for destino in destinos:
+            while not self._parar.is_set():
+                with self._lock:
+                    fila = self._conexion().execute(
+                        "SELECT id, texto, parse_mode, intentos, siguiente FROM mensajes "
+                        "WHERE destino = ? AND enviado IS NULL ORDER BY id LIMIT 1",
+                        (destino,)).fetchone()
+                if fila is None or fila[4] > time.time():
+                    break
+                id_, texto, parse_mode, intentos, _ = fila
+                try:
+                    ok = enviar(destino, texto, parse_mode)
+                    error = None if ok else "no enviado" if ok is False else "rechazado"
+                except Exception as exc:        # el despachador no debe morir
+                    ok, error = False, repr(exc)
+                with self._lock:
+                    con = self._conexion()
+                    if ok:
+                        con.execute("UPDATE mensajes SET enviado = ?, error = NULL WHERE id = ?",
+                                    (time.time(), id_))
+                    elif ok is None:
+                        con.execute(
+                            "INSERT INTO descartados SELECT clave, destino, texto, parse_mode, "
+                            "creado, ?, ? FROM mensajes WHERE id = ?", (time.time(), error, id_))
+                        con.execute("DELETE FROM mensajes WHERE id = ?", (id_,))
+                    else:
+                        espera = min(REINTENTO_MAXIMO, REINTENTO_MINIMO * 2 ** intentos)
+                        con.execute(
+                            "UPDATE mensajes SET intentos = intentos + 1, siguiente = ?, error = ? "
+                            "WHERE id = ?", (time.time() + espera, error, id_))
+                    con.commit()
+                if ok is None:
+                    fallidos += 1
+                    continue                    # reintentarlo no sirve: no bloquea el chat
+                if not ok:
+                    fallidos += 1
+                    break                       # el resto de este chat espera su turno
+                enviados += 1
+        return enviados, fallidos
+
+    def _proximo(self) -> float | None:
+        with self._lock:
+            return self._conexion().execute(
+                "SELECT MIN(siguiente) FROM mensajes WHERE enviado IS NULL").fetchone()[0]
+
+    # ── despachador en segundo plano ────────────────────────────
+    def iniciar(self, enviar: Envio) -> None:
+        """Arranca el hilo que despacha lo pendiente, empezando por lo de ejecuciones anteriores."""
+        if self._hilo is not None:
+            return
+        # lo de ejecuciones anteriores se intenta ya (quizá ahora hay token o red)
+        with self._lock:
+            con = self._conexion()
+            con.execute("UPDATE mensajes SET siguiente = MIN(siguiente, ?) WHERE enviado IS NULL",
+                        (time.time(),))
+            con.commit()
+        self._parar.clear()
+        self._hay_trabajo.set()
+
+        def _bucle() -> None:
+            while not self._parar.is_set():
+                self._hay_trabajo.clear()
+                enviados, fallidos = self.despachar(enviar)
+                if enviados or fallidos:
+                    log.debug("Bandeja → %d trozos enviados, %d fallidos", enviados, fallidos)
+                proximo = self._proximo()
+                espera = 60.0 if proximo is None else max(0.5, proximo - time.time())
+                self._hay_trabajo.wait(min(espera, 60.0))
+
+        self._hilo = threading.Thread(target=_bucle, name="bandeja", daemon=True)
+        self._hilo.start()
+
+    def cerrar(self, plazo: float) -> int:
+        """
+        Espera hasta 'plazo' segundos a que se vacíe lo que ya se puede
+        enviar, para el despachador y devuelve cuántos trozos quedan en
+        disco para la siguiente ejecución.
+        """
+        limite = time.monotonic() + plazo
+        while self._hilo is not None and time.monotonic() < limite:
+            proximo = self._proximo()
+            if proximo is None or proximo > time.time() + 1:
+                break                           # vacía, o sólo quedan reintentos a futuro
+            time.sleep(0.2)
+        self._parar.set()
+        self._hay_trabajo.set()
+        vivo = False
+        if self._hilo is not None:
+            self._hilo.join(max(0.0, limite - time.monotonic()) + 1)
+            vivo, self._hilo = self._hilo.is_alive(), None
+        quedan = self.pendientes()
+        if quedan:
+            print(f"⚠️  Bandeja: {quedan} trozos sin enviar, se reintentarán en la próxima ejecución",
+                  file=sys.stderr, flush=True)
+        with self._lock:
+            if self._con is not None and not vivo:    # un envío en curso aún la usará
+                self._con.close()
+                self._con = None
+        return quedan
@@ -0,0 +1,416 @@
+#!/usr/bin/env python3
+"""
+Benchmark offline de los scrapers
+
+Sirve las páginas grabadas en bench/fixtures desde un servidor HTTP local
+(o directamente desde memoria) y mide, por fuente:
+
+  • red      → descarga + parseo + extracción a través del servidor local
+  • parseo   → parseo + extracción sin red (respuestas desde memoria)
+  • filtro   → utils.cumple_filtros sobre lo extraído
+  • por tarjeta, nº de tarjetas/filtradas y pico de memoria (tracemalloc)
+
+Uso (desde la raíz del repositorio):
+
+    python -m bench.run_bench                     # todas las fuentes
+    python -m bench.run_bench --rapido            # SCRAPER_PARSEO_RAPIDO
+    python -m bench.run_bench --escala 10         # 10× tarjetas por listado
+    python -m bench.run_bench --paridad           # parseo normal vs rápido
+    python -m bench.run_bench --procesos 4        # parseo en un pool de 4 procesos
+    python -m bench.run_bench --paridad --procesos 4   # … y también en el pool
+    python -m bench.run_bench --comparar bench/resultados/otro.json
+    python -m bench.run_bench --grabar            # regraba las fixtures (red real)
+
+Las fixtures incluidas reproducen el marcado de cada web a mano; con
+--grabar se sustituyen por capturas reales.
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit, urlunsplit
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+import requests                                     # noqa: E402
+from bs4 import BeautifulSoup                        # noqa: E402
+from requests.adapters import HTTPAdapter            # noqa: E402
+from requests.structures import CaseInsensitiveDict  # noqa: E402
+
+import scrapers                                      # noqa: E402
+import utils                                         # noqa: E402
+
+DIR_FIXTURES   = os.path.join(RAIZ, "bench", "fixtures")
+DIR_RESULTADOS = os.path.join(RAIZ, "bench", "resultados")
+
+# Selector de las tarjetas que se duplican con --escala; en FICSA son los
+# enlaces del listado (cada copia apunta a la misma ficha con ?copia=N)
+TARJETAS = {
+    "aedas":       "a.card-promo.card",
+    "viacelere":   "div.card-promocion",
+    "metrovacesa": "div.card[data-provincia]",
+    "atica":       "div.item-vivienda",
+    "urbania":     "div.vivienda div.row",
+    "albaluz":     "div.promo-item",
+    "lobe":        "label.container-check",
+    "ficsa":       "a[href*='/promociones/']",
+}
+
+
+# ────────────────────────────────────────────────────────────────
+# Fixtures
+# ────────────────────────────────────────────────────────────────
+def _sin_copia(url: str) -> str:
+    partes = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k != "copia"]
+    return urlunsplit(partes._replace(query=urlencode(query)))
+
+
+def _con_copia(url: str, n: int) -> str:
+    sep = "&" if urlsplit(url).query else "?"
+    return f"{url}{sep}copia={n}"
+
+
+def _escalar(html: str, selector: str, factor: int, fuente: str) -> str:
+    """Duplica cada tarjeta 'factor' veces, justo detrás de la original."""
+    soup = BeautifulSoup(html, "html.parser")
+    for card in soup.select(selector):
+        if fuente == "ficsa" and card["href"].rstrip("/").endswith("/promociones"):
+            continue
+        ultimo = card
+        for n in range(1, factor):
+            dup = copy.copy(card)
+            if dup.has_attr("href") and fuente == "ficsa":
+                dup["href"] = _con_copia(dup["href"], n)
+            ultimo.insert_after(dup)
+            ultimo = dup
+    return str(soup)
+
+
+class Fixtures:
+    """Mapa url → (fuente, cuerpo) a partir de fixtures/indice.json."""
+
+    def __init__(self, escala: int = 1):
+        with open(os.path.join(DIR_FIXTURES, "indice.json"), encoding="utf-8") as f:
+            indice = json.load(f)
+        self.paginas: dict[str, tuple[str, bytes]] = {}
+        for url, ruta in indice.items():
+            fuente = ruta.split("/", 1)[0]
+            with open(os.path.join(DIR_FIXTURES, ruta), encoding="utf-8") as f:
+                html = f.read()
+            # Sólo se escalan los listados: las fichas de FICSA no tienen tarjetas
+            if escala > 1 and not (fuente == "ficsa" and not ruta.endswith("listado.html")):
+                html = _escalar(html, TARJETAS[fuente], escala, fuente)
+            self.paginas[url] = (fuente, html.encode("utf-8"))
+
+    def cuerpo(self, url: str) -> bytes | None:
+        pagina = self.paginas.get(url) or self.paginas.get(_sin_copia(url))
+        return pagina[1] if pagina else None
+
+
+# ────────────────────────────────────────────────────────────────
+# Servidor local y adaptador que redirige las peticiones
+# ────────────────────────────────────────────────────────────────
+def arrancar_servidor(fixtures: Fixtures) -> ThreadingHTTPServer:
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            cuerpo = fixtures.cuerpo(unquote(self.path[1:]))
+            if cuerpo is None:
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+class AdaptadorFixtures(HTTPAdapter):
+    """
+    Redirige cada petición al servidor local ('base') o, si base es None,
+    responde directamente desde memoria sin tocar la red.
+    """
+
+    def __init__(self, fixtures: Fixtures, base: str | None):
+        super().__init__()
+        self.fixtures = fixtures
+        self.base = base
+
+    def send(self, request, **kwargs):
+        if self.base:
+            original = request.url
+            request.url = f"{self.base}/{quote(original, safe='')}"
+            r = super().send(request, **kwargs)
+            r.url = original
+            return r
+
+        cuerpo = self.fixtures.cuerpo(request.url)
+        r = requests.Response()
+        r.status_code = 200 if cuerpo is not None else 404
+        r.reason = "OK" if cuerpo is not None else "Not Found"
+        r.headers = CaseInsensitiveDict({"Content-Type": "text/html; charset=utf-8"})
+        r._content = cuerpo or b""
+        r.encoding = "utf-8"
+        r.url = request.url
+        r.request = request
+        return r
+
+
+def _preparar_sesiones(adaptador: HTTPAdapter) -> None:
+    """Monta 'adaptador' en la sesión compartida y en la de cloudscraper (Ática)."""
+    for prefijo in ("https://", "http://"):
+        utils.SESION.mount(prefijo, adaptador)
+
+    def _crear(**_):
+        sesion = requests.Session()
+        for prefijo in ("https://", "http://"):
+            sesion.mount(prefijo, adaptador)
+        return sesion
+
+    scrapers.atica.cloudscraper = SimpleNamespace(create_scraper=_crear)
+
+
+# ────────────────────────────────────────────────────────────────
+# Medición
+# ────────────────────────────────────────────────────────────────
+def _scrape_silencioso(modulo) -> list:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return modulo.scrape()
+
+
+def _medir(fuente: str, adaptador_red: HTTPAdapter, adaptador_mem: HTTPAdapter,
+           repeticiones: int) -> dict:
+    modulo = getattr(scrapers, fuente)
+    red, parseo, filtro = [], [], []
+    promos: list = []
+
+    for _ in range(repeticiones):
+        _preparar_sesiones(adaptador_red)
+        t0 = time.perf_counter()
+        _scrape_silencioso(modulo)
+        red.append(time.perf_counter() - t0)
+
+        _preparar_sesiones(adaptador_mem)
+        t0 = time.perf_counter()
+        promos = _scrape_silencioso(modulo)
+        parseo.append(time.perf_counter() - t0)
+
+        t0 = time.perf_counter()
+        filtradas = [p for p in promos if utils.cumple_filtros(p, modulo.OBLIGATORIOS)]
+        filtro.append(time.perf_counter() - t0)
+
+    # Pico de memoria en una pasada aparte: tracemalloc ralentiza el parseo
+    _preparar_sesiones(adaptador_mem)
+    tracemalloc.start()
+    _scrape_silencioso(modulo)
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    t_parseo = statistics.median(parseo)
+    return {
+        "tarjetas":           len(promos),
+        "filtradas":          len(filtradas),
+        "red_s":              statistics.median(red),
+        "parseo_s":           t_parseo,
+        "filtro_s":           statistics.median(filtro),
+        "por_tarjeta_us":     t_parseo / len(promos) * 1e6 if promos else None,
+        "memoria_pico_bytes": pico,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def ejecutar(fuentes: list[str], escala: int, repeticiones: int) -> dict:
+    fixtures = Fixtures(escala)
+    utils.LIMITAR_TASA = False          # el servidor local no necesita cortesía
+    servidor = arrancar_servidor(fixtures)
+    base = f"http://127.0.0.1:{servidor.server_port}"
+    adaptador_red = AdaptadorFixtures(fixtures, base)
+    adaptador_mem = AdaptadorFixtures(fixtures, None)
+    try:
+        resultados = {f: _medir(f, adaptador_red, adaptador_mem, repeticiones) for f in fuentes}
+    finally:
+        servidor.shutdown()
+    return {
+        "meta": {
+            "commit":       _commit(),
+            "fecha":        time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python":       platform.python_version(),
+            "parseo":       (f"rapido ({utils.PARSER_RAPIDO})" if utils.PARSEO_RAPIDO
+                             else "html.parser"),
+            "procesos":     utils.PROCESOS_PARSEO,
+            "escala":       escala,
+            "repeticiones": repeticiones,
+        },
+        "fuentes": resultados,
+    }
+
+
+def paridad(fuentes: list[str], procesos: int = 0) -> dict[str, bool]:
+    """
+    Comprueba que el parseo rápido extrae exactamente lo mismo que el
+    normal y, con 'procesos', que el pool de parseo también (todas las
+    páginas van al pool, sea cual sea su tamaño).
+    """
+    fixtures = Fixtures()
+    _preparar_sesiones(AdaptadorFixtures(fixtures, None))
+    modos = [(False, 0), (True, 0)] + ([(False, procesos), (True, procesos)] if procesos else [])
+    res = {}
+    for fuente in fuentes:
+        modulo = getattr(scrapers, fuente)
+        salidas = []
+        for rapido, n in modos:
+            utils.PARSEO_RAPIDO, utils.PROCESOS_PARSEO = rapido, n
+            utils.MIN_BYTES_PROCESO = 0
+            salidas.append([repr(p) for p in _scrape_silencioso(modulo)])
+        res[fuente] = all(s == salidas[0] for s in salidas)
+    return res
+
+
+# ────────────────────────────────────────────────────────────────
+# Grabación de fixtures con la red real
+# ────────────────────────────────────────────────────────────────
+def grabar(fuentes: list[str]) -> None:
+    ruta_indice = os.path.join(DIR_FIXTURES, "indice.json")
+    with open(ruta_indice, encoding="utf-8") as f:
+        indice = json.load(f)
+
+    actual = {"fuente": None, "n": 0}
+
+    def _guardar(r, *args, **kwargs):
+        if r.status_code != 200 or "html" not in r.headers.get("Content-Type", "html"):
+            return
+        fuente = actual["fuente"]
+        actual["n"] += 1
+        ruta = f"{fuente}/{actual['n']:03d}.html"
+        os.makedirs(os.path.join(DIR_FIXTURES, fuente), exist_ok=True)
+        with open(os.path.join(DIR_FIXTURES, ruta), "w", encoding="utf-8") as f:
+            f.write(r.text)
+        indice[r.url] = ruta
+
+    utils.USAR_CACHE_HTTP = False
+    utils.SESION.hooks["response"].append(_guardar)
+    crear_original = scrapers.atica.cloudscraper.create_scraper
+
+    def _crear(**kw):
+        sesion = crear_original(**kw)
+        sesion.hooks["response"].append(_guardar)
+        return sesion
+
+    scrapers.atica.cloudscraper = SimpleNamespace(create_scraper=_crear)
+    for fuente in fuentes:
+        actual.update(fuente=fuente, n=0)
+        for url in [u for u, r in indice.items() if r.startswith(f"{fuente}/")]:
+            del indice[url]
+        getattr(scrapers, fuente).scrape()
+
+    with open(ruta_indice, "w", encoding="utf-8") as f:
+        json.dump(indice, f, indent=2, ensure_ascii=False, sort_keys=True)
+        f.write("\n")
+
+
+# ────────────────────────────────────────────────────────────────
+# Informe
+# ────────────────────────────────────────────────────────────────
+def _imprimir(res: dict, base: dict | None = None) -> None:
+    meta = res["meta"]
+    print(f"# commit {meta['commit']} · parseo {meta['parseo']} · escala ×{meta['escala']}"
+          + (f" · {meta['procesos']} procesos" if meta.get("procesos") else ""))
+    print(f"{'fuente':<12} {'tarj.':>6} {'filt.':>6} {'red ms':>9} {'parseo ms':>10} "
+          f"{'µs/tarj.':>9} {'pico KiB':>9}")
+    for fuente, m in res["fuentes"].items():
+        linea = (f"{fuente:<12} {m['tarjetas']:>6} {m['filtradas']:>6} "
+                 f"{m['red_s'] * 1e3:>9.1f} {m['parseo_s'] * 1e3:>10.1f} "
+                 f"{(m['por_tarjeta_us'] or 0):>9.0f} {m['memoria_pico_bytes'] / 1024:>9.0f}")
+        ref = (base or {}).get("fuentes", {}).get(fuente)
+        if ref and ref["parseo_s"]:
+            linea += f"   parseo {m['parseo_s'] / ref['parseo_s'] - 1:+.0%}"
+        print(linea)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--fuentes", default=",".join(scrapers.__all__),
+                    help="lista separada por comas (por defecto, todas)")
+    ap.add_argument("--escala", type=int, default=1, help="multiplica las tarjetas de cada listado")
+    ap.add_argument("--repeticiones", type=int, default=5)
+    ap.add_argument("--rapido", action="store_true", help="usa el parseo rápido (lxml + filtro)")
+    ap.add_argument("--procesos", type=int, default=0,
+                    help="parsea las páginas grandes en un pool de N procesos")
+    ap.add_argument("--salida", help="fichero JSON de resultados")
+    ap.add_argument("--comparar", help="JSON de una ejecución anterior para comparar")
+    ap.add_argument("--paridad", action="store_true",
+                    help="comprueba que el parseo rápido da el mismo resultado")
+    ap.add_argument("--grabar", action="store_true", help="regraba las fixtures desde las webs reales")
+    args = ap.parse_args()
+
+    fuentes = [f.strip() for f in args.fuentes.split(",") if f.strip()]
+    utils.USAR_CACHE_HTTP = False
+    utils.MEMO_HUELLAS.activo = False     # se mide el parseo, no el memo
+
+    if args.grabar:
+        grabar(fuentes)
+        return
+    if args.paridad:
+        res = paridad(fuentes, args.procesos)
+        for fuente, igual in res.items():
+            print(f"{fuente:<12} {'idéntico' if igual else 'DIFERENTE'}")
+        sys.exit(0 if all(res.values()) else 1)
+
+    utils.PARSEO_RAPIDO = args.rapido
+    utils.PROCESOS_PARSEO = args.procesos
+    res = ejecutar(fuentes, args.escala, args.repeticiones)
+
+    base = None
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            base = json.load(f)
+    _imprimir(res, base)
+
+    salida = args.salida or os.path.join(
+        DIR_RESULTADOS,
+        f"{res['meta']['commit'] or 'local'}-{'rapido' if args.rapido else 'normal'}"
+        f"-x{args.escala}{f'-p{args.procesos}' if args.procesos else ''}.json",
+    )
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump(res, f, indent=2)
+        f.write("\n")
+    print(f"→ {salida}")
+
+
+if __name__ == "__main__":
+    main()
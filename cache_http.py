@@ -0,0 +1,178 @@
+# cache_http.py
+# ────────────────────────────────────────────────────────────────
+"""
+Caché HTTP persistente en disco (un único fichero SQLite)
+
+• Dentro del TTL de la fuente la respuesta se sirve del disco sin red.
+• Pasado el TTL se revalida con If-None-Match / If-Modified-Since y un
+  304 se sirve del disco.
+• Al superar MAX_BYTES se desalojan las entradas menos usadas (LRU). El
+  tamaño total se suma una vez al abrir y luego se lleva al día en cada
+  escritura: guardar no recorre la tabla.
+• Cuenta aciertos por fuente: frescas, revalidadas (304) y descargadas.
+
+Funciona con cualquier requests.Session, incluida la de cloudscraper.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+# Cabeceras que no tienen sentido al servir el cuerpo ya descomprimido
+_CABECERAS_DESCARTADAS = {"content-encoding", "content-length", "transfer-encoding"}
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS respuestas (
+    url           TEXT PRIMARY KEY,
+    fuente        TEXT,
+    cabeceras     TEXT NOT NULL,
+    cuerpo        BLOB NOT NULL,
+    codificacion  TEXT,
+    etag          TEXT,
+    last_modified TEXT,
+    validado      REAL NOT NULL,
+    accedido      REAL NOT NULL,
+    bytes         INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS respuestas_accedido ON respuestas (accedido);
+"""
+
+
+class CacheHTTP:
+    def __init__(self, ruta: str, max_bytes: int = 50 * 1024 * 1024):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self._con: sqlite3.Connection | None = None
+        self._total = 0                         # bytes de cuerpo en la tabla
+        self._lock = threading.Lock()
+        self._stats: dict[str, dict[str, int]] = defaultdict(
+            lambda: {"frescas": 0, "revalidadas": 0, "descargadas": 0}
+        )
+
+    # ── almacenamiento ──────────────────────────────────────────
+    def _conexion(self) -> sqlite3.Connection:
+        if self._con is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._con = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._con.executescript(_ESQUEMA)
+            self._total = self._con.execute(
+                "SELECT COALESCE(SUM(bytes), 0) FROM respuestas").fetchone()[0]
+        return self._con
+
+    def _leer(self, url: str) -> tuple | None:
+        with self._lock:
+            return self._conexion().execute(
+                "SELECT cabeceras, cuerpo, codificacion, etag, last_modified, validado "
+                "FROM respuestas WHERE url = ?", (url,)
+            ).fetchone()
+
+    def _tocar(self, url: str, validado: bool) -> None:
+        ahora = time.time()
+        with self._lock:
+            con = self._conexion()
+            if validado:
+                con.execute("UPDATE respuestas SET accedido = ?, validado = ? WHERE url = ?",
+                            (ahora, ahora, url))
+            else:
+                con.execute("UPDATE respuestas SET accedido = ? WHERE url = ?", (ahora, url))
+            con.commit()
+
+    def _guardar(self, url: str, fuente: str | None, r: requests.Response) -> None:
+        cabeceras = {k: v for k, v in r.headers.items()
+                     if k.lower() not in _CABECERAS_DESCARTADAS}
+        cuerpo = r.content
+        ahora = time.time()
+        with self._lock:
+            con = self._conexion()
+            anterior = con.execute("SELECT bytes FROM respuestas WHERE url = ?", (url,)).fetchone()
+            self._total += len(cuerpo) - (anterior[0] if anterior else 0)
+            con.execute(
+                "INSERT OR REPLACE INTO respuestas VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (url, fuente, json.dumps(cabeceras), cuerpo, r.encoding,
+                 r.headers.get("ETag"), r.headers.get("Last-Modified"),
+                 ahora, ahora, len(cuerpo)),
+            )
+            self._desalojar(con)
+            con.commit()
+
+    def _desalojar(self, con: sqlite3.Connection) -> None:
+        """Borra las entradas menos usadas hasta quedar por debajo de max_bytes."""
+        if self._total <= self.max_bytes:
+            return
+        sobran, viejas = self._total - self.max_bytes, []
+        for url, n in con.execute("SELECT url, bytes FROM respuestas ORDER BY accedido"):
+            viejas.append((url,))
+            sobran -= n
+            self._total -= n
+            if sobran <= 0:
+                break
+        con.executemany("DELETE FROM respuestas WHERE url = ?", viejas)
+
+    @staticmethod
+    def _respuesta(url: str, fila: tuple) -> requests.Response:
+        """Reconstruye un requests.Response a partir de una fila de la caché."""
+        cabeceras, cuerpo, codificacion = fila[:3]
+        r = requests.Response()
+        r.status_code = 200
+        r.reason = "OK"
+        r.url = url
+        r.headers = CaseInsensitiveDict(json.loads(cabeceras))
+        r.encoding = codificacion
+        r._content = cuerpo
+        r.from_cache = True
+        return r
+
+    # ── API ─────────────────────────────────────────────────────
+    def get(self, sesion: requests.Session, url: str, fuente: str | None = None,
+            ttl: float = 0, enviar=None, **kwargs) -> requests.Response:
+        """
+        GET a través de la caché. 'enviar' es la función que hace la
+        petición real (por defecto sesion.get); permite envolverla con
+        los límites de cortesía sin que un acierto de caché los pague.
+        """
+        clave = fuente or "?"
+        fila = self._leer(url)
+        if fila and time.time() - fila[5] < ttl:
+            self._tocar(url, validado=False)
+            self._stats[clave]["frescas"] += 1
+            return self._respuesta(url, fila)
+
+        cabeceras = dict(kwargs.pop("headers", None) or {})
+        if fila:
+            etag, last_modified = fila[3], fila[4]
+            if etag:
+                cabeceras["If-None-Match"] = etag
+            if last_modified:
+                cabeceras["If-Modified-Since"] = last_modified
+
+        r = (enviar or sesion.get)(url, headers=cabeceras, **kwargs)
+        if r.status_code == 304 and fila:
+            self._tocar(url, validado=True)
+            self._stats[clave]["revalidadas"] += 1
+            return self._respuesta(url, fila)
+
+        self._stats[clave]["descargadas"] += 1
+        if r.status_code == 200 and "no-store" not in r.headers.get("Cache-Control", ""):
+            self._guardar(url, fuente, r)
+        return r
+
+    def resumen(self) -> dict[str, dict[str, float]]:
+        """{fuente: {"frescas", "revalidadas", "descargadas", "ratio"}}"""
+        res = {}
+        for fuente, s in self._stats.items():
+            total = sum(s.values())
+            aciertos = s["frescas"] + s["revalidadas"]
+            res[fuente] = {**s, "ratio": aciertos / total if total else 0.0}
+        return res
+
+    def cerrar(self) -> None:
+        with self._lock:
+            if self._con is not None:
+                self._con.close()
+                self._con = None
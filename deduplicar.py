@@ -0,0 +1,207 @@
+# deduplicar.py
+# ────────────────────────────────────────────────────────────────
+"""
+Índice de promociones duplicadas (en una fuente y entre fuentes)
+
+Una misma promoción puede llegar varias veces: en los dos listados de Vía
+Célere, con variantes de la misma URL (barra final, parámetros de
+seguimiento) o publicada por un comercializador con otro nombre. Cada
+promoción que llega se asigna a un Grupo:
+
+1. por URL canónica (url_canonica), si la promoción tiene enlace propio,
+2. por firma exacta: nombre normalizado + municipio,
+3. por parecido del nombre dentro del mismo municipio: índice invertido de
+   trigramas → sólo se comparan los grupos que comparten trigramas con el
+   nombre nuevo (nada de comparar todos con todos) y se acepta el más
+   parecido si su Jaccard supera UMBRAL_SIMILITUD y sus palabras son las
+   mismas o unas contienen a las otras ("Olivos" ~ "Los Olivos Paterna",
+   pero no "Torre Azul" ~ "Torre Azur").
+
+Por nombre (2 y 3) nunca se junta con un grupo que ya tenga otra URL
+propia de la misma fuente (una fuente no publica dos veces el mismo
+proyecto con enlaces distintos), ni con otros números de fase ("II",
+"Fase 2") u otro tipo de edificio ("Edificio Sol" ≠ "Residencial Sol").
+Las tarjetas sin nombre (SIN_NOMBRE) sólo se agrupan por URL.
+
+Grupo.fusion() da una única promoción por proyecto real con el mejor dato
+disponible de los duplicados vigentes: los obsoletos (respaldo de una
+fuente caída) sólo cuentan si no hay otros.
+"""
+
+import re
+from collections import Counter, defaultdict
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from localizaciones import municipio, plegar
+from utils import SIN_NOMBRE
+
+UMBRAL_SIMILITUD = 0.6
+
+# Parámetros de URL que no identifican la página
+_PARAMETROS_RUIDO = re.compile(r"^(?:utm_\w+|gclid|fbclid|_gl|_ga|ref|source)$", re.I)
+
+# Palabras que no distinguen una promoción de otra
+_PALABRAS_VACIAS = frozenset(
+    "residencial promocion promociones edificio viviendas obra nueva celere "
+    "de del la el las los en y".split()
+)
+# …salvo que dos nombres digan tipos distintos
+_TIPOS = frozenset({"residencial", "edificio"})
+
+
+def url_canonica(url: str) -> str:
+    """
+    Forma canónica de 'url' para compararla: esquema y host en minúsculas,
+    sin "www.", sin fragmento, sin parámetros de seguimiento, con la query
+    ordenada y sin barra final.
+    """
+    partes = urlsplit(url.strip())
+    host = partes.netloc.lower().removeprefix("www.")
+    query = sorted((k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True)
+                   if not _PARAMETROS_RUIDO.match(k))
+    ruta = partes.path.rstrip("/") or "/"
+    return urlunsplit((partes.scheme.lower() or "https", host, ruta, urlencode(query), ""))
+
+
+def nombre_normalizado(nombre: str | None) -> str:
+    """Palabras que distinguen el nombre; "" si no lo hay (o es SIN_NOMBRE)."""
+    if not nombre or nombre == SIN_NOMBRE:
+        return ""
+    return " ".join(w for w in plegar(nombre).split() if w not in _PALABRAS_VACIAS)
+
+
+def _tipos(nombre: str | None) -> frozenset[str]:
+    return _TIPOS.intersection(plegar(nombre or "").split())
+
+
+# Números de fase o bloque: "2", "II", "iv"…
+_NUMERO = re.compile(r"^(?:\d+|[ivx]+)$")
+
+
+def _numeros(nombre: str) -> frozenset[str]:
+    return frozenset(w for w in nombre.split() if _NUMERO.match(w))
+
+
+def _trigramas(texto: str) -> frozenset[str]:
+    t = f"  {texto} "
+    return frozenset(t[i:i + 3] for i in range(len(t) - 2))
+
+
+class Grupo:
+    """Duplicados de un mismo proyecto: (promoción, *extra) en orden de llegada."""
+
+    __slots__ = ("miembros", "trigramas", "numeros", "palabras", "tipos", "urls")
+
+    def __init__(self, trigramas: frozenset[str], numeros: frozenset[str],
+                 palabras: frozenset[str], tipos: frozenset[str]):
+        self.miembros: list[tuple] = []
+        self.trigramas = trigramas
+        self.numeros = numeros
+        self.palabras = palabras
+        self.tipos = tipos
+        self.urls: dict[str, str] = {}        # fuente → URL canónica propia
+
+    def admite(self, fuente: str, url: str | None, numeros: frozenset[str],
+               palabras: frozenset[str], tipos: frozenset[str]) -> bool:
+        """¿Puede ser del mismo proyecto una promoción con este nombre (ver arriba)?"""
+        if url and self.urls.get(fuente, url) != url:
+            return False
+        if self.tipos and tipos and self.tipos != tipos:
+            return False
+        return (self.numeros == numeros
+                and (self.palabras <= palabras or palabras <= self.palabras))
+
+    def vigentes(self) -> list[tuple]:
+        """Los miembros no obsoletos o, si todos lo son, todos."""
+        return [m for m in self.miembros if not m[0].obsoleta] or self.miembros
+
+    @property
+    def representante(self):
+        """El vigente con más datos (precio y dormitorios); a igualdad, el primero."""
+        return max(self.vigentes(),
+                   key=lambda m: (m[0].precio is not None) + (m[0].dormitorios is not None))
+
+    def fuentes(self) -> list[str]:
+        return list(dict.fromkeys(m[0].fuente for m in self.miembros))
+
+    def fusion(self):
+        """
+        Copia del representante con el precio más bajo y el máximo de
+        dormitorios que dé cualquiera de los duplicados vigentes; sólo es
+        obsoleta si lo son todos.
+        """
+        base = self.representante[0]
+        vigentes = self.vigentes()
+        if len(vigentes) == 1:
+            return base
+        precios = [m[0].precio for m in vigentes if m[0].precio is not None]
+        dormitorios = [m[0].dormitorios for m in vigentes if m[0].dormitorios is not None]
+        p = type(base)(base.fuente, base.nombre, base.ubicacion,
+                       precio=min(precios, default=None),
+                       dormitorios=max(dormitorios, default=None),
+                       estado=base.estado, url=base.url, municipio=base.municipio)
+        p.obsoleta = base.obsoleta
+        return p
+
+
+class IndiceDuplicados:
+    def __init__(self, umbral: float = UMBRAL_SIMILITUD):
+        self.umbral = umbral
+        self.grupos: list[Grupo] = []
+        self._por_url: dict[str, Grupo] = {}
+        self._por_firma: dict[tuple[str, str], Grupo] = {}
+        # (municipio, trigrama) → grupos con ese trigrama en el nombre
+        self._por_trigrama: dict[tuple[str, str], list[Grupo]] = defaultdict(list)
+
+    def _parecido(self, mun: str, trigramas: frozenset[str], *admite) -> Grupo | None:
+        # Trigramas en común con cada grupo candidato (sólo los que comparten alguno)
+        comunes: Counter = Counter()
+        grupos: dict[int, Grupo] = {}
+        for t in trigramas:
+            for g in self._por_trigrama.get((mun, t), ()):
+                comunes[id(g)] += 1
+                grupos[id(g)] = g
+        mejor, similitud = None, self.umbral
+        for clave, n in comunes.items():
+            g = grupos[clave]
+            if not g.admite(*admite):
+                continue
+            jaccard = n / (len(trigramas) + len(g.trigramas) - n)
+            if jaccard >= similitud:
+                mejor, similitud = g, jaccard
+        return mejor
+
+    def agregar(self, p, url: str | None, *extra) -> Grupo:
+        """
+        Añade 'p' (con los datos 'extra' que se quieran conservar) a su
+        grupo. 'url' es la URL propia de la promoción; None si no la tiene
+        (p. ej. la del listado, compartida por todas sus tarjetas): entonces
+        sólo se agrupa por nombre y municipio, y sin nombre, en ninguno.
+        """
+        url = url_canonica(url) if url else None
+        if p.municipio is None:
+            p.municipio = municipio(p.ubicacion)
+        nombre = nombre_normalizado(p.nombre)
+        firma = (p.municipio, nombre) if p.municipio and nombre else None
+        trigramas = _trigramas(nombre) if firma else frozenset()
+        numeros, palabras, tipos = _numeros(nombre), frozenset(nombre.split()), _tipos(p.nombre)
+        admite = (p.fuente, url, numeros, palabras, tipos)
+
+        grupo = url and self._por_url.get(url)
+        if not grupo and firma:
+            grupo = self._por_firma.get(firma)
+            if grupo is None or not grupo.admite(*admite):
+                grupo = self._parecido(p.municipio, trigramas, *admite)
+        if not grupo:
+            grupo = Grupo(trigramas, numeros, palabras, tipos)
+            self.grupos.append(grupo)
+            for t in trigramas:
+                self._por_trigrama[p.municipio, t].append(grupo)
+        grupo.miembros.append((p, *extra))
+        grupo.tipos |= tipos
+        if url:
+            self._por_url.setdefault(url, grupo)
+            grupo.urls.setdefault(p.fuente, url)
+        if firma:
+            self._por_firma.setdefault(firma, grupo)
+        return grupo
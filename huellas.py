@@ -0,0 +1,76 @@
+# huellas.py
+# ────────────────────────────────────────────────────────────────
+"""
+Extracciones memorizadas por huella (un único fichero SQLite)
+
+Para cada página de listado (o ficha) se guarda la huella de su región de
+tarjetas —sólo las etiquetas que admite su FiltroTarjetas, sin scripts ni
+atributos volátiles (nonces, tokens CSRF, parámetros de seguimiento)— junto
+con lo que se extrajo de ella. Si al día siguiente la huella coincide, se
+reutiliza esa extracción sin construir el árbol de BeautifulSoup: aunque
+cambie el resto de la página (scripts de analítica, tokens), las tarjetas
+no se vuelven a recorrer.
+
+La huella incluye la versión del código que extrae (utils.firma_codigo):
+si cambia un selector, lo memorizado deja de valer.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS extracciones (
+    clave    TEXT PRIMARY KEY,
+    huella   TEXT NOT NULL,
+    datos    TEXT NOT NULL,
+    guardado REAL NOT NULL
+) WITHOUT ROWID;
+"""
+
+# Entradas sin usar durante este tiempo se borran al abrir el fichero
+CADUCIDAD = 30 * 86_400
+
+
+class MemoHuellas:
+    def __init__(self, ruta: str, activo: bool = True):
+        self.ruta = ruta
+        self.activo = activo            # False: ni se lee ni se guarda nada
+        self._con: sqlite3.Connection | None = None
+        self._lock = threading.Lock()
+
+    def _conexion(self) -> sqlite3.Connection:
+        if self._con is None:
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            self._con = sqlite3.connect(self.ruta, check_same_thread=False)
+            self._con.executescript(_ESQUEMA)
+            self._con.execute("DELETE FROM extracciones WHERE guardado < ?",
+                              (time.time() - CADUCIDAD,))
+            self._con.commit()
+        return self._con
+
+    def leer(self, clave: str, huella: str):
+        """Lo guardado para 'clave' si se extrajo con esta misma huella; si no, None."""
+        if not self.activo:
+            return None
+        with self._lock:
+            con = self._conexion()
+            fila = con.execute("SELECT huella, datos FROM extracciones WHERE clave = ?",
+                               (clave,)).fetchone()
+            if fila is None or fila[0] != huella:
+                return None
+            con.execute("UPDATE extracciones SET guardado = ? WHERE clave = ?", (time.time(), clave))
+            con.commit()
+        return json.loads(fila[1])
+
+    def guardar(self, clave: str, huella: str, datos) -> None:
+        """'datos' (serializable en JSON) es lo extraído de la página con 'huella'."""
+        if not self.activo:
+            return
+        with self._lock:
+            con = self._conexion()
+            con.execute("INSERT OR REPLACE INTO extracciones VALUES (?, ?, ?, ?)",
+                        (clave, huella, json.dumps(datos, ensure_ascii=False), time.time()))
+            con.commit()
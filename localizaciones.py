@@ -0,0 +1,205 @@
+# localizaciones.py
+# ────────────────────────────────────────────────────────────────
+"""
+Nomenclátor de municipios de la provincia de Valencia
+
+Cada municipio tiene sus alias normalizados (nombre en castellano y
+valenciano, barrios, pedanías y códigos postales). Todos se compilan al
+importar en una única expresión regular, de modo que municipio() resuelve
+una ubicación en una sola pasada y con coste constante por tarjeta.
+
+La palabra "valencia" sola es ambigua (ciudad o provincia): sólo decide
+si no aparece ningún otro municipio. Así "Torrent, Valencia" es Torrent
+y no la capital, y tras un municipio que no está en el nomenclátor es la
+provincia ("Benaguasil, Valencia" → None). El código postal manda sobre
+los nombres, y los nombres de vía ("Calle Xàtiva") no cuentan.
+"""
+
+import re
+from functools import lru_cache
+from typing import Iterable
+import unicodedata
+
+# municipio canónico → alias (además del propio nombre)
+NOMENCLATOR: dict[str, tuple[str, ...]] = {
+    # ── capital: distritos, barrios y CP ───────────────────────
+    "valencia": (
+        "valencia capital", "ciutat vella", "el carmen", "el carme", "eixample",
+        "ensanche", "ruzafa", "russafa", "gran via", "extramurs", "arrancapins",
+        "campanar", "la saidia", "zaidia", "pla del real", "mestalla",
+        "olivereta", "nou moles", "patraix", "jesus", "la raiosa", "quatre carreres",
+        "malilla", "la fonteta", "en corts", "monteolivete", "nazaret",
+        "poblats maritims", "cabanyal", "canyamelar", "el grao", "el grau",
+        "malvarrosa", "beteró", "camins al grau", "algiros", "la carrasca",
+        "benimaclet", "rascanya", "orriols", "torrefiel", "benicalap",
+        "ciutat fallera", "marxalenes", "benimamet", "beniferri", "campolivar",
+        "sant marcel li", "san marcelino", "la roqueta", "penya roja",
+        "ciudad de las artes", "moreras", "la punta", "el saler", "pinedo",
+        *(f"460{n:02d}" for n in range(1, 27)), "46035",
+    ),
+    # ── municipios deseados por defecto ────────────────────────
+    "mislata":         ("46920",),
+    "quart de poblet": ("quart", "46930"),
+    "paterna":         ("la canada", "la canyada", "valterna", "lloma llarga",
+                        "mas del rosari", "terramelar", "46980", "46988", "46182"),
+    "manises":         ("46940",),
+    # ── resto de la provincia (para no confundirlos con la capital) ─
+    "alaquas":          ("alacuas",),
+    "albal":            (),
+    "alboraya":         ("alboraia", "port saplaya"),
+    "albuixech":        (),
+    "alcasser":         (),
+    "aldaia":           ("aldaya",),
+    "alfafar":          (),
+    "alginet":          (),
+    "almassera":        ("almacera",),
+    "alzira":           ("alcira",),
+    "benetusser":       ("benetuser",),
+    "beniparrell":      (),
+    "betera":           (),
+    "bonrepos i mirambell": ("bonrepos",),
+    "burjassot":        ("burjasot",),
+    "canet d en berenguer": ("canet de berenguer",),
+    "carcaixent":       ("carcagente",),
+    "catarroja":        (),
+    "cullera":          (),
+    "el puig":          ("puig de santa maria",),
+    "emperador":        (),
+    "foios":            ("foyos",),
+    "gandia":           (),
+    "godella":          (),
+    "l eliana":         ("la eliana",),
+    "la pobla de vallbona": ("pobla de vallbona", "puebla de vallbona"),
+    "lliria":           ("liria",),
+    "loriguilla":       (),
+    "massalfassar":     (),
+    "massamagrell":     (),
+    "massanassa":       ("masanasa",),
+    "meliana":          (),
+    "moncada":          ("montcada",),
+    "museros":          (),
+    "naquera":          (),
+    "oliva":            (),
+    "ontinyent":        ("onteniente",),
+    "paiporta":         (),
+    "picanya":          ("picaña",),
+    "picassent":        (),
+    "pucol":            ("puzol",),
+    "rafelbunyol":      ("rafelbuñol",),
+    "requena":          (),
+    "riba roja de turia": ("ribarroja del turia", "riba roja", "ribarroja"),
+    "rocafort":         (),
+    "sagunto":          ("sagunt", "puerto de sagunto", "port de sagunt"),
+    "san antonio de benageber": ("sant antoni de benaixeve",),
+    "sedavi":           (),
+    "silla":            (),
+    "sueca":            (),
+    "tavernes blanques": (),
+    "torrent":          ("torrente",),
+    "vinalesa":         (),
+    "xativa":           ("jativa",),
+    "xirivella":        ("chirivella",),
+}
+
+# Alias que sólo cuentan si no aparece otro municipio en el texto
+_ALIAS_DEBILES = {"valencia"}
+
+
+@lru_cache(maxsize=4096)
+def plegar(texto: str) -> str:
+    """
+    Minúsculas, sin tildes y con cualquier separador como un único espacio
+    (también el punto volado: "Marcel·lí" → "marcel li", como en el nomenclátor).
+    """
+    sin_tildes = (
+        unicodedata.normalize("NFKD", texto.replace("ñ", "n").replace("Ñ", "N").replace("·", " "))
+        .encode("ascii", "ignore")
+        .decode()
+        .lower()
+    )
+    return " ".join(re.split(r"[^a-z0-9]+", sin_tildes)).strip()
+
+
+def _compilar() -> tuple[re.Pattern, dict[str, str]]:
+    alias_a_municipio: dict[str, str] = {}
+    for municipio, alias in NOMENCLATOR.items():
+        for a in (municipio, *alias):
+            alias_a_municipio[plegar(a)] = municipio
+    # Los alias más largos primero: "quart de poblet" antes que "quart"
+    patron = "|".join(re.escape(a) for a in sorted(alias_a_municipio, key=len, reverse=True))
+    return re.compile(rf"(?<![a-z0-9])(?:{patron})(?![a-z0-9])"), alias_a_municipio
+
+
+_PATRON, _ALIAS = _compilar()
+
+
+# Tramos de una ubicación: "Calle X 3, 46920 Mislata (Valencia)", "Paterna · Valencia"…
+# (el punto volado sólo separa entre espacios: "Sant Marcel·lí" es un nombre)
+_TRAMOS = re.compile(r"\s+[-·]\s+|[,;()/|\[\]]")
+
+# Vía delante de un nombre: "calle de quart", "carrer de jesus", "avda xativa"
+_VIA = (r"(?:calle|cl|c|avenida|avda|av|avinguda|carrer|plaza|placa|pl|paseo|passeig|"
+        r"camino|cami|ronda|travesia)")
+_TRAS_VIA = re.compile(rf"(?:^|\s){_VIA}(?:\s(?:de|del|dels|la|les|el|l|d))*\s*$")
+_EMPIEZA_VIA = re.compile(rf"^{_VIA}\s")
+
+# Barrios de la capital: nombres comunes ("jesus", "la punta"…) que sólo
+# cuentan si son el tramo entero o si el texto nombra Valencia
+_BARRIOS = frozenset(a for a, m in _ALIAS.items()
+                     if m == "valencia" and not a.isdigit() and a not in ("valencia", "valencia capital"))
+
+
+@lru_cache(maxsize=4096)
+def municipio(texto: str | None) -> str | None:
+    """
+    Municipio canónico al que se refiere 'texto' (p. ej. "Calle Mayor 3,
+    46920 Mislata (Valencia)" → "mislata"), o None si no se reconoce.
+
+    Por orden: el código postal; si no, el último municipio nombrado (en
+    "calle, municipio (provincia)" el municipio va detrás), sin contar los
+    nombres de vía ("Calle de Quart" no es Quart de Poblet); si no, la
+    capital, salvo que "Valencia" siga a un municipio desconocido, y
+    entonces es la provincia ("Benaguasil, Valencia" → None).
+    """
+    if not texto:
+        return None
+    tramos = [plegar(t) for t in _TRAMOS.split(texto)]
+    tramos = [t for t in tramos if t]
+    nombra_valencia = any(_ALIAS.get(m.group(0)) == "valencia" and m.group(0) not in _BARRIOS
+                          for t in tramos for m in _PATRON.finditer(t))
+    ultimo = capital = None
+    for i, tramo in enumerate(tramos):
+        for m in _PATRON.finditer(tramo):
+            alias = m.group(0)
+            if _TRAS_VIA.search(tramo[:m.start()]):
+                continue
+            if alias.isdigit():
+                return _ALIAS[alias]                     # código postal
+            if alias in _ALIAS_DEBILES:
+                anterior = tramos[i - 1] if i else None
+                desconocido = (anterior and not _PATRON.search(anterior)
+                               and not re.search(r"\d", anterior) and not _EMPIEZA_VIA.match(anterior))
+                if not desconocido:
+                    capital = capital or _ALIAS[alias]
+                continue
+            if alias in _BARRIOS and alias != tramo and not nombra_valencia:
+                continue
+            ultimo = _ALIAS[alias]
+    return ultimo or capital
+
+
+def municipios_de(localizaciones: Iterable[str]) -> frozenset[str]:
+    """
+    Conjunto de municipios canónicos para una lista de localizaciones.
+    Una que no está en el nomenclátor (errata, municipio sin dar de alta)
+    es ValueError: no coincidiría nunca con ninguna promoción.
+    """
+    res, desconocidas = set(), []
+    for loc in localizaciones:
+        m = municipio(loc)
+        if m is None:
+            desconocidas.append(loc)
+        res.add(m)
+    if desconocidas:
+        raise ValueError(f"localizaciones fuera del nomenclátor: {desconocidas}")
+    return frozenset(res)
@@ -0,0 +1,229 @@
+# metricas.py
+# ────────────────────────────────────────────────────────────────
+"""
+Métricas por fuente y por ejecución
+
+Cada contador se acumula bajo la fuente en curso (contextvar FUENTE, que
+fijan el orquestador y utils.http_get; sin fuente no se mide nada) y al
+terminar se vuelca:
+
+• como líneas JSON (una por fuente) añadidas a un histórico, y
+• como fichero de texto de Prometheus (formato del textfile collector
+  de node_exporter), reescrito de forma atómica en cada ejecución.
+
+Tiempos de red: dns_s (getaddrinfo), conexion_s (TCP + TLS, sin DNS) y
+transferencia_s (resto de la petición: envío, espera y descarga). Sólo
+cuentan las peticiones que salen a la red; los aciertos de caché suman
+en 'cache'. DNS y conexión se miden parcheando urllib3 en todo el
+proceso, así que sólo los separa quien llame a instrumentar_conexiones()
+(el orquestador, al arrancar); si no, todo cuenta como transferencia_s.
+"""
+
+import contextvars
+import json
+import os
+import socket
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import urllib3.connection
+import urllib3.util.connection
+
+FUENTE: contextvars.ContextVar[str | None] = contextvars.ContextVar("fuente", default=None)
+
+# clave → (tipo Prometheus, ayuda); el orden es el de volcado.
+# Las de CONTADORES_PERFIL se anotan además por perfil de comprador.
+CONTADORES = {
+    "peticiones":              ("counter", "Peticiones HTTP hechas"),
+    "cache":                   ("counter", "Respuestas servidas desde la caché HTTP"),
+    "bytes":                   ("counter", "Bytes de cuerpo de respuesta recibidos"),
+    "errores_http":            ("counter", "Peticiones fallidas o con estado >= 400"),
+    "dns_s":                   ("counter", "Segundos resolviendo DNS"),
+    "conexion_s":              ("counter", "Segundos abriendo conexiones TCP/TLS"),
+    "transferencia_s":         ("counter", "Segundos enviando y recibiendo"),
+    "parseo_s":                ("counter", "Segundos construyendo árboles HTML"),
+    "fichas":                  ("counter", "Páginas de detalle descargadas"),
+    "huellas":                 ("counter", "Páginas sin cambios: extracción reutilizada"),
+    "tarjetas":                ("gauge",   "Promociones extraídas"),
+    "duplicadas":              ("gauge",   "Promociones fusionadas con otra ya vista"),
+    "errores":                 ("counter", "Fallos de la fuente (excepción o plazo agotado)"),
+    "duracion_s":              ("gauge",   "Segundos hasta que terminó la fuente"),
+    "disyuntor":               ("gauge",   "1 si la fuente se saltó por el disyuntor"),
+    "obsoletas":               ("gauge",   "Promociones servidas del último resultado bueno"),
+}
+CONTADORES_PERFIL = {
+    "descartadas_ubicacion":   ("gauge",   "Promociones descartadas por localización"),
+    "descartadas_precio":      ("gauge",   "Promociones descartadas por precio"),
+    "descartadas_dormitorios": ("gauge",   "Promociones descartadas por dormitorios"),
+    "filtradas":               ("gauge",   "Promociones que pasan los filtros"),
+}
+
+
+class Metricas:
+    def __init__(self):
+        self._lock = threading.Lock()
+        # (fuente, perfil) → {clave: valor}; perfil None para las de fuente
+        self._datos: dict[tuple[str, str | None], dict[str, float]] = defaultdict(
+            lambda: defaultdict(float))
+
+    def sumar(self, fuente: str, clave: str, valor: float = 1, perfil: str | None = None) -> None:
+        with self._lock:
+            self._datos[fuente, perfil][clave] += valor
+
+    def fijar(self, fuente: str, clave: str, valor: float, perfil: str | None = None) -> None:
+        with self._lock:
+            self._datos[fuente, perfil][clave] = valor
+
+    def por_fuente(self) -> dict[str, dict[str, float]]:
+        """{fuente: {clave: valor}} con todas las claves de CONTADORES."""
+        with self._lock:
+            return {f: {c: d.get(c, 0) for c in CONTADORES}
+                    for (f, perfil), d in self._datos.items() if perfil is None}
+
+    def por_perfil(self) -> dict[tuple[str, str], dict[str, float]]:
+        """{(fuente, perfil): {clave: valor}} con las claves de CONTADORES_PERFIL."""
+        with self._lock:
+            return {k: {c: d.get(c, 0) for c in CONTADORES_PERFIL}
+                    for k, d in self._datos.items() if k[1] is not None}
+
+    def acumular(self, otra: "Metricas") -> None:
+        """Suma los contadores de 'otra' y toma sus gauges (última ejecución)."""
+        with otra._lock:
+            datos = {k: dict(d) for k, d in otra._datos.items()}
+        tipos = {c: t for c, (t, _) in {**CONTADORES, **CONTADORES_PERFIL}.items()}
+        with self._lock:
+            for k, d in datos.items():
+                destino = self._datos[k]
+                for clave, valor in d.items():
+                    destino[clave] = destino[clave] + valor if tipos.get(clave) == "counter" else valor
+
+    def escribir_jsonl(self, ruta: str, inicio: float) -> None:
+        """Añade una línea JSON por fuente (y por fuente y perfil) a 'ruta'."""
+        filas = [({"fuente": f}, d) for f, d in sorted(self.por_fuente().items())]
+        filas += [({"fuente": f, "perfil": p}, d) for (f, p), d in sorted(self.por_perfil().items())]
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        with open(ruta, "a", encoding="utf-8") as f:
+            for etiquetas, datos in filas:
+                linea = {"inicio": round(inicio, 3), **etiquetas,
+                         **{c: round(v, 6) for c, v in datos.items()}}
+                f.write(json.dumps(linea, ensure_ascii=False) + "\n")
+
+    def escribir_prometheus(self, ruta: str, inicio: float) -> None:
+        """Reescribe 'ruta' en formato textfile de Prometheus (atómico)."""
+        series = [(CONTADORES, {f'fuente="{f}"': d for f, d in self.por_fuente().items()}),
+                  (CONTADORES_PERFIL, {f'fuente="{f}",perfil="{p}"': d
+                                       for (f, p), d in self.por_perfil().items()})]
+        lineas = []
+        for contadores, datos in series:
+            for clave, (tipo, ayuda) in contadores.items():
+                nombre = f"scraper_{clave}"
+                lineas += [f"# HELP {nombre} {ayuda}", f"# TYPE {nombre} {tipo}"]
+                lineas += [f"{nombre}{{{etiquetas}}} {d[clave]:g}"
+                           for etiquetas, d in sorted(datos.items())]
+        lineas += ["# HELP scraper_ultima_ejecucion_timestamp Inicio de la última ejecución",
+                   "# TYPE scraper_ultima_ejecucion_timestamp gauge",
+                   f"scraper_ultima_ejecucion_timestamp {inicio:.0f}"]
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        temporal = f"{ruta}.{os.getpid()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write("\n".join(lineas) + "\n")
+        os.replace(temporal, ruta)
+
+
+METRICAS = Metricas()
+
+
+@contextmanager
+def fuente(nombre: str | None):
+    """Atribuye a 'nombre' lo que se mida dentro del bloque (si no es None)."""
+    if nombre is None:
+        yield
+        return
+    token = FUENTE.set(nombre)
+    try:
+        yield
+    finally:
+        FUENTE.reset(token)
+
+
+def sumar(clave: str, valor: float = 1, fuente: str | None = None, perfil: str | None = None) -> None:
+    """Suma a la fuente indicada o a la en curso; sin ninguna no se mide."""
+    fuente = fuente or FUENTE.get()
+    if fuente:
+        METRICAS.sumar(fuente, clave, valor, perfil)
+
+
+def fijar(clave: str, valor: float, fuente: str | None = None, perfil: str | None = None) -> None:
+    fuente = fuente or FUENTE.get()
+    if fuente:
+        METRICAS.fijar(fuente, clave, valor, perfil)
+
+
+# ────────────────────────────────────────────────────────────────
+# Tiempos de DNS y conexión (instrumentando urllib3)
+# ────────────────────────────────────────────────────────────────
+_hilo = threading.local()
+
+
+class _SocketMedido:
+    """El módulo socket, con getaddrinfo cronometrado."""
+
+    def __getattr__(self, nombre):
+        return getattr(socket, nombre)
+
+    @staticmethod
+    def getaddrinfo(*args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return socket.getaddrinfo(*args, **kwargs)
+        finally:
+            _hilo.dns = getattr(_hilo, "dns", 0.0) + time.perf_counter() - t0
+
+
+def _medir_connect(connect):
+    def envoltorio(self, *args, **kwargs):
+        if getattr(_hilo, "conectando", False):     # HTTPS → HTTP.connect
+            return connect(self, *args, **kwargs)
+        _hilo.conectando = True
+        t0 = time.perf_counter()
+        try:
+            return connect(self, *args, **kwargs)
+        finally:
+            _hilo.conectando = False
+            _hilo.conexion = getattr(_hilo, "conexion", 0.0) + time.perf_counter() - t0
+    envoltorio.__wrapped__ = connect
+    return envoltorio
+
+
+def instrumentar_conexiones() -> None:
+    """
+    Cronometra DNS y conexión en urllib3 (idempotente). Afecta a todo el
+    proceso: lo instala el punto de entrada, nunca un import.
+    """
+    if isinstance(urllib3.util.connection.socket, _SocketMedido):
+        return
+    urllib3.util.connection.socket = _SocketMedido()
+    for clase in (urllib3.connection.HTTPConnection, urllib3.connection.HTTPSConnection):
+        if "connect" in vars(clase):
+            clase.connect = _medir_connect(clase.connect)
+
+
+@contextmanager
+def peticion():
+    """
+    Mide una petición que sale a la red y reparte su duración entre
+    dns_s, conexion_s y transferencia_s de la fuente en curso.
+    """
+    _hilo.dns = _hilo.conexion = 0.0
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        total = time.perf_counter() - t0
+        dns, conexion = _hilo.dns, max(0.0, _hilo.conexion - _hilo.dns)
+        sumar("peticiones")
+        sumar("dns_s", dns)
+        sumar("conexion_s", conexion)
+        sumar("transferencia_s", max(0.0, total - dns - conexion))
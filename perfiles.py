@@ -0,0 +1,100 @@
+# perfiles.py
+# ────────────────────────────────────────────────────────────────
+"""
+Perfiles de comprador
+
+Cada perfil tiene sus localizaciones, precio máximo, dormitorios mínimos y
+chat de Telegram. Todos se evalúan sobre las mismas promociones extraídas:
+los scrapers corren una sola vez y cada perfil sólo añade su filtro (el
+municipio de cada promoción se resuelve una vez y los municipios de cada
+perfil al cargarlo).
+
+Se leen de SCRAPER_PERFILES (por defecto perfiles.json junto a este
+fichero); si no existe se usa un único perfil con los filtros globales de
+utils y el chat de TELEGRAM_CHAT_ID. Formato (ver perfiles.ejemplo.json):
+
+    {"perfiles": [
+        {"nombre": "ana", "localizaciones": ["mislata", "paterna"],
+         "precio_maximo": 250000, "habitaciones_minimas": 3,
+         "chat_id": "$TELEGRAM_CHAT_ID_ANA"}
+    ]}
+
+Los campos que falten toman el valor global. Un chat_id que empieza por
+"$" se lee de esa variable de entorno (los ids no se suben al repo). Una
+localización que no está en el nomenclátor (localizaciones.py) invalida
+el fichero: con una errata el perfil no recibiría nada de ese municipio.
+"""
+
+import json
+import os
+
+from localizaciones import municipios_de
+from utils import (
+    HABITACIONES_MINIMAS, LOCALIZACIONES_DESEADAS, PRECIO_MAXIMO,
+    Promocion, motivo_descarte, resolver_chat,
+)
+
+RUTA_PERFILES = os.getenv(
+    "SCRAPER_PERFILES", os.path.join(os.path.dirname(os.path.abspath(__file__)), "perfiles.json")
+)
+
+_CAMPOS = {"nombre", "localizaciones", "precio_maximo", "habitaciones_minimas", "chat_id"}
+
+
+class Perfil:
+    __slots__ = ("nombre", "municipios", "precio_maximo", "habitaciones_minimas", "_chat")
+
+    def __init__(self, nombre: str,
+                 localizaciones: list[str] = LOCALIZACIONES_DESEADAS,
+                 precio_maximo: int = PRECIO_MAXIMO,
+                 habitaciones_minimas: int = HABITACIONES_MINIMAS,
+                 chat_id: str = "$TELEGRAM_CHAT_ID"):
+        self.nombre = nombre
+        self.municipios = municipios_de(localizaciones)
+        self.precio_maximo = int(precio_maximo)
+        self.habitaciones_minimas = int(habitaciones_minimas)
+        self._chat = str(chat_id)
+
+    @property
+    def chat_id(self) -> str | None:
+        """Chat de Telegram (resuelto desde el entorno si empieza por '$')."""
+        return resolver_chat(self._chat)
+
+    @property
+    def destino(self) -> str:
+        """Chat tal y como está configurado: la bandeja lo resuelve al enviar."""
+        return self._chat
+
+    def motivo_descarte(self, p: Promocion, obligatorios: tuple[str, ...] = ()) -> str | None:
+        return motivo_descarte(p, obligatorios, self.municipios,
+                               self.precio_maximo, self.habitaciones_minimas)
+
+    def __repr__(self) -> str:
+        return (f"Perfil({self.nombre!r}, municipios={sorted(self.municipios)!r}, "
+                f"precio_maximo={self.precio_maximo!r}, "
+                f"habitaciones_minimas={self.habitaciones_minimas!r})")
+
+
+def cargar_perfiles(ruta: str = RUTA_PERFILES) -> list[Perfil]:
+    """
+    Perfiles definidos en 'ruta', o el perfil por defecto si no existe.
+    Un fichero mal formado detiene la ejecución antes de descargar nada.
+    """
+    if not os.path.exists(ruta):
+        return [Perfil("defecto")]
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            definiciones = json.load(f)["perfiles"]
+        perfiles = []
+        for d in definiciones:
+            sobran = set(d).difference(_CAMPOS)
+            if sobran:
+                raise ValueError(f"campos desconocidos en {d.get('nombre')!r}: {sorted(sobran)}")
+            perfiles.append(Perfil(**d))
+    except (OSError, ValueError, KeyError, TypeError) as exc:
+        raise SystemExit(f"❌ Perfiles inválidos en {ruta}: {exc}")
+
+    nombres = [p.nombre for p in perfiles]
+    if not perfiles or len(set(nombres)) != len(nombres):
+        raise SystemExit(f"❌ Perfiles inválidos en {ruta}: vacíos o con nombres repetidos")
+    return perfiles
@@ -1,57 +1,574 @@
 #!/usr/bin/env python3
 """
-Orquestador: ejecuta todos los scrapers y envía un único mensaje
+Orquestador: ejecuta todos los scrapers en paralelo y envía un único mensaje
+
+Cada fuente corre en su propio hilo con un plazo máximo (PLAZOS) y su propia
+barrera de excepciones: si una web cae o tarda demasiado se descarta sólo
+esa fuente y el mensaje se construye con lo que llegó a entregar. Cada
+módulo se importa dentro de su hilo, así que un import roto cuenta como
+fallo de esa fuente.
+
+Los scrapers son generadores (iterar()) que siguen la paginación: cada
+promoción se registra y se filtra para cada perfil de comprador
+(perfiles.py) en cuanto llega, mientras el resto se sigue descargando.
+Al final cada perfil recibe su propio resumen en su chat, con una entrada
+por proyecto real: las repetidas dentro de una fuente o publicadas por
+varias se fusionan (deduplicar.py) con el mejor precio y dormitorios. Con
+SCRAPER_ENRIQUECER=1 las fuentes que lo admiten completan precio y
+dormitorios con la ficha de las promociones que interesan a algún perfil.
+
+La salud de cada fuente se guarda entre ejecuciones (salud.py): una fuente
+que falla varias veces seguidas se salta durante un tiempo y, mientras
+esté caída, se usan sus últimas promociones buenas marcadas como antiguas.
+
+Los resúmenes no se envían aquí: se encolan en una bandeja en disco
+(bandeja.py) que un hilo va despachando a Telegram con reintentos y en
+orden por chat. Si Telegram falla o falta el token, lo pendiente sale en
+la siguiente ejecución sin volver a descargar nada.
+
+Modo vigilancia (--vigilar): el proceso sigue vivo con las sesiones, los
+perfiles y los módulos ya cargados y consulta cada fuente cada
+INTERVALOS[fuente] segundos (con un JITTER aleatorio); cada perfil recibe
+un aviso en cuanto hay algo nuevo o con cambios. SIGINT/SIGTERM terminan
+la pasada en curso y salen; al superar MEMORIA_MAXIMA_MB también sale, para
+que el supervisor (systemd, docker…) lo relance limpio.
+
+Uso:
+    python run_scrapers.py                       # todas las fuentes
+    python run_scrapers.py --solo ficsa,aedas    # (alias: --only)
+    python run_scrapers.py --omitir atica        # (alias: --skip)
+    python run_scrapers.py --vigilar             # (alias: --watch)
+
+Trazas con logging: INFO por defecto (fuentes, pasadas); SCRAPER_LOG=DEBUG
+añade páginas, conexiones, caché y métricas (que además van a JSON lines
+y Prometheus, ver metricas.py).
 """
 
-from scrapers import (
-    aedas,
-    viacelere,
-    metrovacesa,
-    atica,        
-    urbania,
-    albaluz,
-    lobe,
-    ficsa,
+import argparse
+import logging
+import os
+import queue
+import random
+import resource
+import signal
+import sys
+import threading
+import time
+from itertools import islice
+from typing import Callable
+
+import metricas
+import scrapers
+from almacen import AlmacenPromociones, ESTADO, NUEVA, PRECIO
+from bandeja import Bandeja
+from deduplicar import IndiceDuplicados, url_canonica
+from perfiles import Perfil, cargar_perfiles
+from scrapers._motor import enriquecer_para
+from utils import (
+    CACHE_HTTP, DIR_ESTADO, ETIQUETAS_FUENTE, MAX_PROMOCIONES, NUEVO_PROYECTO, PROXIMAMENTE,
+    SALUD, SIN_NOMBRE, TTL_CACHE, TTL_CACHE_POR_DEFECTO, Promocion,
+    enviar_trozo_telegram, estadisticas_conexiones, fila_promocion,
+    formatear_precio, md, promocion_desde_fila, renderizar, trocear_mensaje,
 )
-from utils import enviar_mensaje_telegram
-
-
-def main() -> None:
-    # ─── Lanza cada scraper ─────────────────────────────────────────────
-    res_aedas       = aedas.scrape()
-    res_viacelere   = viacelere.scrape()
-    res_metrovacesa = metrovacesa.scrape()
-    res_atica       = atica.scrape()
-    res_urbania     = urbania.scrape()
-    res_albaluz     = albaluz.scrape()
-    res_lobe        = lobe.scrape()
-    res_ficsa       = ficsa.scrape()
-    
-    # ─── Traza de control en el log ─────────────────────────────────────
-    print(f"[DEBUG] AEDAS        → {len(res_aedas)} promociones filtradas", flush=True)
-    print(f"[DEBUG] VÍA CÉLERE   → {len(res_viacelere)} promociones filtradas", flush=True)
-    print(f"[DEBUG] METROVACESA  → {len(res_metrovacesa)} promociones filtradas", flush=True)
-    print(f"[DEBUG] ÁTICA        → {len(res_atica)} promociones filtradas", flush=True)
-    print(f"[DEBUG] URBANIA        → {len(res_urbania)} promociones filtradas", flush=True)
-    print(f"[DEBUG] ALBALUZ        → {len(res_albaluz)} promociones filtradas", flush=True)
-    print(f"[DEBUG] GRUPO LOBE        → {len(res_lobe)} promociones filtradas", flush=True)
-    print(f"[DEBUG] FICSA        → {len(res_ficsa)} promociones filtradas", flush=True)
-
-    # ─── Une todos los resultados ───────────────────────────────────────
-    resultados = res_aedas + res_viacelere + res_metrovacesa + res_atica + res_urbania + res_albaluz + res_lobe + res_ficsa
-
-    if resultados:
+
+log = logging.getLogger(__name__)
+NIVEL_LOG = os.getenv("SCRAPER_LOG", "INFO").upper()
+
+# Plazo máximo (segundos) que se espera a cada fuente
+PLAZO_POR_DEFECTO = 90
+PLAZOS = {
+    "viacelere": 120,      # dos listados
+    "ficsa":     300,      # listado + una ficha por promoción
+}
+
+# Modo delta: sólo se envían promociones nuevas o con cambios de precio/estado
+MODO_DELTA = os.getenv("SCRAPER_MODO_DELTA") == "1"
+RUTA_ALMACEN = os.path.join(DIR_ESTADO, "promociones.sqlite")
+
+# Alertas: bajadas de precio de al menos UMBRAL_BAJADA (fracción) y
+# lanzamientos ("Nuevo proyecto"/"Próximamente" nuevos o que salen a la venta)
+UMBRAL_BAJADA = float(os.getenv("SCRAPER_UMBRAL_BAJADA", 0.03))
+
+# (promoción fusionada, cambio según almacen.registrar, alerta ya en
+# MarkdownV2, fuentes en las que aparece)
+Seleccion = list[tuple[Promocion, tuple | None, str | None, list[str]]]
+
+# Modo vigilancia: segundos entre consultas a cada fuente (± JITTER). Las que
+# anuncian lanzamientos ("Próximamente", "Nuevo proyecto") van más a menudo
+INTERVALO_POR_DEFECTO = int(os.getenv("SCRAPER_INTERVALO", 3600))
+INTERVALOS = {
+    "viacelere":   900,
+    "metrovacesa": 900,
+    "atica":       900,
+}
+JITTER = 0.1
+MEMORIA_MAXIMA_MB = int(os.getenv("SCRAPER_MEMORIA_MAX_MB", 512))
+
+# Bandeja de salida: los resúmenes se encolan en disco y un hilo los envía
+# mientras sigue el scraping; al terminar se espera como mucho PLAZO_ENVIO
+BANDEJA = Bandeja(os.path.join(DIR_ESTADO, "bandeja.sqlite"))
+PLAZO_ENVIO = int(os.getenv("SCRAPER_PLAZO_ENVIO", 120))
+
+# Métricas de cada ejecución: histórico JSON lines y textfile de Prometheus
+RUTA_METRICAS_JSONL = os.getenv("SCRAPER_METRICAS_JSONL", os.path.join(DIR_ESTADO, "metricas.jsonl"))
+RUTA_METRICAS_PROM  = os.getenv("SCRAPER_METRICAS_PROM", os.path.join(DIR_ESTADO, "metricas.prom"))
+
+
+# ────────────────────────────────────────────────────────────────
+# Ejecución concurrente
+# ────────────────────────────────────────────────────────────────
+_FIN = object()     # marca de fuente terminada en la cola
+
+
+def _lanzar(nombre: str, cola: queue.Queue, cancelar: threading.Event) -> None:
+    """
+    Importa y recorre un scraper dejando en 'cola' cada promoción según
+    llega y, al final, _FIN o la excepción. Con 'cancelar' activado deja
+    de pedir promociones y cierra el generador: sus pools (fichas,
+    precarga de páginas) cancelan lo que aún no había empezado.
+    """
+    inicio = time.monotonic()
+    with metricas.fuente(nombre):
+        promos = None
+        try:
+            promos = scrapers.cargar(nombre).iterar()
+            for p in islice(promos, MAX_PROMOCIONES):
+                if cancelar.is_set():
+                    break
+                cola.put((nombre, p))
+            fin = _FIN
+        except Exception as exc:          # barrera por fuente
+            fin = exc
+        finally:
+            if hasattr(promos, "close"):
+                promos.close()
+        metricas.fijar("duracion_s", time.monotonic() - inicio)
+    cola.put((nombre, fin))
+
+
+def ejecutar_scrapers(nombres: list[str] | None = None,
+                      al_llegar: Callable[[Promocion], None] | None = None,
+                      ) -> dict[str, list[Promocion]]:
+    """
+    Lanza todos los scrapers a la vez y consume sus promociones según
+    llegan: 'al_llegar' se llama en este hilo con cada una mientras el
+    resto de fuentes y páginas siguen descargándose. Cada fuente tiene
+    como mucho su plazo y MAX_PROMOCIONES promociones.
+
+    Devuelve {fuente: resultados} sólo con las fuentes que terminaron
+    bien; las fallidas o fuera de plazo se registran en stderr (lo que
+    llegaron a entregar ya pasó por 'al_llegar'). Las fuentes con el
+    disyuntor abierto no se lanzan; el éxito o fallo de las demás se
+    anota en SALUD.
+
+    Una fuente fuera de plazo se cancela: en cuanto entrega su siguiente
+    promoción (o termina la petición en curso) se cierra su generador y
+    sus pools dejan de lanzar peticiones. Los hilos de cada fuente son
+    daemon, pero los de los ThreadPoolExecutor (fichas, precarga de
+    páginas, enriquecimiento) no: al salir, el proceso espera a las
+    peticiones que ya estaban en vuelo, como mucho su timeout
+    (TIMEOUT_HTTP y reintentos).
+    """
+    nombres = list(nombres or scrapers.__all__)
+    cola: queue.Queue = queue.Queue()
+    inicio = time.monotonic()
+
+    for n in [n for n in nombres if not SALUD.permitir(n)]:
+        hasta = time.strftime("%d/%m %H:%M", time.localtime(SALUD.abierto_hasta(n)))
+        print(f"⚠️  {ETIQUETAS_FUENTE.get(n, n)}: disyuntor abierto hasta {hasta}, se omite",
+              file=sys.stderr, flush=True)
+        metricas.fijar("disyuntor", 1, fuente=n)
+        nombres.remove(n)
+
+    cancelar = {n: threading.Event() for n in nombres}
+    for n in nombres:
+        threading.Thread(target=_lanzar, args=(n, cola, cancelar[n]), name=n, daemon=True).start()
+
+    plazos = {n: inicio + PLAZOS.get(n, PLAZO_POR_DEFECTO) for n in nombres}
+    parciales: dict[str, list[Promocion]] = {n: [] for n in nombres}
+    resultados: dict[str, list[Promocion]] = {}
+    while plazos:
+        try:
+            nombre, item = cola.get(timeout=max(0.0, min(plazos.values()) - time.monotonic()))
+        except queue.Empty:
+            ahora = time.monotonic()
+            for n in [n for n, limite in plazos.items() if limite <= ahora]:
+                print(f"⚠️  {ETIQUETAS_FUENTE.get(n, n)}: sin terminar tras "
+                      f"{PLAZOS.get(n, PLAZO_POR_DEFECTO)}s, se descarta",
+                      file=sys.stderr, flush=True)
+                metricas.sumar("errores", fuente=n)
+                SALUD.fallo(n)
+                cancelar[n].set()
+                del plazos[n]
+            continue
+
+        if nombre not in plazos:          # fuente ya descartada por plazo
+            continue
+        if isinstance(item, Promocion):
+            parciales[nombre].append(item)
+            if al_llegar:
+                al_llegar(item)
+            continue
+
+        del plazos[nombre]
+        if item is _FIN:
+            resultados[nombre] = parciales[nombre]
+            SALUD.exito(nombre, [fila_promocion(p) for p in parciales[nombre]])
+        else:
+            print(f"⚠️  {ETIQUETAS_FUENTE.get(nombre, nombre)}: error → {item!r}",
+                  file=sys.stderr, flush=True)
+            metricas.sumar("errores", fuente=nombre)
+            SALUD.fallo(nombre)
+
+    log.info("Scrapers completados en %.1fs", time.monotonic() - inicio)
+    return resultados
+
+
+def respaldo(nombre: str) -> list[Promocion]:
+    """Último resultado bueno de 'nombre', marcado como obsoleto (o [])."""
+    guardado = SALUD.respaldo(nombre)
+    if not guardado:
+        return []
+    momento, filas = guardado
+    promos = []
+    for fila in filas:
+        p = promocion_desde_fila({"fuente": nombre, **fila})
+        p.obsoleta = momento
+        promos.append(p)
+    log.info("%s: %d promociones del %s", ETIQUETAS_FUENTE.get(nombre, nombre), len(promos),
+             time.strftime("%d/%m %H:%M", time.localtime(momento)))
+    metricas.fijar("obsoletas", len(promos), fuente=nombre)
+    return promos
+
+
+# ────────────────────────────────────────────────────────────────
+# Registro de promociones vistas / modo delta, filtro y formato
+# ────────────────────────────────────────────────────────────────
+def clasificar(p: Promocion, almacen: AlmacenPromociones, perfiles: list[Perfil],
+               indice: IndiceDuplicados, vistas: set[tuple[str, str]]) -> None:
+    """
+    Registra 'p' en el almacén y la añade al índice de duplicados con su
+    cambio, su alerta y los perfiles cuyos filtros cumple. La misma
+    promoción repetida (misma fuente y clave_propia) sólo aporta sus
+    datos a la fusión. Anota en metricas
+    cuántas promociones descarta cada filtro. Las obsoletas (de respaldo)
+    no se registran: no son novedad ni cambio.
+    """
+    url = url_propia(p)
+    clave = url or clave_propia(p)
+    vista = (p.fuente, url_canonica(url) if url else clave)
+    if vista in vistas:
+        indice.agregar(p, url, None, None, ())
+        metricas.sumar("duplicadas", fuente=p.fuente)
+        return
+    vistas.add(vista)
+
+    cambio = alerta = None
+    if not p.obsoleta:
+        metricas.sumar("tarjetas", fuente=p.fuente)
+        cambio = almacen.registrar(p.fuente, clave, p.nombre,
+                                   p.precio, p.dormitorios, p.estado)
+        alerta = _alerta(p, cambio, almacen, clave)
+    obligatorios = getattr(scrapers, p.fuente).OBLIGATORIOS
+    aceptan = set()
+    for perfil in perfiles:
+        motivo = perfil.motivo_descarte(p, obligatorios)
+        metricas.sumar(f"descartadas_{motivo}" if motivo else "filtradas",
+                       fuente=p.fuente, perfil=perfil.nombre)
+        if not motivo:
+            aceptan.add(perfil.nombre)
+    if len(indice.agregar(p, url, cambio, alerta, aceptan).miembros) > 1:
+        metricas.sumar("duplicadas", fuente=p.fuente)
+
+
+def seleccionar(indice: IndiceDuplicados, perfil: Perfil, delta: bool = MODO_DELTA) -> Seleccion:
+    """
+    Una entrada por proyecto real: los grupos con algún duplicado que cumple
+    los filtros de 'perfil' (en modo 'delta', además, alguno nuevo o con
+    cambios), fusionados con el mejor precio y dormitorios de todos ellos.
+    La alerta y el cambio son los del representante del grupo, el mismo
+    que da nombre, estado y enlace a la fusión.
+    """
+    seleccion = []
+    for grupo in indice.grupos:
+        miembros = grupo.miembros
+        if not any(perfil.nombre in m[3] for m in miembros):
+            continue
+        if delta and not any(m[1] for m in miembros):
+            continue
+        _, cambio, alerta, _ = grupo.representante
+        seleccion.append((grupo.fusion(), cambio, alerta, grupo.fuentes()))
+    return seleccion
+
+
+def url_propia(p: Promocion) -> str | None:
+    """
+    URL que identifica a 'p', o None si la tarjeta no tiene enlace propio:
+    los esquemas le ponen entonces la del listado, común a todas sus
+    tarjetas (igual que en _motor._necesita_ficha).
+    """
+    esquema = getattr(getattr(scrapers, p.fuente), "ESQUEMA", None)
+    if not p.url or (esquema is not None and p.url == esquema.url):
+        return None
+    return p.url
+
+
+def clave_propia(p: Promocion) -> str:
+    """
+    Clave de una tarjeta sin enlace propio: su nombre o, si tampoco lo
+    tiene (SIN_NOMBRE), lo que la distingue en el listado: ubicación,
+    precio y dormitorios. Un cambio de precio de una de estas aparece
+    como promoción nueva, pero ninguna tapa a las demás.
+    """
+    if p.nombre and p.nombre != SIN_NOMBRE:
+        return p.nombre
+    return " | ".join((SIN_NOMBRE, p.ubicacion or "", str(p.precio or ""), str(p.dormitorios or "")))
+
+
+def _alerta(p: Promocion, cambio: tuple | None, almacen: AlmacenPromociones,
+            clave: str) -> str | None:
+    """Texto de la alerta que dispara 'cambio' ('clave': la de p en el almacén), si la hay."""
+    if not cambio:
+        return None
+    tipo, anterior = cambio
+    lanzamiento = (NUEVO_PROYECTO, PROXIMAMENTE)
+    if tipo == PRECIO and anterior and p.precio and anterior - p.precio >= UMBRAL_BAJADA * anterior:
+        texto = f"🔔 Baja {formatear_precio(anterior - p.precio)} ({1 - p.precio / anterior:.0%})"
+        if p.precio <= almacen.precio_minimo(p.fuente, clave):
+            texto += ", mínimo histórico"
+        return md(texto)
+    if tipo == ESTADO and anterior in lanzamiento and p.estado is None:
+        return md(f"🔔 Sale a la venta (antes: {anterior})")
+    if tipo == NUEVA and p.estado in lanzamiento:
+        return md(f"🔔 Lanzamiento: {p.estado}")
+    return None
+
+
+def _nota_cambio(cambio: tuple | None) -> str:
+    if not cambio:
+        return ""
+    tipo, anterior = cambio
+    if tipo == PRECIO and anterior:
+        return md(f"\n🔄 Antes: {formatear_precio(anterior)}")
+    if tipo == ESTADO:
+        return md(f"\n🔄 Antes: {anterior or 'En venta'}")
+    return ""
+
+
+def _nota_fuentes(p: Promocion, fuentes: list[str]) -> str:
+    otras = [ETIQUETAS_FUENTE.get(f, f) for f in fuentes if f != p.fuente]
+    return md(f"\n🔁 También en: {', '.join(otras)}") if otras else ""
+
+
+def _lista(valor: str) -> list[str]:
+    return [n.strip().lower() for n in valor.split(",") if n.strip()]
+
+
+def _argumentos(argv: list[str] | None = None) -> argparse.Namespace:
+    ap = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    ap.add_argument("--solo", "--only", type=_lista, default=[], metavar="F1,F2",
+                    help=f"ejecutar sólo estas fuentes ({', '.join(scrapers.__all__)})")
+    ap.add_argument("--omitir", "--skip", type=_lista, default=[], metavar="F1,F2",
+                    help="no ejecutar estas fuentes")
+    ap.add_argument("--vigilar", "--watch", action="store_true",
+                    help="seguir en marcha consultando cada fuente según INTERVALOS")
+    args = ap.parse_args(argv)
+    try:
+        args.fuentes = scrapers.seleccionar(args.solo, args.omitir)
+    except KeyError as exc:
+        ap.error(exc.args[0])
+    if not args.fuentes:
+        ap.error("la selección no deja ninguna fuente")
+    return args
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = _argumentos(argv)
+    inicio = time.time()
+    logging.basicConfig(level=NIVEL_LOG, stream=sys.stdout, datefmt="%H:%M:%S",
+                        format="%(asctime)s %(levelname)-5s %(message)s")
+    metricas.instrumentar_conexiones()
+
+    perfiles = cargar_perfiles()
+    enriquecer_para(frozenset().union(*(p.municipios for p in perfiles)))
+    # Lo pendiente de ejecuciones anteriores sale ya, mientras se descarga
+    BANDEJA.iniciar(enviar_trozo_telegram)
+    try:
+        if args.vigilar:
+            vigilar(args.fuentes, perfiles)
+            return
+
+        ejecutar_pasada(args.fuentes, perfiles)
+        _traza_conexiones()
+        _volcar_metricas(inicio)
+    finally:
+        BANDEJA.cerrar(PLAZO_ENVIO)
+
+
+def ejecutar_pasada(fuentes: list[str], perfiles: list[Perfil],
+                    delta: bool = MODO_DELTA, vigilando: bool = False) -> None:
+    """
+    Extrae 'fuentes', las clasifica para cada perfil y encola su resumen.
+    Vigilando sólo se avisa a los perfiles con algo nuevo y no se tira del
+    último resultado bueno de las fuentes caídas (no sería novedad).
+    """
+    indice = IndiceDuplicados()
+    vistas: set[tuple[str, str]] = set()
+    pasada = f"{time.time():.6f}"          # clave de sus notificaciones en la bandeja
+
+    # ─── 1 ▸ Extracción + registro / delta + filtro, según llegan ───────
+    with AlmacenPromociones(RUTA_ALMACEN) as almacen:
+        por_fuente = ejecutar_scrapers(
+            fuentes, lambda p: clasificar(p, almacen, perfiles, indice, vistas)
+        )
+        # Fuentes caídas: lo que falte se completa con su último resultado bueno
+        for n in fuentes:
+            if n not in por_fuente and not vigilando:
+                try:
+                    for p in respaldo(n):
+                        clasificar(p, almacen, perfiles, indice, vistas)
+                except Exception as exc:      # p. ej. el módulo ya no importa
+                    print(f"⚠️  {ETIQUETAS_FUENTE.get(n, n)}: sin respaldo → {exc!r}",
+                          file=sys.stderr, flush=True)
+    caidas = [ETIQUETAS_FUENTE.get(n, n) for n in fuentes if n not in por_fuente]
+    SALUD.guardar()
+
+    for (nombre, perfil), m in sorted(metricas.METRICAS.por_perfil().items()):
+        etiqueta = ETIQUETAS_FUENTE.get(nombre, nombre)
+        log.info("%-12s → %d extraídas, %.0f filtradas (%s)",
+                 etiqueta, len(por_fuente.get(nombre, ())), m["filtradas"], perfil)
+
+    # ─── 2 ▸ Mensaje de cada perfil (duplicados fusionados), en el orden de las fuentes
+    orden = {n: i for i, n in enumerate(fuentes)}
+    for perfil in perfiles:
+        seleccion = sorted(seleccionar(indice, perfil, delta), key=lambda pc: orden[pc[0].fuente])
+        if vigilando and not seleccion:
+            continue
+        BANDEJA.encolar(f"{pasada}:{perfil.nombre}", perfil.destino,
+                        trocear_mensaje(componer_mensaje(seleccion, caidas, delta)))
+
+
+# ────────────────────────────────────────────────────────────────
+# Modo vigilancia
+# ────────────────────────────────────────────────────────────────
+def _intervalo(nombre: str) -> float:
+    return INTERVALOS.get(nombre, INTERVALO_POR_DEFECTO) * random.uniform(1 - JITTER, 1 + JITTER)
+
+
+def _ajustar_a_intervalos(fuentes: list[str]) -> None:
+    """
+    Vigilando, cada fuente se consulta cada INTERVALOS[fuente]: su listado
+    se revalida en la caché HTTP al menos en cada consulta (TTL de medio
+    intervalo; una respuesta 304 apenas cuesta) y el enfriamiento de su
+    disyuntor se escala a ese intervalo (salud.py).
+    """
+    for n in fuentes:
+        intervalo = INTERVALOS.get(n, INTERVALO_POR_DEFECTO)
+        TTL_CACHE[n] = min(TTL_CACHE.get(n, TTL_CACHE_POR_DEFECTO), intervalo * (1 - JITTER) / 2)
+        SALUD.fijar_intervalo(n, intervalo)
+
+
+def _en_marcha(nombre: str) -> bool:
+    """¿Sigue vivo el hilo de una pasada anterior de 'nombre' (fuera de plazo)?"""
+    return any(h.name == nombre and h.is_alive() for h in threading.enumerate())
+
+
+def _memoria_mb() -> float:
+    # ru_maxrss: pico del proceso, en KiB en Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def vigilar(fuentes: list[str], perfiles: list[Perfil]) -> None:
+    """
+    Bucle del modo vigilancia: en cada vuelta se ejecutan juntas las
+    fuentes a las que les toca y se reprograma cada una con su intervalo.
+    Las métricas de cada pasada se añaden al histórico JSON lines; el
+    fichero de Prometheus lleva los acumulados desde el arranque.
+    """
+    parar = threading.Event()
+    for senal in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(senal, lambda *_: parar.set())
+
+    _ajustar_a_intervalos(fuentes)
+    acumuladas = metricas.Metricas()
+    proxima = {n: time.monotonic() for n in fuentes}       # todas al arrancar
+    log.info("Vigilando %d fuentes", len(fuentes))
+    while not parar.is_set():
+        ahora = time.monotonic()
+        pendientes = [n for n in fuentes if proxima[n] <= ahora and not _en_marcha(n)]
+        if pendientes:
+            inicio = time.time()
+            metricas.METRICAS = metricas.Metricas()
+            ejecutar_pasada(pendientes, perfiles, delta=True, vigilando=True)
+            acumuladas.acumular(metricas.METRICAS)
+            _volcar_metricas(inicio, acumuladas)
+            for n in pendientes:
+                proxima[n] = time.monotonic() + _intervalo(n)
+            if _memoria_mb() > MEMORIA_MAXIMA_MB:
+                print(f"⚠️  Memoria por encima de {MEMORIA_MAXIMA_MB} MB, salgo para que me relancen",
+                      file=sys.stderr, flush=True)
+                break
+        parar.wait(max(1.0, min(proxima.values()) - time.monotonic()))
+
+    SALUD.guardar()
+    log.info("Vigilancia terminada")
+
+
+def componer_mensaje(seleccion: Seleccion, caidas: list[str], delta: bool = MODO_DELTA) -> str:
+    """
+    Resumen MarkdownV2 de un perfil: cada campo se escapa al renderizar.
+    Las promociones con alerta (bajada o lanzamiento) van primero.
+    """
+    if seleccion:
+        seleccion = [s for s in seleccion if s[2]] + [s for s in seleccion if not s[2]]
+        alertas = sum(1 for s in seleccion if s[2])
         mensaje = (
-            f"📢 ¡{len(resultados)} promociones cumplen tus filtros! 🚀\n"
-            + "".join(resultados)
+            md(f"📢 ¡{len(seleccion)} promociones "
+               f"{'nuevas o con cambios' if delta else 'cumplen tus filtros'}! 🚀"
+               + (f"\n🔔 {alertas} con alerta" if alertas else "") + "\n\n")
+            + "\n\n".join(renderizar(p) + _nota_fuentes(p, f) + _nota_cambio(c)
+                           + (f"\n{a}" if a else "")
+                           for p, c, a, f in seleccion)
         )
     else:
-        mensaje = (
+        mensaje = md(
             "✅ Scrapers finalizados.\n\n"
             "No se encontró ninguna promoción nueva que cumpla tus filtros."
         )
 
-    enviar_mensaje_telegram(mensaje)
+    if caidas:
+        mensaje += md(f"\n\n⚠️ Sin datos (o incompletos) de: {', '.join(caidas)}")
+    return mensaje
+
+
+def _traza_conexiones() -> None:
+    """Resumen de conexiones HTTP y aciertos de la caché por fuente."""
+    stats = estadisticas_conexiones()
+    for host, s in sorted(stats.items()):
+        log.debug("HTTP %-24s → %d peticiones, %d conexiones abiertas, %d reutilizadas",
+                  host, s["peticiones"], s["abiertas"], s["reutilizadas"])
+    for fuente, s in sorted(CACHE_HTTP.resumen().items()):
+        log.debug("CACHÉ %-12s → %.0f%% aciertos (%d frescas, %d revalidadas, %d descargadas)",
+                  fuente, 100 * s["ratio"], s["frescas"], s["revalidadas"], s["descargadas"])
+
+
+def _volcar_metricas(inicio: float, acumuladas: "metricas.Metricas | None" = None) -> None:
+    """
+    Escribe las métricas de la ejecución y avisa de fuentes sin tarjetas;
+    el fichero de Prometheus sale de 'acumuladas' si se da (modo vigilancia).
+    """
+    for fuente, m in sorted(metricas.METRICAS.por_fuente().items()):
+        log.debug("MÉTRICAS %-12s → %.0f peticiones (%.0f caché, %.0f KiB), red %.2fs, parseo %.2fs",
+                  fuente, m["peticiones"], m["cache"], m["bytes"] / 1024,
+                  m["dns_s"] + m["conexion_s"] + m["transferencia_s"], m["parseo_s"])
+        if fuente in scrapers.__all__ and not m["errores"] and not m["tarjetas"]:
+            print(f"⚠️  {ETIQUETAS_FUENTE.get(fuente, fuente)}: 0 tarjetas, ¿ha cambiado el selector?",
+                  file=sys.stderr, flush=True)
+    try:
+        metricas.METRICAS.escribir_jsonl(RUTA_METRICAS_JSONL, inicio)
+        (acumuladas or metricas.METRICAS).escribir_prometheus(RUTA_METRICAS_PROM, inicio)
+    except OSError as exc:
+        print(f"⚠️  No se pudieron escribir las métricas → {exc!r}", file=sys.stderr, flush=True)
 
 
 if __name__ == "__main__":
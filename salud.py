@@ -0,0 +1,179 @@
+# salud.py
+# ────────────────────────────────────────────────────────────────
+"""
+Salud de cada fuente entre ejecuciones (un único fichero SQLite)
+
+• Timeouts adaptativos: se guardan las últimas MUESTRAS latencias de cada
+  fuente y el timeout de lectura pasa a ser FACTOR_TIMEOUT × su p95,
+  acotado entre TIMEOUT_MINIMO y el timeout común. Una web que suele
+  responder en 1 s ya no puede colgar la ejecución 30 s por petición.
+• Disyuntor: tras FALLOS_PARA_ABRIR ejecuciones seguidas con la fuente
+  caída se deja de lanzar durante ENFRIAMIENTO segundos (el doble con cada
+  fallo más, hasta ENFRIAMIENTO_MAXIMO). Pasado el plazo se prueba una vez:
+  si va bien se cierra; si no, vuelve a abrirse. ENFRIAMIENTO es para una
+  ejecución al día (PERIODO); si la fuente se consulta más a menudo
+  (modo vigilancia, ver fijar_intervalo) se escala en proporción.
+• Último resultado bueno: las promociones de la última ejecución completa
+  de cada fuente. Si la fuente cae o se salta, el orquestador las sirve
+  marcadas como obsoletas (como mucho de hace MAX_EDAD_RESPALDO).
+
+Todo se lee al empezar y se escribe de una vez con guardar().
+"""
+
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+
+MUESTRAS          = 50                 # latencias guardadas por fuente
+MIN_MUESTRAS      = 5                  # por debajo se usa el timeout común
+PERCENTIL         = 0.95
+FACTOR_TIMEOUT    = 3.0
+TIMEOUT_MINIMO    = 5.0                # segundos
+
+FALLOS_PARA_ABRIR   = int(os.getenv("SCRAPER_FALLOS_PARA_ABRIR", 3))
+ENFRIAMIENTO        = float(os.getenv("SCRAPER_ENFRIAMIENTO", 36 * 3600))
+ENFRIAMIENTO_MAXIMO = 7 * 24 * 3600
+PERIODO             = 24 * 3600        # intervalo para el que está pensado ENFRIAMIENTO
+MAX_EDAD_RESPALDO   = 7 * 24 * 3600
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS fuentes (
+    fuente        TEXT PRIMARY KEY,
+    latencias     TEXT NOT NULL,
+    fallos        INTEGER NOT NULL,
+    abierto_hasta REAL NOT NULL,
+    ultimo_ok     REAL,
+    promociones   TEXT
+);
+"""
+
+
+class _Fuente:
+    __slots__ = ("latencias", "fallos", "abierto_hasta", "ultimo_ok", "promociones")
+
+    def __init__(self, latencias=(), fallos=0, abierto_hasta=0.0, ultimo_ok=None, promociones=None):
+        self.latencias: deque[float] = deque(latencias, maxlen=MUESTRAS)
+        self.fallos = fallos
+        self.abierto_hasta = abierto_hasta
+        self.ultimo_ok = ultimo_ok
+        self.promociones: list[dict] | None = promociones
+
+
+class Salud:
+    def __init__(self, ruta: str):
+        self.ruta = ruta
+        self._lock = threading.Lock()
+        self._fuentes: dict[str, _Fuente] | None = None
+        self._intervalos: dict[str, float] = {}
+
+    def _datos(self) -> dict[str, _Fuente]:
+        # se carga al primer uso (con el lock ya tomado)
+        if self._fuentes is None:
+            self._fuentes = {}
+            if os.path.exists(self.ruta):
+                con = sqlite3.connect(self.ruta)
+                try:
+                    con.executescript(_ESQUEMA)
+                    for fuente, lat, fallos, abierto, ok, promos in con.execute(
+                            "SELECT * FROM fuentes"):
+                        self._fuentes[fuente] = _Fuente(
+                            json.loads(lat), fallos, abierto, ok,
+                            json.loads(promos) if promos else None)
+                finally:
+                    con.close()
+        return self._fuentes
+
+    def _fuente(self, fuente: str) -> _Fuente:
+        return self._datos().setdefault(fuente, _Fuente())
+
+    # ── timeouts adaptativos ────────────────────────────────────
+    def anotar_latencia(self, fuente: str | None, segundos: float) -> None:
+        if fuente:
+            with self._lock:
+                self._fuente(fuente).latencias.append(round(segundos, 3))
+
+    def timeout(self, fuente: str | None, comun: tuple[float, float]) -> tuple[float, float]:
+        """(conexión, lectura) para 'fuente' según sus latencias; si no, 'comun'."""
+        if not fuente:
+            return comun
+        with self._lock:
+            latencias = sorted(self._fuente(fuente).latencias)
+        if len(latencias) < MIN_MUESTRAS:
+            return comun
+        p95 = latencias[min(len(latencias) - 1, math.ceil(PERCENTIL * len(latencias)) - 1)]
+        conexion, lectura = comun
+        return conexion, max(TIMEOUT_MINIMO, min(lectura, FACTOR_TIMEOUT * p95))
+
+    # ── disyuntor ───────────────────────────────────────────────
+    def permitir(self, fuente: str) -> bool:
+        """False mientras el disyuntor de 'fuente' esté abierto."""
+        with self._lock:
+            return time.time() >= self._fuente(fuente).abierto_hasta
+
+    def abierto_hasta(self, fuente: str) -> float:
+        with self._lock:
+            return self._fuente(fuente).abierto_hasta
+
+    def fijar_intervalo(self, fuente: str, intervalo: float) -> None:
+        """
+        'fuente' se consulta cada 'intervalo' segundos: el enfriamiento se
+        escala en proporción y un disyuntor abierto con una escala mayor
+        (p. ej. por ejecuciones diarias) se acorta a la nueva.
+        """
+        with self._lock:
+            self._intervalos[fuente] = intervalo
+            f = self._fuente(fuente)
+            if f.fallos >= FALLOS_PARA_ABRIR:
+                f.abierto_hasta = min(f.abierto_hasta, time.time() + self._espera(fuente, f.fallos))
+
+    def _espera(self, fuente: str, fallos: int) -> float:
+        escala = min(1.0, self._intervalos.get(fuente, PERIODO) / PERIODO)
+        espera = ENFRIAMIENTO * escala * 2 ** (fallos - FALLOS_PARA_ABRIR)
+        return min(espera, ENFRIAMIENTO_MAXIMO)
+
+    def exito(self, fuente: str, promociones: list[dict]) -> None:
+        """Cierra el disyuntor y guarda 'promociones' como último resultado bueno."""
+        with self._lock:
+            f = self._fuente(fuente)
+            f.fallos, f.abierto_hasta = 0, 0.0
+            f.ultimo_ok, f.promociones = time.time(), promociones
+
+    def fallo(self, fuente: str) -> None:
+        """Anota una ejecución fallida; abre el disyuntor si toca."""
+        with self._lock:
+            f = self._fuente(fuente)
+            f.fallos += 1
+            if f.fallos >= FALLOS_PARA_ABRIR:
+                f.abierto_hasta = time.time() + self._espera(fuente, f.fallos)
+
+    # ── último resultado bueno ──────────────────────────────────
+    def respaldo(self, fuente: str) -> tuple[float, list[dict]] | None:
+        """(momento, promociones) de la última ejecución buena, si no es muy vieja."""
+        with self._lock:
+            f = self._fuente(fuente)
+            if f.promociones is None or time.time() - f.ultimo_ok > MAX_EDAD_RESPALDO:
+                return None
+            return f.ultimo_ok, f.promociones
+
+    def guardar(self) -> None:
+        with self._lock:
+            if self._fuentes is None:
+                return
+            os.makedirs(os.path.dirname(self.ruta) or ".", exist_ok=True)
+            con = sqlite3.connect(self.ruta)
+            try:
+                con.executescript(_ESQUEMA)
+                con.executemany(
+                    "INSERT OR REPLACE INTO fuentes VALUES (?, ?, ?, ?, ?, ?)",
+                    [(fuente, json.dumps(list(f.latencias)), f.fallos, f.abierto_hasta,
+                      f.ultimo_ok,
+                      json.dumps(f.promociones, ensure_ascii=False) if f.promociones is not None else None)
+                     for fuente, f in self._fuentes.items()],
+                )
+                con.commit()
+            finally:
+                con.close()
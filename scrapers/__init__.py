@@ -1,22 +1,55 @@
 # scrapers/__init__.py
-from . import (
-    aedas,
-    viacelere,
-    metrovacesa,
-    atica,
-    urbania,
-    albaluz,
-    lobe,
-    ficsa,
-)
-
-__all__ = [
-    "aedas",
-    "viacelere",
-    "metrovacesa",
-    "atica",
-    "urbania",
-    "albaluz",
-    "lobe",
-    "ficsa",
-]
+"""
+Registro perezoso de scrapers
+
+Los módulos del paquete se descubren con pkgutil sin importarlos; cada uno
+se importa la primera vez que se accede a él (scrapers.aedas o cargar()).
+Así una ejecución de una sola fuente no paga cloudscraper ni el resto de
+dependencias, y un módulo roto sólo falla cuando se usa.
+
+Los módulos que empiezan por "_" son auxiliares y no se registran.
+"""
+
+import importlib
+import pkgutil
+from types import ModuleType
+
+# Orden en que se lanzan y aparecen en el mensaje; las fuentes nuevas que
+# no estén aquí se añaden al final por orden alfabético
+_ORDEN = ["aedas", "viacelere", "metrovacesa", "atica", "urbania", "albaluz", "lobe", "ficsa"]
+
+
+def _descubrir() -> list[str]:
+    encontrados = {m.name for m in pkgutil.iter_modules(__path__)
+                   if not m.name.startswith("_") and not m.ispkg}
+    return ([n for n in _ORDEN if n in encontrados]
+            + sorted(encontrados.difference(_ORDEN)))
+
+
+__all__ = _descubrir()
+
+
+def cargar(nombre: str) -> ModuleType:
+    """Importa (una sola vez) y devuelve el módulo del scraper 'nombre'."""
+    if nombre not in __all__:
+        raise KeyError(f"scraper desconocido: {nombre!r}")
+    return importlib.import_module(f".{nombre}", __name__)
+
+
+def seleccionar(solo: list[str] | None = None, omitir: list[str] | None = None) -> list[str]:
+    """
+    Fuentes a ejecutar, en el orden de __all__: las de 'solo' (todas si
+    está vacío) menos las de 'omitir'. Un nombre desconocido es un error.
+    """
+    desconocidos = set(solo or ()).union(omitir or ()).difference(__all__)
+    if desconocidos:
+        raise KeyError(f"scrapers desconocidos: {', '.join(sorted(desconocidos))}")
+    return [n for n in __all__
+            if (not solo or n in solo) and n not in set(omitir or ())]
+
+
+def __getattr__(nombre: str) -> ModuleType:
+    # scrapers.<fuente> importa el módulo bajo demanda
+    if nombre in __all__:
+        return cargar(nombre)
+    raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
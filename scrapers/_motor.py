@@ -0,0 +1,355 @@
+# scrapers/_motor.py
+# ────────────────────────────────────────────────────────────────
+"""
+Motor de extracción declarativo
+
+Un Esquema describe un listado: la URL, el selector de cada tarjeta, cómo
+se obtiene cada campo de la Promocion (Campo) y qué marcas de la tarjeta
+fijan su estado (Estado). Todos los selectores y expresiones regulares se
+compilan una sola vez al definir el esquema; extraer() recorre el listado
+paginado y aplica el esquema a cada tarjeta sin volver a compilar nada.
+
+Ejemplo (ver aedas.py, metrovacesa.py…):
+
+    ESQUEMA = Esquema(
+        "aedas", LISTING_URL, "a.card-promo.card",
+        campos={
+            "nombre": Campo("span.promo-title"),
+            "precio": Campo("span.promo-price", numero="primero"),
+            "url":    Campo(atributo="href", prefijo="https://www.aedashomes.com"),
+        },
+        requeridos=("nombre",),
+    )
+
+Enriquecimiento (opcional, SCRAPER_ENRIQUECER=1): si el esquema trae una
+Ficha, las promociones a las que les falta precio o dormitorios y cuyo
+municipio interesa a algún perfil se completan con su página de detalle.
+Las fichas se descargan en paralelo mientras sigue el listado, pasan por
+la caché HTTP con su propio TTL y las promociones salen en el mismo orden.
+
+Si el esquema tiene un FiltroTarjetas, cada página se memoriza por la
+huella de su región de tarjetas (ver huellas.py): una página sin cambios
+se resuelve sin construir su árbol.
+
+Los módulos que empiezan por "_" no son scrapers (ver scrapers/__init__).
+"""
+
+import functools
+import importlib
+import os
+import re
+import sys
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Iterable, Iterator
+
+import requests
+import soupsieve
+from bs4 import SoupStrainer, Tag
+
+import metricas
+from localizaciones import municipio, plegar
+from utils import (
+    MUNICIPIOS_DESEADOS, FiltroTarjetas, Promocion, firma_codigo, http_get,
+    parsear_html, promociones_paginadas, tarjetas_paginadas,
+)
+
+ENRIQUECER = os.getenv("SCRAPER_ENRIQUECER") == "1"
+# Las fichas cambian poco: una descarga al día basta
+TTL_FICHAS = int(os.getenv("SCRAPER_TTL_FICHAS", 20 * 3600))
+
+# Municipios por los que merece la pena descargar fichas; el orquestador
+# lo amplía a la unión de los perfiles (ver enriquecer_para)
+MUNICIPIOS_ENRIQUECER: frozenset[str] = MUNICIPIOS_DESEADOS
+
+# Números "1.234.567" / "1,234": sin separadores de miles
+_NUMERO = re.compile(r"\d[\d.,]*")
+
+CAMPOS = ("nombre", "ubicacion", "precio", "dormitorios", "url")
+
+
+def _numeros(texto: str) -> list[int]:
+    return [int(n.replace(".", "").replace(",", "")) for n in _NUMERO.findall(texto)]
+
+
+# modo → función texto → int | None
+NUMEROS = {
+    "primero": lambda t: next(iter(_numeros(t)), None),
+    "maximo":  lambda t: max(_numeros(t), default=None),
+}
+
+
+class Campo:
+    """
+    Cómo sacar un valor de una tarjeta:
+
+    • selector   CSS relativo a la tarjeta (None = la propia tarjeta);
+                 'indice' elige la n-ésima coincidencia
+    • padre      nombre de la etiqueta antecesora a usar (p. ej. "a")
+    • texto      regex: primer texto de la tarjeta que la contenga
+    • atributo   leer ese atributo en vez del texto
+    • patron     regex sobre el valor: se queda con la coincidencia
+    • numero     "primero" | "maximo": convierte a entero
+    • minusculas, separador (de get_text), prefijo, defecto
+    """
+
+    __slots__ = ("_selector", "indice", "padre", "_texto", "atributo", "_patron",
+                 "_numero", "minusculas", "separador", "prefijo", "defecto")
+
+    def __init__(self, selector: str | None = None, *, indice: int = 0,
+                 padre: str | None = None, texto: str | None = None,
+                 atributo: str | None = None, patron: str | None = None,
+                 numero: str | None = None, minusculas: bool = False,
+                 separador: str = " ", prefijo: str = "", defecto=None):
+        self._selector = soupsieve.compile(selector) if selector else None
+        self.indice = indice
+        self.padre = padre
+        self._texto = re.compile(texto, re.I) if texto else None
+        self.atributo = atributo
+        self._patron = re.compile(patron) if patron else None
+        self._numero = NUMEROS[numero] if numero else None
+        self.minusculas = minusculas
+        self.separador = separador
+        self.prefijo = prefijo
+        self.defecto = defecto
+
+    def _nodo(self, tarjeta: Tag) -> Tag | None:
+        if self.padre:
+            attrs = {self.atributo: True} if self.atributo else {}
+            return tarjeta.find_parent(self.padre, attrs)
+        if self._selector is None:
+            return tarjeta
+        if self.indice == 0:
+            return self._selector.select_one(tarjeta)
+        nodos = self._selector.select(tarjeta, limit=self.indice + 1)
+        return nodos[self.indice] if len(nodos) > self.indice else None
+
+    def extraer(self, tarjeta: Tag):
+        nodo = self._nodo(tarjeta)
+        valor = None
+        if nodo is not None:
+            if self.atributo:
+                valor = nodo.get(self.atributo)
+            elif self._texto:
+                valor = next((s.strip() for s in nodo.strings if self._texto.search(s)), None)
+            else:
+                valor = nodo.get_text(self.separador, strip=True)
+        if valor and self._patron:
+            m = self._patron.search(valor)
+            valor = m.group(0) if m else None
+        if valor and self.minusculas:
+            valor = valor.lower()
+        if valor and self._numero:
+            valor = self._numero(valor)
+        if valor and self.prefijo:
+            valor = self.prefijo + valor
+        return valor if valor not in (None, "") else self.defecto
+
+
+class Estado:
+    """Marca de la tarjeta: si el texto de 'selector' contiene 'contiene' → 'valor'."""
+
+    __slots__ = ("_selector", "contiene", "valor")
+
+    def __init__(self, selector: str, contiene: str, valor: str):
+        self._selector = soupsieve.compile(selector)
+        self.contiene = plegar(contiene)
+        self.valor = valor
+
+    def extraer(self, tarjeta: Tag) -> str | None:
+        nodo = self._selector.select_one(tarjeta)
+        if nodo is not None and self.contiene in plegar(nodo.get_text(" ", strip=True)):
+            return self.valor
+        return None
+
+
+def _alternativas(campos: dict) -> dict[str, tuple[Campo, ...]]:
+    desconocidos = set(campos).difference(CAMPOS)
+    if desconocidos:
+        raise ValueError(f"campos desconocidos {sorted(desconocidos)}")
+    return {c: v if isinstance(v, tuple) else (v,) for c, v in campos.items()}
+
+
+def _valor(alternativas: tuple[Campo, ...], nodo: Tag):
+    """Primer valor no vacío de las alternativas (o el último obtenido)."""
+    valor = None
+    for campo in alternativas:
+        valor = campo.extraer(nodo)
+        if valor not in (None, ""):
+            break
+    return valor
+
+
+# Genéricos para fichas: "Desde 189.000 €" / "2, 3 y 4 dormitorios"
+PRECIO_EN_TEXTO = Campo(texto=r"desde\s*\d[\d.]*\s*€", patron=r"\d[\d.]*\s*€", numero="primero")
+DORMITORIOS_EN_TEXTO = Campo(texto=r"\d\s*(dormitorio|habitaci)",
+                             patron=r"[\d ,y]*\d\s*(?=(?i:dorm|hab))", numero="maximo")
+
+
+class Ficha:
+    """
+    Página de detalle con la que completar 'campos' (precio, dormitorios)
+    que falten en la tarjeta. Se descarga con la misma sesión que el
+    listado y se guarda en la caché HTTP durante 'ttl' segundos.
+    """
+
+    __slots__ = ("campos", "filtro", "ttl", "concurrencia")
+
+    def __init__(self, campos: dict[str, "Campo | tuple[Campo, ...]"],
+                 filtro: SoupStrainer | None = None, ttl: float = TTL_FICHAS,
+                 concurrencia: int = 4):
+        self.campos = _alternativas(campos)
+        self.filtro = filtro
+        self.ttl = ttl
+        self.concurrencia = concurrencia
+
+
+class Esquema:
+    """
+    Listado de una fuente: 'campos' da un Campo (o una tupla de Campos,
+    el primero que devuelva algo) para cada campo de CAMPOS; 'estados'
+    se prueban en orden; una tarjeta sin alguno de 'requeridos' se salta.
+    'ficha' (opcional) completa los campos que falten con el detalle.
+    """
+
+    __slots__ = ("fuente", "url", "tarjeta", "campos", "estados", "requeridos",
+                 "filtro", "parametro_pagina", "ficha")
+
+    def __init__(self, fuente: str, url: str, tarjeta: str,
+                 campos: dict[str, "Campo | tuple[Campo, ...]"],
+                 estados: tuple[Estado, ...] = (), requeridos: tuple[str, ...] = (),
+                 filtro: SoupStrainer | None = None, parametro_pagina: str | None = None,
+                 ficha: Ficha | None = None):
+        self.fuente = fuente
+        self.url = url
+        self.tarjeta = soupsieve.compile(tarjeta)
+        self.campos = _alternativas(campos)
+        self.estados = estados
+        self.requeridos = requeridos
+        self.filtro = filtro
+        self.parametro_pagina = parametro_pagina
+        self.ficha = ficha
+
+    def __reduce__(self):
+        # Campos con lambdas y selectores compilados: a otro proceso (pool de
+        # parseo) viaja sólo la fuente y allí se toma scrapers.<fuente>.ESQUEMA
+        return _esquema_de, (self.fuente,)
+
+
+def _esquema_de(fuente: str) -> Esquema:
+    return importlib.import_module(f"scrapers.{fuente}").ESQUEMA
+
+
+def extraer_tarjeta(esquema: Esquema, tarjeta: Tag) -> Promocion | None:
+    """Aplica 'esquema' a una tarjeta; None si le falta un campo requerido."""
+    valores = {nombre: _valor(alternativas, tarjeta)
+               for nombre, alternativas in esquema.campos.items()}
+    if any(not valores.get(c) for c in esquema.requeridos):
+        return None
+
+    estado = next((e for e in (s.extraer(tarjeta) for s in esquema.estados) if e), None)
+    return Promocion(
+        esquema.fuente, valores.get("nombre"), valores.get("ubicacion"),
+        precio=valores.get("precio"),
+        dormitorios=valores.get("dormitorios"),
+        estado=estado,
+        url=valores.get("url"),
+    )
+
+
+def _tarjetas(esquema: Esquema, sesion) -> Iterator[Promocion]:
+    if isinstance(esquema.filtro, FiltroTarjetas):
+        # el esquema vive en scrapers/<fuente>.py: su código forma parte de la versión
+        modulo = getattr(sys.modules.get(f"scrapers.{esquema.fuente}"), "__file__", None)
+        version = firma_codigo(__file__, modulo) if modulo else firma_codigo(__file__)
+        yield from promociones_paginadas(
+            esquema.url, esquema.fuente, esquema.tarjeta,
+            functools.partial(extraer_tarjeta, esquema), esquema.filtro, version,
+            parametro=esquema.parametro_pagina, sesion=sesion)
+        return
+    for tarjeta in tarjetas_paginadas(esquema.url, esquema.fuente, esquema.tarjeta,
+                                      esquema.filtro, parametro=esquema.parametro_pagina,
+                                      sesion=sesion):
+        promo = extraer_tarjeta(esquema, tarjeta)
+        if promo:
+            yield promo
+
+
+def extraer(esquema: Esquema, sesion=None) -> Iterator[Promocion]:
+    """
+    Promociones del listado de 'esquema', según se parsea cada página
+    (completadas con su ficha si ENRIQUECER y el esquema la define).
+    """
+    promos = _tarjetas(esquema, sesion)
+    if ENRIQUECER and esquema.ficha:
+        promos = enriquecer(promos, esquema, MUNICIPIOS_ENRIQUECER, sesion)
+    return promos
+
+
+# ────────────────────────────────────────────────────────────────
+# Enriquecimiento con la página de detalle
+# ────────────────────────────────────────────────────────────────
+def enriquecer_para(municipios: frozenset[str]) -> None:
+    """Descarga fichas sólo de promociones en 'municipios' (unión de perfiles)."""
+    global MUNICIPIOS_ENRIQUECER
+    MUNICIPIOS_ENRIQUECER = municipios
+
+
+def _necesita_ficha(p: Promocion, esquema: Esquema, municipios: frozenset[str]) -> bool:
+    # sin enlace propio (la URL por defecto es la del listado) no hay ficha
+    if not (p.url and p.url.startswith("http")) or p.url == esquema.url:
+        return False
+    if all(getattr(p, c) is not None for c in esquema.ficha.campos):
+        return False
+    if p.municipio is None:
+        p.municipio = municipio(p.ubicacion)
+    return p.municipio in municipios
+
+
+def _completar(p: Promocion, fuente: str, ficha: Ficha, sesion) -> None:
+    """Descarga la ficha de 'p' y rellena los campos que le falten."""
+    with metricas.fuente(fuente):
+        try:
+            r = http_get(p.url, sesion=sesion, fuente=fuente, ttl=ficha.ttl)
+            r.raise_for_status()
+        except requests.RequestException as exc:
+            # la promoción sigue con lo que traía el listado
+            print(f"⚠️  {fuente}: ficha {p.url} → {exc!r}", file=sys.stderr, flush=True)
+            return
+        metricas.sumar("fichas")
+        soup = parsear_html(r.text, ficha.filtro)
+        for campo, alternativas in ficha.campos.items():
+            if getattr(p, campo) is None:
+                setattr(p, campo, _valor(alternativas, soup))
+
+
+def enriquecer(promos: Iterable[Promocion], esquema: Esquema,
+               municipios: frozenset[str], sesion=None) -> Iterator[Promocion]:
+    """
+    Completa con su ficha las promociones de 'promos' que lo necesiten
+    (ver _necesita_ficha) con ficha.concurrencia descargas a la vez, sin
+    dejar de leer el listado. Devuelve las promociones en el mismo orden,
+    cada una en cuanto está lista ella y las anteriores.
+    """
+    fuente, ficha = esquema.fuente, esquema.ficha
+    ventana = ficha.concurrencia * 4
+    pendientes: deque[tuple[Promocion, Future | None]] = deque()
+    pool = ThreadPoolExecutor(max_workers=ficha.concurrencia, thread_name_prefix=f"{fuente}-fichas")
+    try:
+        for p in promos:
+            futuro = (pool.submit(_completar, p, fuente, ficha, sesion)
+                      if _necesita_ficha(p, esquema, municipios) else None)
+            pendientes.append((p, futuro))
+            while pendientes and (len(pendientes) > ventana or pendientes[0][1] is None
+                                  or pendientes[0][1].done()):
+                p0, f0 = pendientes.popleft()
+                if f0:
+                    f0.result()
+                yield p0
+        while pendientes:
+            p0, f0 = pendientes.popleft()
+            if f0:
+                f0.result()
+            yield p0
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
@@ -1,133 +1,65 @@
 # scrapers/atica.py
 # ───────────────────────────────────────────────────────────────
-import re
-import sys
-import time
-import unicodedata
+from typing import Iterator
 
 import cloudscraper
-from bs4 import BeautifulSoup
 
-from utils import (
-    HEADERS,
-    LOCALIZACIONES_DESEADAS,
-    PRECIO_MAXIMO,
-    HABITACIONES_MINIMAS,
-    limpiar_y_convertir_a_numero,
+from scrapers._motor import (
+    DORMITORIOS_EN_TEXTO, PRECIO_EN_TEXTO, Campo, Esquema, Estado, Ficha, extraer,
 )
+from utils import NUEVO_PROYECTO, SIN_NOMBRE, FiltroTarjetas, Promocion, preparar_sesion
 
+# Sin tope de precio en la URL: cada perfil tiene el suyo y lo aplica
+# Perfil.motivo_descarte; un tope fijo aquí se comería los de los demás
 LISTADO_URL = (
     "https://grupo-atica.com/propiedades/public/"
     "?obranueva_viviendas=2&order=&quantity=&disposicion=listado"
     "&tipologia=&comprar_alquilar=&tipo_inmueble=0"
     "&provincia=Valencia&localidad=&habitaciones=&banyos="
-    "&price=0%2C270000"
 )
 
-
-# ── helpers ────────────────────────────────────────────────────
-def _norm(texto: str) -> str:
-    """Minúsculas sin tildes ni espacios extremos."""
-    return (
-        unicodedata.normalize("NFKD", texto)
-        .encode("ascii", "ignore")
-        .decode()
-        .lower()
-        .strip()
-    )
+OBLIGATORIOS = ("precio",)
+
+# Parseo rápido: sólo se construyen las tarjetas
+FILTRO_TARJETAS = FiltroTarjetas(("div", {"class": "item-vivienda"}))
+
+
+# Listado declarativo (ver scrapers/_motor.py)
+ESQUEMA = Esquema(
+    "atica", LISTADO_URL, "div.item-vivienda",
+    campos={
+        "nombre":      Campo("h3", defecto=SIN_NOMBRE),
+        "ubicacion":   Campo("div.col-md-7", defecto=""),
+        "url":         Campo("a.cont[href]", atributo="href", defecto=LISTADO_URL),
+        # atributo de la tarjeta o, si no, <span class="…habitaciones…">
+        "dormitorios": (Campo(atributo="data-numhabitaciones", numero="primero"),
+                        Campo("span[class*=habitaciones i]", numero="primero")),
+        # primer número seguido de ‘€’ en la tarjeta
+        "precio":      Campo(patron=r"\d[\d.]*\s*€", numero="primero"),
+    },
+    estados=(Estado("span[class*=badge]", "nuevo proyecto", NUEVO_PROYECTO),),
+    filtro=FILTRO_TARJETAS,
+    # Tarjetas con "—" en vez de precio: se completan con la ficha
+    ficha=Ficha({
+        "precio":      (Campo("[class*=precio i]", patron=r"\d[\d.]*\s*€", numero="primero"),
+                        PRECIO_EN_TEXTO),
+        "dormitorios": (Campo("[class*=habitaciones i]", numero="maximo"), DORMITORIOS_EN_TEXTO),
+    }),
+)
 
 
-def _municipio(cadena_ubic: str) -> str:
+# ── scraper ────────────────────────────────────────────────────
+def iterar() -> Iterator[Promocion]:
     """
-    Devuelve el municipio sin la palabra 'valencia' ni separadores
-    '.', '·', '-', '|'.
+    Promociones del listado según se parsea cada página. Un fallo al
+    descargar la primera (p. ej. el reto de Cloudflare) se propaga y el
+    orquestador marca la fuente como caída.
     """
-    sin_prov = re.sub(r"\bvalencia\b", "", cadena_ubic, flags=re.I)
-    limpio = re.sub(r"[.\-·|]", " ", sin_prov)
-    limpio = re.sub(r"\s+", " ", limpio)
-    return _norm(limpio)
-
-
-def _precio_desde_card(card: BeautifulSoup) -> int | None:
-    """Devuelve el primer número seguido de ‘€’ dentro de la tarjeta."""
-    m = re.search(r"\d[\d.]*\s*€", card.get_text(" ", strip=True))
-    return limpiar_y_convertir_a_numero(m.group(0)) if m else None
-
-
-# ── scraper ────────────────────────────────────────────────────
-def scrape() -> list[str]:
-    scraper = cloudscraper.create_scraper(
+    scraper = preparar_sesion(cloudscraper.create_scraper(
         browser={"browser": "firefox", "platform": "windows", "mobile": False}
-    )
-    try:
-        html = scraper.get(LISTADO_URL, headers=HEADERS, timeout=30).text
-    except Exception as exc:
-        print(f"⚠️  Ática: error al descargar la página → {exc}", file=sys.stderr)
-        return []
-
-    soup = BeautifulSoup(html, "html.parser")
-    cards = soup.select("div.item-vivienda")
-    print(f"[DEBUG] ÁTICA → {len(cards)} tarjetas totales", flush=True)
-
-    resultados: list[str] = []
-
-    for card in cards:
-        # ─ Nombre ─────────────────────────────────────────────
-        h3 = card.find("h3")
-        nombre = h3.get_text(" ", strip=True) if h3 else "SIN NOMBRE"
-
-        # ─ Ubicación ─────────────────────────────────────────
-        loc_tag = card.find("div", class_=re.compile(r"\bcol-md-7\b"))
-        ubic_raw = loc_tag.get_text(" ", strip=True) if loc_tag else ""
-        municipio = _municipio(ubic_raw)
-
-        if not any(_norm(l) in municipio for l in LOCALIZACIONES_DESEADAS):
-            continue
-
-        # ─ Enlace ────────────────────────────────────────────
-        link = card.select_one("a.cont[href]")
-        url_promo = link["href"] if link else LISTADO_URL
-
-        # ─ Indicador “Nuevo proyecto” ───────────────────────
-        badge = card.find("span", class_=re.compile("badge"))
-        es_nuevo = badge and "nuevo proyecto" in badge.get_text(strip=True).lower()
-
-        # ─ Dormitorios ──────────────────────────────────────
-        dormitorios = limpiar_y_convertir_a_numero(card.get("data-numhabitaciones"))
-        if dormitorios is None:
-            hab_tag = card.find("span", class_=re.compile("habitaciones", re.I))
-            dormitorios = limpiar_y_convertir_a_numero(
-                hab_tag.get_text() if hab_tag else None
-            )
-
-        # ─ Precio ───────────────────────────────────────────
-        precio = _precio_desde_card(card)
-
-        # ─ Tarjetas “Nuevo proyecto” ────────────────────────
-        if es_nuevo:
-            resultados.append(
-                f"\n*{nombre} (Ática – Nuevo proyecto)*"
-                f"\n📍 {ubic_raw.title()}"
-                f"\n🔗 [Ver promoción]({url_promo})"
-            )
-            continue
-
-        # ─ Filtros en venta ─────────────────────────────────
-        if (
-            precio is None
-            or precio > PRECIO_MAXIMO
-            or (dormitorios is not None and dormitorios < HABITACIONES_MINIMAS)
-        ):
-            continue
+    ))
+    return extraer(ESQUEMA, sesion=scraper)
 
-        resultados.append(
-            f"\n*{nombre} (Ática)*"
-            f"\n📍 {ubic_raw.title()}"
-            f"\n💶 Desde: {precio:,}€"
-            f"\n🛏️ Dorms: {dormitorios if dormitorios else '—'}"
-            f"\n🔗 [Ver promoción]({url_promo})".replace(",", ".")
-        )
-        time.sleep(0.3)
 
-    print(f"[DEBUG] ÁTICA filtradas → {len(resultados)}", flush=True)
-    return resultados
\ No newline at end of file
+def scrape() -> list[Promocion]:
+    return list(iterar())
@@ -3,45 +3,58 @@
 """
 Scraper FICSA
 
-1) Visita https://www.ficsa.es/promociones/  → recoge todos los enlaces
-   /promociones/<slug>/
-2) En cada ficha extrae:
+1) Visita https://www.ficsa.es/promociones/ (y sus páginas siguientes)
+   → recoge los enlaces /promociones/<slug>/ (como mucho MAX_PROMOCIONES)
+2) Descarga las fichas en paralelo (CONCURRENCIA hilos, limitados además
+   por utils.PETICIONES_SIMULTANEAS_POR_HOST) y en cada una extrae:
       • Nombre (h1 / h2)
       • Localización  (<p class="description">)
       • Precio mínimo (primer número tras «Desde» en <p class="value"> del bloque
                        “RANGO DE PRECIOS”)
       • Dormitorios   (mínimo antes de “dormitorio”)
-3) Filtra:
-      • ciudad ∈ utils.LOCALIZACIONES_DESEADAS
-      • precio ≤ utils.PRECIO_MAXIMO  (si existe)
-      • dorms  ≥ utils.HABITACIONES_MINIMAS (si existe)
-4) Devuelve bloques Markdown listos para Telegram.
+3) Devuelve una Promocion por ficha, en el orden del listado y según van
+   llegando; precio y dormitorios son opcionales (utils.cumple_filtros
+   sólo los aplica si existen).
+
+Una ficha cuya región de datos (FILTRO_FICHA) tiene la misma huella que la
+última vez no se vuelve a parsear: se reutiliza lo extraído (huellas.py).
+La región cubre todo lo que pueden leer los extractores (los dormitorios
+y la ubicación de respaldo salen de cualquier parte de la página).
+Con SCRAPER_PROCESOS_PARSEO=N las fichas grandes se parsean en el pool de
+procesos (utils.parsear_en_proceso), así que el parseo usa N núcleos.
 """
 
 from __future__ import annotations
-import html, re, time, unicodedata, requests
+import html, logging, re, requests
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import Iterator
 from bs4 import BeautifulSoup
+import metricas
+from deduplicar import url_canonica
+from scrapers._motor import TTL_FICHAS
 from utils import (
-    HEADERS,
-    LOCALIZACIONES_DESEADAS,
-    PRECIO_MAXIMO,
-    HABITACIONES_MINIMAS,
+    MAX_PROMOCIONES, MEMO_HUELLAS, PROCESOS_PARSEO, FiltroTarjetas, Promocion,
+    fila_promocion, firma_codigo, http_get, parsear_en_proceso, parsear_html,
+    promocion_desde_fila, tarjetas_paginadas,
 )
 
+log = logging.getLogger(__name__)
+
 LIST_URL = "https://www.ficsa.es/promociones/"
+CONCURRENCIA = max(4, PROCESOS_PARSEO)  # fichas descargándose y parseándose a la vez
 
-# ───────────────────────────── helpers ─────────────────────────
-def _norm(txt: str) -> str:
-    return (
-        unicodedata.normalize("NFKD", txt)
-        .encode("ascii", "ignore")
-        .decode()
-        .lower()
-    )
+OBLIGATORIOS = ()
 
-_ciudades = [re.escape(c) for c in LOCALIZACIONES_DESEADAS]
-CIUDADES_RE = re.compile(r"\b(" + "|".join(_ciudades) + r")\b", re.I)
+# Parseo rápido del listado: sólo los enlaces (las fichas se parsean enteras)
+FILTRO_ENLACES = FiltroTarjetas(("a", {"href": True}))
 
+# Región de la ficha de la que sale la Promocion (para su huella): la página
+# entera sin scripts ni estilos, porque _extract_dorms y _extract_location
+# pueden leer cualquier texto (get_text incluye el <title>)
+FILTRO_FICHA = FiltroTarjetas(("title", {}), ("body", {}))
+
+# ───────────────────────────── helpers ─────────────────────────
 def _extract_price(soup: BeautifulSoup) -> int | None:
     """
     Devuelve el número tras «Desde» dentro del bloque RANGO DE PRECIOS.
@@ -78,68 +91,77 @@ def _extract_dorms(soup: BeautifulSoup) -> int | None:
 
 # ───────────────────────── paso A: enlaces ─────────────────────
 def _get_promo_links() -> list[str]:
-    resp = requests.get(LIST_URL, headers=HEADERS, timeout=30)
-    resp.raise_for_status()
-    soup = BeautifulSoup(resp.text, "html.parser")
-
     links = []
-    for a in soup.select("a[href*='/promociones/']"):
+    for a in tarjetas_paginadas(LIST_URL, "ficsa", "a[href*='/promociones/']", FILTRO_ENLACES):
         href = a["href"]
-        if href.endswith("/promociones/"):
+        if href.endswith("/promociones/") or "/page/" in href:
             continue
         abs_url = href if href.startswith("http") else f"https://www.ficsa.es{href}"
         links.append(abs_url)
-    return list(dict.fromkeys(links))
+    # Variantes del mismo enlace (barra final, ?utm_…, #galeria): una ficha
+    unicos = {}
+    for link in links:
+        unicos.setdefault(url_canonica(link), link)
+    return list(islice(unicos.values(), MAX_PROMOCIONES))
 
 # ───────────────────────── paso B: ficha ───────────────────────
-def _parse_promotion(url: str) -> dict | None:
-    try:
-        html_page = requests.get(url, headers=HEADERS, timeout=30).text
-    except requests.RequestException:
-        return None
-
-    soup  = BeautifulSoup(html_page, "html.parser")
+def _parse_promotion(url: str) -> Promocion | None:
+    # Los hilos del pool no heredan la fuente del orquestador
+    with metricas.fuente("ficsa"):
+        try:
+            html_page = http_get(url, fuente="ficsa", ttl=TTL_FICHAS).text
+        except requests.RequestException:
+            return None
+        metricas.sumar("fichas")
+
+        huella = FILTRO_FICHA.huella(html_page) if MEMO_HUELLAS.activo else None
+        if huella:
+            clave, version = f"ficsa {url}", f"{firma_codigo(__file__)}:{huella[0]}"
+            guardado = MEMO_HUELLAS.leer(clave, version)
+            if guardado is not None:
+                metricas.sumar("huellas")
+                return promocion_desde_fila(guardado) if guardado else None
+        promo = parsear_en_proceso(_promocion_de_html, html_page, url)
+
+    if huella:
+        MEMO_HUELLAS.guardar(clave, version, fila_promocion(promo) if promo else {})
+    return promo
+
+def _promocion_de_html(html_page: str, url: str) -> Promocion | None:
+    return _promocion(parsear_html(html_page), url)
+
+def _promocion(soup: BeautifulSoup, url: str) -> Promocion | None:
     h_tag = soup.find(["h1", "h2"])
-    nombre = h_tag.get_text(" ", strip=True) if h_tag else None
-
-    ubic   = _extract_location(soup)
-    precio = _extract_price(soup)
-    dorms  = _extract_dorms(soup)
+    if not h_tag:
+        return None
 
-    return {"nombre": nombre, "ubic": ubic, "precio": precio, "dorms": dorms, "url": url}
+    return Promocion(
+        "ficsa",
+        h_tag.get_text(" ", strip=True),
+        _extract_location(soup),
+        precio=_extract_price(soup),
+        dormitorios=_extract_dorms(soup),
+        url=url,
+    )
 
 # ───────────────────────── scraper principal ───────────────────
-def scrape() -> list[str]:
+def iterar() -> Iterator[Promocion]:
     enlaces = _get_promo_links()
-    print(f"[DEBUG] FICSA enlaces → {len(enlaces)}", flush=True)
+    log.debug("FICSA enlaces → %d", len(enlaces))
 
-    mensajes: list[str] = []
-    for link in enlaces:
-        d = _parse_promotion(link)
-        if not d or not d["nombre"]:
-            continue
+    # Las fichas se descargan y parsean en paralelo; se devuelven en el
+    # orden del listado en cuanto está lista cada una. Si el consumidor
+    # deja de iterar se cancelan las que aún no han empezado.
+    pool = ThreadPoolExecutor(max_workers=CONCURRENCIA, thread_name_prefix="ficsa")
+    try:
+        futuros = [pool.submit(_parse_promotion, link) for link in enlaces]
+        for fut in futuros:
+            p = fut.result()
+            if p and p.nombre:
+                yield p
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
 
-        # Filtros
-        if not CIUDADES_RE.search(_norm(d["ubic"])):
-            continue
-        if d["precio"] and d["precio"] > PRECIO_MAXIMO:
-            continue
-        if d["dorms"] and d["dorms"] < HABITACIONES_MINIMAS:
-            continue
 
-        # Markdown
-        lineas = [
-            f"*{d['nombre']} (FICSA)*",
-            f"📍 {d['ubic'].title() if d['ubic'] else ''}",
-        ]
-        if d["precio"]:
-            lineas.append(f"💶 Desde: {d['precio']:,}€".replace(",", "."))
-        if d["dorms"]:
-            lineas.append(f"🛏️ Dorms: {d['dorms']}")
-        lineas.append(f"🔗 [Ver promoción]({d['url']})")
-
-        mensajes.append("\n".join(lineas))
-        time.sleep(0.2)
-
-    print(f"[DEBUG] FICSA filtradas → {len(mensajes)}", flush=True)
-    return mensajes
+def scrape() -> list[Promocion]:
+    return list(iterar())
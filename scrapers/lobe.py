@@ -6,53 +6,46 @@ Scraper Grupo LOBE
 - Cada ficha está en un <label class="container-check">   e incluye:
       <span class="promo">NOMBRE</span>
       <span class="zona">LOCALIZACIÓN</span>
- - Se considera válida si la LOCALIZACIÓN contiene alguna de
-  LOCALIZACIONES_DESEADAS (definidas en utils.py).
+- El listado no trae precio ni dormitorios: sólo se filtra por
+  LOCALIZACIONES_DESEADAS (definidas en utils.py), salvo con
+  SCRAPER_ENRIQUECER=1, que los toma de la ficha de cada promoción.
 """
-import re, time, unicodedata, requests
-from bs4 import BeautifulSoup
-from utils import HEADERS, LOCALIZACIONES_DESEADAS
+from typing import Iterator
 
-URL = "https://www.grupolobe.com/pisos-obra-nueva-valencia/"
-
-def _norm(txt: str) -> str:
-    """Minúsculas sin tildes ni espacios extremos."""
-    return (
-        unicodedata.normalize("NFKD", txt)
-        .encode("ascii", "ignore")
-        .decode()
-        .lower()
-        .strip()
-    )
-
-def scrape() -> list[str]:
-    html = requests.get(URL, headers=HEADERS, timeout=30).text
-    soup = BeautifulSoup(html, "html.parser")
-
-    cards = soup.select("label.container-check")
-    print(f"[DEBUG] LOBE → {len(cards)} tarjetas totales", flush=True)
-
-    resultados: list[str] = []
+from scrapers._motor import (
+    DORMITORIOS_EN_TEXTO, PRECIO_EN_TEXTO, Campo, Esquema, Ficha, extraer,
+)
+from utils import SIN_NOMBRE, FiltroTarjetas, Promocion
 
-    for c in cards:
-        nombre_tag = c.find("span", class_="promo")
-        nombre = nombre_tag.get_text(" ", strip=True) if nombre_tag else "SIN NOMBRE"
-
-        zona_tag = c.find("span", class_="zona")
-        ubic_raw = zona_tag.get_text(" ", strip=True) if zona_tag else ""
-        if not any(_norm(l) in _norm(ubic_raw) for l in LOCALIZACIONES_DESEADAS):
-            continue
-
-        # enlace: la web usa checkboxes; construimos URL por slug de value
-        value = c.find("input", {"value": True})["value"]
-        url_promo = f"https://www.grupolobe.com/{value}" if value else URL
-
-        resultados.append(
-            f"\n*{nombre} (LOBE)*"
-            f"\n📍 {ubic_raw.title()}"
-            f"\n🔗 [Ver promoción]({url_promo})"
-        )
-        time.sleep(0.15)
+URL = "https://www.grupolobe.com/pisos-obra-nueva-valencia/"
 
-    print(f"[DEBUG] LOBE filtradas → {len(resultados)}", flush=True)
-    return resultados
+OBLIGATORIOS = ()
+
+# Parseo rápido: sólo se construyen las tarjetas
+FILTRO_TARJETAS = FiltroTarjetas(("label", {"class": "container-check"}))
+
+# Listado declarativo (ver scrapers/_motor.py). La web usa checkboxes: la
+# URL se construye con el slug del value del <input>.
+ESQUEMA = Esquema(
+    "lobe", URL, "label.container-check",
+    campos={
+        "nombre":    Campo("span.promo", defecto=SIN_NOMBRE),
+        "ubicacion": Campo("span.zona", defecto=""),
+        "url":       Campo("input[value]", atributo="value",
+                           prefijo="https://www.grupolobe.com/", defecto=URL),
+    },
+    filtro=FILTRO_TARJETAS,
+    # Precio y dormitorios sólo están en la ficha
+    ficha=Ficha({
+        "precio":      (Campo("[class*=precio i]", patron=r"\d[\d.]*\s*€", numero="primero"),
+                        PRECIO_EN_TEXTO),
+        "dormitorios": (Campo("[class*=dormitorio i]", numero="maximo"), DORMITORIOS_EN_TEXTO),
+    }),
+)
+
+def iterar() -> Iterator[Promocion]:
+    """Promociones del listado según se parsea cada página."""
+    return extraer(ESQUEMA)
+
+def scrape() -> list[Promocion]:
+    return list(iterar())
@@ -3,82 +3,48 @@
 """
 Scraper Urbania – solo promociones EN VENTA
 
-Filtros:
-    • localidad ∈ LOCALIZACIONES_DESEADAS
-    • (precio ≤ PRECIO_MAXIMO 𝚘 ‘ÚLTIMAS UNIDADES’)
-    • dormitorios ≥ HABITACIONES_MINIMAS
+Campos extraídos: nombre, localidad, dormitorios (máximo de la línea) y
+precio o la marca “ÚLTIMAS UNIDADES” (que exime del filtro de precio).
+Con SCRAPER_ENRIQUECER=1 el precio y los dormitorios que falten se toman
+de la ficha del proyecto.
 """
-import re, time, unicodedata, requests
-from bs4 import BeautifulSoup
-from utils import (
-    HEADERS, LOCALIZACIONES_DESEADAS,
-    PRECIO_MAXIMO, HABITACIONES_MINIMAS,
-)
-
-URL     = "https://urbania.es/proyectos/valencia/"
-NUM_RE  = re.compile(r"\d[\d.,]*")
-
-def _num(txt: str | None, pick_max=False) -> int | None:
-    if not txt: return None
-    nums = [int(n.replace(".", "").replace(",", "")) for n in NUM_RE.findall(txt)]
-    return max(nums) if (pick_max and nums) else (nums[0] if nums else None)
-
-def _norm(s: str) -> str:
-    return unicodedata.normalize("NFKD", s).encode("ascii", "ignore").decode().lower()
-
-def scrape() -> list[str]:
-    html  = requests.get(URL, headers=HEADERS, timeout=30).text
-    soup  = BeautifulSoup(html, "html.parser")
-    cards = soup.select("div.vivienda div.row")
-    print(f"[DEBUG] URBANIA → {len(cards)} tarjetas totales", flush=True)
-
-    resultados = []
-
-    for c in cards:
-        # ── nombre y ubicación ─────────────────────────────────
-        h2 = c.find("h2")
-        nombre = h2.get_text(" ", strip=True) if h2 else "SIN NOMBRE"
+from typing import Iterator
 
-        h3 = c.find("h3")
-        ubic_raw = h3.get_text(" ", strip=True) if h3 else ""
-        if not any(_norm(l) in _norm(ubic_raw) for l in LOCALIZACIONES_DESEADAS):
-            continue
-
-        # ── dormitorios (máx. de la línea) ─────────────────────
-        dorm_tag = c.find("p", class_=re.compile("carac"))
-        dormitorios = _num(dorm_tag.get_text(), pick_max=True) if dorm_tag else None
-        if dormitorios is None or dormitorios < HABITACIONES_MINIMAS:
-            continue
-
-        # ── precio 𝚘 “últimas unidades” ───────────────────────
-        strong = c.find("strong")
-        ultimas = False
-        precio  = None
-        if strong:
-            s_txt  = strong.get_text(" ", strip=True)
-            ultimas = "ultima" in _norm(s_txt)
-            if not ultimas:
-                precio = _num(s_txt)
-
-        # requiere precio válido o flag “últimas unidades”
-        if not ultimas and (precio is None or precio > PRECIO_MAXIMO):
-            continue
-
-        # ── enlace ────────────────────────────────────────────
-        link = c.find_parent("a", href=True)
-        url  = link["href"] if link else URL
+from scrapers._motor import (
+    DORMITORIOS_EN_TEXTO, PRECIO_EN_TEXTO, Campo, Esquema, Estado, Ficha, extraer,
+)
+from utils import SIN_NOMBRE, FiltroTarjetas, Promocion, ULTIMAS_UNIDADES
+
+URL = "https://urbania.es/proyectos/valencia/"
+
+OBLIGATORIOS = ("precio", "dormitorios")
+
+# Parseo rápido: tarjetas y enlaces (el enlace envuelve la tarjeta)
+FILTRO_TARJETAS = FiltroTarjetas(("a", {}), ("div", {"class": "vivienda"}))
+
+# Listado declarativo (ver scrapers/_motor.py)
+ESQUEMA = Esquema(
+    "urbania", URL, "div.vivienda div.row",
+    campos={
+        "nombre":      Campo("h2", defecto=SIN_NOMBRE),
+        "ubicacion":   Campo("h3", defecto=""),
+        "dormitorios": Campo("p[class*=carac]", numero="maximo"),   # máx. de la línea
+        "precio":      Campo("strong", numero="primero"),
+        "url":         Campo(padre="a", atributo="href", defecto=URL),   # el enlace envuelve la tarjeta
+    },
+    # <strong> trae el precio 𝚘 “últimas unidades”
+    estados=(Estado("strong", "ultima", ULTIMAS_UNIDADES),),
+    filtro=FILTRO_TARJETAS,
+    ficha=Ficha({
+        "precio":      (Campo("[class*=precio i]", patron=r"\d[\d.]*\s*€", numero="primero"),
+                        PRECIO_EN_TEXTO),
+        "dormitorios": (Campo("[class*=caracteristicas i]", numero="maximo"), DORMITORIOS_EN_TEXTO),
+    }),
+)
 
-        # ── bloque markdown ───────────────────────────────────
-        titulo = f"{nombre} (Urbania{' – Últimas unidades' if ultimas else ''})"
-        linea_precio = "Últimas unidades" if ultimas else f"Desde: {precio:,}€"
-        resultados.append(
-            f"\n*{titulo}*"
-            f"\n📍 {ubic_raw.title()}"
-            f"\n💶 {linea_precio}"
-            f"\n🛏️ Dorms: {dormitorios}"
-            f"\n🔗 [Ver promoción]({url})".replace(",", ".")
-        )
-        time.sleep(0.15)
+def iterar() -> Iterator[Promocion]:
+    """Promociones del listado según se parsea cada página."""
+    return extraer(ESQUEMA)
 
-    print(f"[DEBUG] URBANIA filtradas → {len(resultados)}", flush=True)
-    return resultados
+def scrape() -> list[Promocion]:
+    return list(iterar())
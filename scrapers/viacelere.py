@@ -4,35 +4,39 @@
 Scraper Vía Célere:
   • Lee el listado de promociones en venta (provincia de Valencia)
   • Lee el listado de promociones “Próximamente”
-  • Filtra por LOCALIZACIONES_DESEADAS; aplica precio y dormitorios
-    solo a las tarjetas en comercialización.
+  • Las tarjetas “Próximamente” sólo se filtran por localización; precio
+    y dormitorios se aplican a las que están en comercialización.
+  • Una página cuya región de tarjetas no ha cambiado desde la última vez
+    no se vuelve a parsear (utils.promociones_paginadas).
 """
+import functools
 import re
-import requests
+from typing import Iterator
+
 from bs4 import BeautifulSoup
 from utils import (
-    HEADERS,
-    LOCALIZACIONES_DESEADAS,
-    PRECIO_MAXIMO,
-    HABITACIONES_MINIMAS,
+    PROXIMAMENTE,
+    FiltroTarjetas,
+    Promocion,
+    firma_codigo,
     limpiar_y_convertir_a_numero,
+    promociones_paginadas,
 )
 
 LISTADO_URL = "https://www.viacelere.com/promociones?provincia_id=46"
 PROX_URL    = "https://www.viacelere.com/promociones/proximamente"
 
+OBLIGATORIOS = ("dormitorios",)
 
-# ───────────────────────── helpers ──────────────────────────
-def _extraer_tarjetas(html: str) -> list[BeautifulSoup]:
-    """Devuelve la lista de nodos <div class='card-promocion'> que haya en el HTML."""
-    soup = BeautifulSoup(html, "html.parser")
-    return soup.select("div.card-promocion")
+# Parseo rápido: tarjetas y enlaces (el enlace puede envolver la tarjeta)
+FILTRO_TARJETAS = FiltroTarjetas(("a", {}), ("div", {"class": "card-promocion"}))
 
 
-def _procesar_tarjeta(card: BeautifulSoup, es_prox: bool) -> str | None:
+# ───────────────────────── helpers ──────────────────────────
+def _procesar_tarjeta(card: BeautifulSoup, es_prox: bool) -> Promocion | None:
     """
-    Convierte una tarjeta en bloque Markdown si cumple los filtros.
-    Devuelve None si debe descartarse.
+    Convierte una tarjeta en Promocion.
+    Devuelve None si la tarjeta no tiene el formato esperado.
     """
     # ─ título ──────────────────────────────────────────────
     h2_tag = card.select_one("h2.title-size-4") or card.select_one("h2")
@@ -44,7 +48,7 @@ def _procesar_tarjeta(card: BeautifulSoup, es_prox: bool) -> str | None:
 
     # ─ enlace ──────────────────────────────────────────────
     link = card.find_parent("a") or card.select_one("a.button")
-    url_promo = link["href"] if (link and link.has_attr("href")) else "SIN URL"
+    url_promo = link["href"] if (link and link.has_attr("href")) else None
 
     # ─ ubicación, estado, dormitorios ─────────────────────
     ubic, estado, dorm_txt = None, None, None
@@ -57,59 +61,36 @@ def _procesar_tarjeta(card: BeautifulSoup, es_prox: bool) -> str | None:
         elif "comercialización" in low or "próximamente" in low:
             estado = p.get_text(strip=True)
 
-    # Filtrado mínimo por ubicación
-    if not (ubic and any(loc in ubic for loc in LOCALIZACIONES_DESEADAS)):
+    if not ubic:
         return None
 
     # Si viene de /proximamente o el estado contiene “próxim…”
     if es_prox or (estado and "próxim" in estado.lower()):
-        return (
-            f"\n*{nombre} (Vía Célere ‒ Próximamente)*"
-            f"\n📍 {ubic.title()}"
-            f"\n🔗 [Ver promoción]({url_promo})"
-        )
+        return Promocion("viacelere", nombre, ubic, estado=PROXIMAMENTE, url=url_promo)
 
     # ─ precio + dormitorios (en comercialización) ──────────
     precio_tag = card.select_one("div.precio")
     precio_txt = precio_tag.get_text(strip=True) if precio_tag else None
-    precio     = limpiar_y_convertir_a_numero(precio_txt)
-    dormitorios = limpiar_y_convertir_a_numero(dorm_txt)
-
-    if dormitorios is None or dormitorios < HABITACIONES_MINIMAS:
-        return None
-    if precio is not None and precio > PRECIO_MAXIMO:
-        return None
 
-    return (
-        f"\n*{nombre} (Vía Célere)*"
-        f"\n📍 {ubic.title()}"
-        f"\n💶 Desde: {precio:,}€" if precio else ""
-        f"\n🛏️ Dorms: {dormitorios}"
-        f"\n🔗 [Ver promoción]({url_promo})".replace(",", ".")
+    return Promocion(
+        "viacelere", nombre, ubic,
+        precio=limpiar_y_convertir_a_numero(precio_txt),
+        dormitorios=limpiar_y_convertir_a_numero(dorm_txt),
+        url=url_promo,
     )
 
 
 # ───────────────────────── entrypoint ───────────────────────
-def scrape() -> list[str]:
-    resultados: list[str] = []
-
-    # 1 ▸ Listado en venta
-    html = requests.get(LISTADO_URL, headers=HEADERS, timeout=30).text
-    cards = _extraer_tarjetas(html)
-    print(f"[DEBUG] VÍA CÉLERE (venta) → {len(cards)} tarjetas", flush=True)
-    for c in cards:
-        bloque = _procesar_tarjeta(c, es_prox=False)
-        if bloque:
-            resultados.append(bloque)
-
-    # 2 ▸ Listado Próximamente
-    html = requests.get(PROX_URL, headers=HEADERS, timeout=30).text
-    cards = _extraer_tarjetas(html)
-    print(f"[DEBUG] VÍA CÉLERE (próx.) → {len(cards)} tarjetas", flush=True)
-    for c in cards:
-        bloque = _procesar_tarjeta(c, es_prox=True)
-        if bloque:
-            resultados.append(bloque)
-
-    print(f"[DEBUG] VÍA CÉLERE filtradas → {len(resultados)}", flush=True)
-    return resultados
\ No newline at end of file
+def iterar() -> Iterator[Promocion]:
+    """Promociones de ambos listados según se parsea cada página."""
+    # 1 ▸ Listado en venta, 2 ▸ Listado Próximamente
+    for url, es_prox in ((LISTADO_URL, False), (PROX_URL, True)):
+        yield from promociones_paginadas(
+            url, "viacelere", "div.card-promocion",
+            functools.partial(_procesar_tarjeta, es_prox=es_prox), FILTRO_TARJETAS,
+            firma_codigo(__file__),
+        )
+
+
+def scrape() -> list[Promocion]:
+    return list(iterar())
@@ -0,0 +1,52 @@
+# tests/test_almacen.py
+# ────────────────────────────────────────────────────────────────
+"""Detección de cambios e histórico de precios (almacen)."""
+
+from almacen import ESTADO, NUEVA, PRECIO, AlmacenPromociones
+
+URL = "https://x.es/torre-a"
+
+
+def test_recuerda_lo_visto_entre_ejecuciones(tmp_path):
+    ruta = str(tmp_path / "promociones.sqlite")
+    with AlmacenPromociones(ruta) as almacen:
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3) == (NUEVA, None)
+        assert almacen.registrar("aedas", URL, "Torre A", 200_000, 3) == (NUEVA, None)
+    with AlmacenPromociones(ruta) as almacen:
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3) is None
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3, "Últimas unidades") == (
+            ESTADO, None)
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3) == (
+            ESTADO, "Últimas unidades")
+
+
+def test_precio_ausente_conserva_el_ultimo_conocido(tmp_path):
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3) == (NUEVA, None)
+        assert almacen.registrar("lobe", URL, "Torre A", None, None) is None
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000, 3) is None
+        assert almacen.registrar("lobe", URL, "Torre A", 190_000, 3) == (PRECIO, 200_000)
+        historico = almacen._con.execute(
+            "SELECT precio, dormitorios FROM historico ORDER BY momento").fetchall()
+        assert almacen.minimos() == [("lobe", URL, "Torre A", 190_000, 190_000)]
+    assert None not in (v for fila in historico for v in fila)
+
+
+def test_primer_precio_conocido_no_es_un_cambio(tmp_path):
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        assert almacen.registrar("lobe", URL, "Torre A") == (NUEVA, None)
+        assert almacen.registrar("lobe", URL, "Torre A", 200_000) is None
+        assert almacen.precio_minimo("lobe", URL) == 200_000
+
+
+def test_cambios_de_precio_recientes(tmp_path):
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        for dia, precio in ((0, 200_000), (1, None), (2, 190_000), (3, 190_000), (10, 195_000)):
+            almacen._ahora = dia * 86_400
+            almacen.registrar("lobe", URL, "Torre A", precio)
+        assert almacen.cambios_precio(30) == [
+            ("lobe", URL, "Torre A", 10 * 86_400, 190_000, 195_000),
+            ("lobe", URL, "Torre A", 2 * 86_400, 200_000, 190_000),
+        ]
+        assert almacen.cambios_precio(5) == [
+            ("lobe", URL, "Torre A", 10 * 86_400, 190_000, 195_000)]
@@ -0,0 +1,38 @@
+# tests/test_bandeja.py
+# ────────────────────────────────────────────────────────────────
+"""Idempotencia, orden y descartes de la bandeja de salida."""
+
+from bandeja import Bandeja
+
+
+def test_clave_logica_y_no_contenido(tmp_path):
+    bandeja = Bandeja(str(tmp_path / "bandeja.sqlite"))
+    assert bandeja.encolar("1:ana", "123", ["hola", "adiós"]) == 2
+    assert bandeja.encolar("1:ana", "123", ["hola", "adiós"]) == 0    # misma notificación
+    assert bandeja.encolar("2:ana", "123", ["hola", "adiós"]) == 2    # otra pasada, mismo texto
+    enviados = []
+    assert bandeja.despachar(lambda d, t, pm: enviados.append(t) or True) == (4, 0)
+    assert enviados == ["hola", "adiós", "hola", "adiós"]
+    assert bandeja.encolar("2:ana", "123", ["hola"]) == 0             # ya enviada: se recuerda
+
+
+def test_rechazo_definitivo_no_bloquea_el_chat(tmp_path):
+    bandeja = Bandeja(str(tmp_path / "bandeja.sqlite"))
+    bandeja.encolar("1:ana", "123", ["malo", "bueno"])
+    bandeja.encolar("1:luis", "456", ["caído"])
+    enviados = []
+
+    def enviar(destino, texto, parse_mode):
+        if texto == "malo":
+            return None
+        if destino == "456":
+            return False
+        enviados.append(texto)
+        return True
+
+    assert bandeja.despachar(enviar) == (1, 2)
+    assert enviados == ["bueno"]
+    assert bandeja.pendientes() == 1                # sólo el fallo temporal se reintenta
+    con = bandeja._conexion()
+    assert con.execute("SELECT clave, texto, error FROM descartados").fetchall() == [
+        ("1:ana:0", "malo", "rechazado")]
@@ -0,0 +1,26 @@
+# tests/test_bench.py
+# ────────────────────────────────────────────────────────────────
+"""Los scrapers sobre las fixtures grabadas del benchmark."""
+
+import requests
+
+import scrapers
+import utils
+from bench import run_bench
+
+
+def test_todas_las_fuentes_extraen_lo_mismo_en_ambos_modos(monkeypatch):
+    monkeypatch.setattr(utils, "SESION", utils.preparar_sesion(requests.Session()))
+    monkeypatch.setattr(scrapers.atica, "cloudscraper", scrapers.atica.cloudscraper)
+    for nombre in ("PARSEO_RAPIDO", "PROCESOS_PARSEO", "MIN_BYTES_PROCESO"):
+        monkeypatch.setattr(utils, nombre, getattr(utils, nombre))
+    monkeypatch.setattr(utils, "USAR_CACHE_HTTP", False)
+    monkeypatch.setattr(utils, "LIMITAR_TASA", False)
+    monkeypatch.setattr(utils.MEMO_HUELLAS, "activo", False)
+
+    assert run_bench.paridad(list(run_bench.TARJETAS)) == dict.fromkeys(run_bench.TARJETAS, True)
+    for fuente in run_bench.TARJETAS:
+        assert run_bench._scrape_silencioso(getattr(scrapers, fuente)), fuente
+    fixtures = run_bench.Fixtures()
+    assert fixtures.cuerpo(run_bench._con_copia(scrapers.ficsa.LIST_URL, 3)) == \
+        fixtures.cuerpo(scrapers.ficsa.LIST_URL)
@@ -0,0 +1,59 @@
+# tests/test_cache_http.py
+# ────────────────────────────────────────────────────────────────
+"""Caché HTTP en disco: TTL, revalidación y desalojo por tamaño."""
+
+import requests
+
+from cache_http import CacheHTTP
+
+
+def _respuesta(cuerpo: bytes, estado: int = 200, **cabeceras) -> requests.Response:
+    r = requests.Response()
+    r.status_code, r._content, r.encoding = estado, cuerpo, "utf-8"
+    r.headers.update(cabeceras)
+    return r
+
+
+def test_fresca_sin_red_y_revalidada_con_etag(tmp_path):
+    cache = CacheHTTP(str(tmp_path / "cache.sqlite"))
+    enviadas = []
+
+    def enviar(url, headers, **_):
+        enviadas.append(headers)
+        if headers.get("If-None-Match") == '"v1"':
+            return _respuesta(b"", 304)
+        return _respuesta(b"hola", ETag='"v1"', **{"Content-Encoding": "gzip"})
+
+    assert cache.get(None, "https://x.es/a", "lobe", ttl=60, enviar=enviar).text == "hola"
+    r = cache.get(None, "https://x.es/a", "lobe", ttl=60, enviar=enviar)
+    assert (r.text, r.from_cache, len(enviadas)) == ("hola", True, 1)      # dentro del TTL
+    r = cache.get(None, "https://x.es/a", "lobe", ttl=0, enviar=enviar)
+    assert (r.status_code, r.text) == (200, "hola")                        # 304 → disco
+    assert enviadas[-1] == {"If-None-Match": '"v1"'}
+    assert "Content-Encoding" not in r.headers
+    assert cache.resumen()["lobe"] == {"frescas": 1, "revalidadas": 1, "descargadas": 1,
+                                       "ratio": 2 / 3}
+
+
+def test_no_guarda_errores_ni_no_store(tmp_path):
+    cache = CacheHTTP(str(tmp_path / "cache.sqlite"))
+    cache.get(None, "https://x.es/a", enviar=lambda url, **_: _respuesta(b"x", 500))
+    cache.get(None, "https://x.es/b",
+              enviar=lambda url, **_: _respuesta(b"x", **{"Cache-Control": "no-store"}))
+    assert cache._conexion().execute("SELECT COUNT(*) FROM respuestas").fetchone() == (0,)
+
+
+def test_desaloja_las_menos_usadas_sin_recontar(tmp_path):
+    cache = CacheHTTP(str(tmp_path / "cache.sqlite"), max_bytes=250)
+    enviar = lambda url, **_: _respuesta(url[-1].encode() * 100)
+    for url in ("https://x.es/a", "https://x.es/b", "https://x.es/c"):
+        cache.get(None, url, enviar=enviar)
+    cache.get(None, "https://x.es/b", enviar=enviar)          # reemplaza, no suma
+    con = cache._conexion()
+    assert sorted(u for (u,) in con.execute("SELECT url FROM respuestas")) == [
+        "https://x.es/b", "https://x.es/c"]
+    assert cache._total == con.execute("SELECT SUM(bytes) FROM respuestas").fetchone()[0] == 200
+    cache.cerrar()
+    otra = CacheHTTP(str(tmp_path / "cache.sqlite"), max_bytes=250)
+    otra._conexion()                                          # el total se suma al abrir
+    assert otra._total == 200
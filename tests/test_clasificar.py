@@ -0,0 +1,121 @@
+# tests/test_clasificar.py
+# ────────────────────────────────────────────────────────────────
+"""Registro, deduplicación y selección de promociones (run_scrapers)."""
+
+import run_scrapers
+from almacen import AlmacenPromociones
+from deduplicar import IndiceDuplicados
+from perfiles import Perfil
+from scrapers import lobe
+from utils import NUEVO_PROYECTO, PROXIMAMENTE, SIN_NOMBRE, Promocion, md
+
+PERFIL = Perfil("prueba", ["mislata", "paterna", "manises"], precio_maximo=300_000,
+                habitaciones_minimas=0)
+
+
+def _seleccion(tmp_path, promos):
+    indice, vistas = IndiceDuplicados(), set()
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        for p in promos:
+            run_scrapers.clasificar(p, almacen, [PERFIL], indice, vistas)
+    return run_scrapers.seleccionar(indice, PERFIL, delta=False)
+
+
+def test_tarjetas_sin_enlace_propio_no_se_fusionan(tmp_path):
+    # Sin enlace en la tarjeta, el esquema pone la URL del listado a todas
+    promos = [
+        Promocion("lobe", "Torre A", "Mislata", precio=200_000, url=lobe.URL),
+        Promocion("lobe", "Jardines B", "Paterna", precio=250_000, url=lobe.URL),
+        Promocion("lobe", "Edificio C", "Manises", precio=180_000, url=lobe.URL),
+    ]
+    seleccion = _seleccion(tmp_path, promos)
+    assert sorted((p.nombre, p.precio) for p, *_ in seleccion) == [
+        ("Edificio C", 180_000), ("Jardines B", 250_000), ("Torre A", 200_000),
+    ]
+
+
+def test_misma_url_propia_se_fusiona(tmp_path):
+    promos = [
+        Promocion("lobe", "Torre A", "Mislata", precio=200_000, url="https://x.es/torre-a/"),
+        Promocion("lobe", "Torre A", "Mislata", dormitorios=3,
+                  url="https://www.x.es/torre-a?utm_source=y"),
+    ]
+    [(p, _, _, fuentes)] = _seleccion(tmp_path, promos)
+    assert (p.precio, p.dormitorios, fuentes) == (200_000, 3, ["lobe"])
+
+
+def test_tarjetas_sin_enlace_ni_nombre_no_se_tapan(tmp_path):
+    promos = [
+        Promocion("lobe", SIN_NOMBRE, "Mislata", precio=200_000, url=lobe.URL),
+        Promocion("lobe", SIN_NOMBRE, "Mislata", precio=230_000, url=lobe.URL),
+        Promocion("lobe", SIN_NOMBRE, "Paterna", precio=200_000, url=lobe.URL),
+        Promocion("lobe", SIN_NOMBRE, "Paterna", precio=200_000, url=lobe.URL),   # repetida
+    ]
+    seleccion = _seleccion(tmp_path, promos)
+    assert sorted((p.ubicacion, p.precio) for p, *_ in seleccion) == [
+        ("Mislata", 200_000), ("Mislata", 230_000), ("Paterna", 200_000),
+    ]
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        assert almacen._con.execute("SELECT COUNT(*) FROM promociones").fetchone() == (3,)
+
+
+def test_alerta_y_cambio_del_representante(tmp_path):
+    en_venta = Promocion("lobe", "Torre A", "Mislata", precio=200_000, dormitorios=3,
+                         url="https://x.es/torre-a")
+    _seleccion(tmp_path, [en_venta])
+    # Ya vista en venta; otra fuente la anuncia ahora como lanzamiento, con menos datos
+    lanzamiento = Promocion("aedas", "Torre A", "Mislata", precio=210_000,
+                            estado=NUEVO_PROYECTO, url="https://y.es/torre-a")
+    [(p, cambio, alerta, fuentes)] = _seleccion(tmp_path, [en_venta, lanzamiento])
+    assert (p.fuente, p.estado, cambio, alerta) == ("lobe", None, None, None)
+    assert fuentes == ["lobe", "aedas"]
+
+
+def test_obsoletas_no_entran_en_la_fusion(tmp_path):
+    vigente = Promocion("lobe", "Torre A", "Mislata", precio=200_000, url="https://x.es/torre-a")
+    antigua = Promocion("aedas", "Torre A", "Mislata", precio=150_000, dormitorios=2,
+                        url="https://y.es/torre-a")
+    antigua.obsoleta = 1_700_000_000
+    [(p, *_)] = _seleccion(tmp_path, [vigente, antigua])
+    assert (p.fuente, p.precio, p.dormitorios, p.obsoleta) == ("lobe", 200_000, None, None)
+
+    [(p, *_)] = _seleccion(tmp_path / "sola", [antigua])
+    assert (p.precio, p.obsoleta) == (150_000, 1_700_000_000)
+
+
+def test_alertas_de_bajada_y_lanzamiento(tmp_path):
+    url = "https://x.es/torre-a"
+    alertas = []
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        for momento, precio, estado in ((1_000, 200_000, PROXIMAMENTE), (2_000, 200_000, None),
+                                        (3_000, 180_000, None), (4_000, 190_000, None),
+                                        (5_000, 184_000, None), (6_000, 182_000, None)):
+            almacen._ahora = momento
+            p = Promocion("lobe", "Torre A", "Mislata", precio=precio, estado=estado, url=url)
+            cambio = almacen.registrar(p.fuente, url, p.nombre, p.precio, estado=p.estado)
+            alertas.append(run_scrapers._alerta(p, cambio, almacen, url))
+    assert alertas == [
+        md(f"🔔 Lanzamiento: {PROXIMAMENTE}"),
+        md(f"🔔 Sale a la venta (antes: {PROXIMAMENTE})"),
+        md("🔔 Baja 20.000€ (10%), mínimo histórico"),
+        None,                                           # sube
+        md("🔔 Baja 6.000€ (3%)"),
+        None,                                           # baja menos de UMBRAL_BAJADA
+    ]
+
+
+def test_una_pasada_para_todos_los_perfiles(tmp_path):
+    barato = Perfil("barato", ["mislata"], precio_maximo=200_000, habitaciones_minimas=0)
+    grande = Perfil("grande", ["mislata", "paterna"], precio_maximo=400_000, habitaciones_minimas=3)
+    promos = [Promocion("lobe", "Torre A", "Mislata", precio=190_000, dormitorios=2,
+                        url="https://x.es/a"),
+              Promocion("lobe", "Torre B", "Paterna", precio=350_000, dormitorios=4,
+                        url="https://x.es/b")]
+    indice, vistas = IndiceDuplicados(), set()
+    with AlmacenPromociones(str(tmp_path / "promociones.sqlite")) as almacen:
+        for p in promos:
+            run_scrapers.clasificar(p, almacen, [barato, grande], indice, vistas)
+        assert almacen._con.execute("SELECT COUNT(*) FROM historico").fetchone() == (2,)
+    for perfil, esperado in ((barato, ["Torre A"]), (grande, ["Torre B"])):
+        seleccion = run_scrapers.seleccionar(indice, perfil, delta=False)
+        assert [p.nombre for p, *_ in seleccion] == esperado
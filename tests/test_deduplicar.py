@@ -0,0 +1,50 @@
+# tests/test_deduplicar.py
+# ────────────────────────────────────────────────────────────────
+"""Agrupación de duplicados: qué se fusiona y qué no."""
+
+from deduplicar import IndiceDuplicados
+from utils import SIN_NOMBRE, Promocion
+
+
+def _grupos(*promos):
+    indice = IndiceDuplicados()
+    for p in promos:
+        indice.agregar(p, p.url)
+    return sorted(sorted((p.fuente, p.url) for p, *_ in g.miembros) for g in indice.grupos)
+
+
+def test_tarjetas_sin_nombre_no_se_agrupan_por_nombre():
+    grupos = _grupos(
+        Promocion("atica", SIN_NOMBRE, "Paterna", precio=300_000, url="https://grupo-atica.com/a"),
+        Promocion("atica", SIN_NOMBRE, "Paterna", precio=150_000, url="https://grupo-atica.com/b"),
+        Promocion("metrovacesa", SIN_NOMBRE, "Paterna", precio=100_000,
+                  url="https://metrovacesa.com/c"),
+    )
+    assert len(grupos) == 3
+
+
+def test_misma_fuente_con_otra_url_no_se_fusiona():
+    assert len(_grupos(
+        Promocion("lobe", "Jardines del Turia", "Paterna", url="https://x.es/jardines-1"),
+        Promocion("lobe", "Jardines del Turia", "Paterna", url="https://x.es/jardines-2"),
+    )) == 2
+
+
+def test_nombres_parecidos_pero_distintos():
+    assert len(_grupos(
+        Promocion("lobe", "Torre Azul", "Mislata", url="https://x.es/torre-azul"),
+        Promocion("aedas", "Torre Azur", "Mislata", url="https://y.es/torre-azur"),
+    )) == 2
+    assert len(_grupos(
+        Promocion("lobe", "Edificio Sol", "Mislata", url="https://x.es/sol"),
+        Promocion("aedas", "Residencial Sol", "Mislata", url="https://y.es/sol"),
+    )) == 2
+
+
+def test_mismo_proyecto_en_dos_fuentes():
+    assert _grupos(
+        Promocion("lobe", "Residencial Los Olivos", "Paterna", url="https://x.es/olivos"),
+        Promocion("aedas", "Los Olivos", "Paterna, Valencia", url="https://y.es/olivos"),
+        Promocion("aedas", "Los Olivos", "Paterna", url="https://www.y.es/olivos/?utm_source=z"),
+    ) == [[("aedas", "https://www.y.es/olivos/?utm_source=z"), ("aedas", "https://y.es/olivos"),
+           ("lobe", "https://x.es/olivos")]]
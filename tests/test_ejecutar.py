@@ -0,0 +1,48 @@
+# tests/test_ejecutar.py
+# ────────────────────────────────────────────────────────────────
+"""Ejecución concurrente de los scrapers: aislamiento, plazos y cancelación."""
+
+import threading
+import time
+import types
+
+import run_scrapers
+import scrapers
+from salud import Salud
+from utils import Promocion
+
+
+def test_fuente_fuera_de_plazo_se_cancela(tmp_path, monkeypatch):
+    cerrado = threading.Event()
+
+    def iterar():
+        try:
+            while True:
+                yield Promocion("lobe", "Torre A", "Mislata", url="https://x.es/a")
+                time.sleep(0.2)
+        finally:
+            cerrado.set()        # aquí cerraría sus pools un scraper de verdad
+
+    monkeypatch.setattr(scrapers, "cargar", lambda n: types.SimpleNamespace(iterar=iterar))
+    monkeypatch.setattr(run_scrapers, "SALUD", Salud(str(tmp_path / "salud.sqlite")))
+    monkeypatch.setitem(run_scrapers.PLAZOS, "lobe", 0.5)
+
+    llegadas = []
+    assert run_scrapers.ejecutar_scrapers(["lobe"], llegadas.append) == {}
+    assert llegadas
+    assert cerrado.wait(2)
+
+
+def test_una_fuente_caida_no_afecta_a_las_demas(tmp_path, monkeypatch):
+    def modulo(nombre):
+        def iterar():
+            if nombre == "aedas":
+                raise ConnectionError("caída")
+            yield Promocion(nombre, "Torre A", "Mislata", url=f"https://x.es/{nombre}")
+        return types.SimpleNamespace(iterar=iterar)
+
+    monkeypatch.setattr(scrapers, "cargar", modulo)
+    monkeypatch.setattr(run_scrapers, "SALUD", Salud(str(tmp_path / "salud.sqlite")))
+    resultados = run_scrapers.ejecutar_scrapers(["aedas", "lobe", "ficsa"])
+    assert {n: [p.url for p in ps] for n, ps in resultados.items()} == {
+        "lobe": ["https://x.es/lobe"], "ficsa": ["https://x.es/ficsa"]}
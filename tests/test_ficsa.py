@@ -0,0 +1,81 @@
+# tests/test_ficsa.py
+# ────────────────────────────────────────────────────────────────
+"""Extracción de las fichas de FICSA y su huella."""
+
+import threading
+import time
+
+from scrapers import ficsa
+
+URL = "https://www.ficsa.es/promociones/olivos/"
+
+FICHA = """
+<html><head><title>Residencial Olivos</title><script>var t = 1;</script></head><body>
+<main>
+  <h1>Residencial Olivos</h1>
+  <p class="description">Paterna, Valencia</p>
+  <div class="item-promocion"><h4>RANGO DE PRECIOS</h4><p class="value">Desde 215.000 €</p></div>
+  <div class="item-promocion"><p>3 y 4 dormitorios</p></div>
+</main>
+<footer>Oficina: Calle Colón 1, Valencia</footer>
+</body></html>
+"""
+
+# Los mismos datos fuera de <main>: barra lateral sin clases conocidas
+FICHA_FUERA = """
+<html><head><title>Residencial Olivos</title></head><body>
+<main><h1>Residencial Olivos</h1></main>
+<aside><span>Paterna, Valencia</span>
+  <p class="value">Desde 215.000 €</p><span>Viviendas de 3 dormitorios</span></aside>
+</body></html>
+"""
+
+
+def test_extrae_la_ficha():
+    p = ficsa._promocion_de_html(FICHA, URL)
+    assert (p.nombre, p.ubicacion, p.precio, p.dormitorios) == (
+        "Residencial Olivos", "Paterna, Valencia", 215_000, 3)
+
+
+def test_datos_fuera_de_main():
+    p = ficsa._promocion_de_html(FICHA_FUERA, URL)
+    assert (p.precio, p.dormitorios) == (215_000, 3)
+    assert "Paterna, Valencia" in p.ubicacion
+
+
+def test_la_huella_cubre_lo_que_se_extrae():
+    huella = ficsa.FILTRO_FICHA.huella(FICHA_FUERA)[0]
+    for antes, despues in (("3 dormitorios", "2 dormitorios"), ("215.000", "199.000"),
+                           ("Paterna", "Manises")):
+        cambiada = FICHA_FUERA.replace(antes, despues)
+        assert ficsa.FILTRO_FICHA.huella(cambiada)[0] != huella
+    # los scripts no cuentan
+    assert ficsa.FILTRO_FICHA.huella(FICHA.replace("t = 1", "t = 2")) == \
+        ficsa.FILTRO_FICHA.huella(FICHA)
+
+
+def test_fichas_en_el_orden_del_listado(monkeypatch):
+    enlaces = [f"https://www.ficsa.es/promociones/p{i}/" for i in range(6)]
+    en_vuelo, maximo, lock = [0], [0], threading.Lock()
+
+    def parse(url):
+        with lock:
+            en_vuelo[0] += 1
+            maximo[0] = max(maximo[0], en_vuelo[0])
+        time.sleep(0.05 if url.endswith("p0/") else 0.01)  # la primera llega la última
+        with lock:
+            en_vuelo[0] -= 1
+        return ficsa.Promocion("ficsa", url[-3:-1], "Paterna", url=url)
+
+    monkeypatch.setattr(ficsa, "_get_promo_links", lambda: enlaces)
+    monkeypatch.setattr(ficsa, "_parse_promotion", parse)
+    assert [p.url for p in ficsa.iterar()] == enlaces
+    assert 1 < maximo[0] <= ficsa.CONCURRENCIA
+
+
+def test_enlaces_repetidos_son_una_ficha(monkeypatch):
+    hrefs = ["/promociones/olivos/", "/promociones/olivos", "/promociones/olivos/?utm_source=x",
+             "/promociones/", "/promociones/page/2/", "https://www.ficsa.es/promociones/pinos/"]
+    monkeypatch.setattr(ficsa, "tarjetas_paginadas", lambda *a: ({"href": h} for h in hrefs))
+    assert ficsa._get_promo_links() == ["https://www.ficsa.es/promociones/olivos/",
+                                        "https://www.ficsa.es/promociones/pinos/"]
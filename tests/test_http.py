@@ -0,0 +1,66 @@
+# tests/test_http.py
+# ────────────────────────────────────────────────────────────────
+"""Cliente HTTP compartido: pool, reintentos y límites de tasa por host."""
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import utils
+
+
+class _AdaptadorPropio(HTTPAdapter):
+    pass
+
+
+def test_sesion_con_pool_y_reintentos():
+    sesion = utils.preparar_sesion(requests.Session())
+    for prefijo in ("https://", "http://"):
+        adaptador = sesion.get_adapter(prefijo + "x.es/")
+        assert adaptador._pool_maxsize == utils.CONEXIONES_POR_HOST
+        assert adaptador.max_retries.total == utils.REINTENTOS_HTTP
+        assert "POST" not in adaptador.max_retries.allowed_methods
+    assert sesion.headers["Accept-Encoding"] == utils.ACCEPT_ENCODING
+
+
+def test_conserva_el_adaptador_propio():
+    sesion = requests.Session()
+    propio = _AdaptadorPropio()
+    sesion.mount("https://", propio)
+    utils.preparar_sesion(sesion)
+    assert sesion.get_adapter("https://x.es/") is propio
+    assert propio.max_retries.total == utils.REINTENTOS_HTTP
+
+
+def test_get_con_timeout_comun(monkeypatch):
+    monkeypatch.setattr(utils, "LIMITAR_TASA", False)
+    llamadas = []
+
+    class Sesion:
+        def get(self, url, **kwargs):
+            llamadas.append((url, kwargs))
+            r = requests.Response()
+            r.status_code, r._content = 200, b"ok"
+            return r
+
+    assert utils.http_get("https://x.es/a", Sesion()).content == b"ok"
+    assert llamadas == [("https://x.es/a", {"timeout": utils.TIMEOUT_HTTP})]
+
+
+def test_cubo_tokens_rafaga_y_tasa(monkeypatch):
+    reloj = [0.0]
+    monkeypatch.setattr(utils.time, "monotonic", lambda: reloj[0])
+    monkeypatch.setattr(utils.time, "sleep", lambda s: reloj.__setitem__(0, reloj[0] + s))
+    cubo = utils.CuboTokens(tasa=2.0, rafaga=3)
+    momentos = []
+    for _ in range(7):
+        cubo.esperar()
+        momentos.append(reloj[0])
+    assert momentos == [0, 0, 0, 0.5, 1.0, 1.5, 2.0]
+
+
+def test_limites_por_host():
+    _, cubo = utils._limites_host("https://api.telegram.org/botX/sendMessage")
+    assert (cubo.tasa, cubo.rafaga) == utils.LIMITES_POR_HOST["api.telegram.org"]
+    assert utils._limites_host("https://api.telegram.org/otra")[1] is cubo
+    otro = utils._limites_host("https://x.es/")[1]
+    assert (otro.tasa, otro.rafaga) == (utils.TASA_POR_HOST, utils.RAFAGA_POR_HOST)
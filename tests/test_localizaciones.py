@@ -0,0 +1,43 @@
+# tests/test_localizaciones.py
+# ────────────────────────────────────────────────────────────────
+"""Resolución de ubicaciones a municipios del nomenclátor."""
+
+import pytest
+
+from localizaciones import municipio, municipios_de
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    # formatos de los listados
+    ("Mislata, Valencia", "mislata"),
+    ("Quart de Poblet · Valencia", "quart de poblet"),
+    ("Calle Mayor 0, Mislata (Valencia)", "mislata"),
+    ("valencia - benimaclet, españa", "valencia"),
+    ("Valencia, Valencia", "valencia"),
+    ("Valencia", "valencia"),
+    # el código postal manda
+    ("Calle de Quart 10, 46001 Valencia", "valencia"),
+    ("46920 Mislata", "mislata"),
+    # los nombres de vía no son municipios
+    ("Calle Xàtiva 3, Valencia", "valencia"),
+    ("Calle Sueca 20, Ruzafa, Valencia", "valencia"),
+    ("Carrer de Jesús 12, Picassent", "picassent"),
+    # barrios de la capital sólo como tramo entero o junto a "Valencia"
+    ("Ruzafa", "valencia"),
+    ("Jesús Pobre, Alicante", None),
+    # "Valencia" tras un municipio desconocido es la provincia
+    ("Benaguasil, Valencia", None),
+    ("Vilamarxant (Valencia)", None),
+    ("Calle Mayor 3, Valencia (Valencia)", "valencia"),
+    # el punto volado separa tramos sólo entre espacios
+    ("Sant Marcel·lí", "valencia"),
+    ("Benaguasil · Valencia", None),
+])
+def test_municipio(texto, esperado):
+    assert municipio(texto) == esperado
+
+
+def test_localizacion_desconocida_es_un_error():
+    assert municipios_de(["Mislata", "quart de poblet"]) == {"mislata", "quart de poblet"}
+    with pytest.raises(ValueError, match="benaguasil"):
+        municipios_de(["paterna", "benaguasil"])
@@ -0,0 +1,58 @@
+# tests/test_metricas.py
+# ────────────────────────────────────────────────────────────────
+"""Métricas por fuente: atribución y volcado JSON / Prometheus."""
+
+import json
+
+import metricas
+from metricas import Metricas
+
+
+def test_sin_fuente_no_se_mide(monkeypatch):
+    monkeypatch.setattr(metricas, "METRICAS", Metricas())
+    metricas.sumar("peticiones")
+    with metricas.fuente("lobe"):
+        metricas.sumar("peticiones")
+        metricas.sumar("bytes", 100)
+        metricas.sumar("peticiones", fuente="aedas")
+    assert metricas.FUENTE.get() is None
+    datos = metricas.METRICAS.por_fuente()
+    assert set(datos) == {"lobe", "aedas"}
+    lobe = datos["lobe"]
+    assert (lobe["peticiones"], lobe["bytes"], lobe["cache"]) == (1, 100, 0)
+
+
+def test_volcado_jsonl_y_prometheus(tmp_path):
+    m = Metricas()
+    m.sumar("lobe", "peticiones", 3)
+    m.fijar("lobe", "tarjetas", 12)
+    m.fijar("lobe", "filtradas", 4, perfil="ana")
+    ruta_jsonl, ruta_prom = str(tmp_path / "m.jsonl"), str(tmp_path / "prom" / "scraper.prom")
+    for _ in range(2):
+        m.escribir_jsonl(ruta_jsonl, 1_700_000_000)
+        m.escribir_prometheus(ruta_prom, 1_700_000_000)
+
+    lineas = [json.loads(l) for l in open(ruta_jsonl, encoding="utf-8")]
+    assert len(lineas) == 4                                      # se añade, no se reescribe
+    assert lineas[0]["fuente"] == "lobe" and lineas[0]["peticiones"] == 3
+    assert lineas[1] == {"inicio": 1_700_000_000, "fuente": "lobe", "perfil": "ana",
+                         **dict.fromkeys(metricas.CONTADORES_PERFIL, 0), "filtradas": 4}
+
+    prom = open(ruta_prom, encoding="utf-8").read().splitlines()
+    assert "# TYPE scraper_peticiones counter" in prom
+    assert 'scraper_peticiones{fuente="lobe"} 3' in prom
+    assert 'scraper_tarjetas{fuente="lobe"} 12' in prom
+    assert 'scraper_filtradas{fuente="lobe",perfil="ana"} 4' in prom
+    assert prom[-1] == "scraper_ultima_ejecucion_timestamp 1700000000"
+    assert [p.name for p in (tmp_path / "prom").iterdir()] == ["scraper.prom"]
+
+
+def test_acumular_suma_contadores_y_toma_gauges():
+    total, pasada = Metricas(), Metricas()
+    for m in (total, pasada):
+        m.sumar("lobe", "peticiones", 2)
+        m.fijar("lobe", "tarjetas", 5)
+    pasada.fijar("lobe", "tarjetas", 7)
+    total.acumular(pasada)
+    lobe = total.por_fuente()["lobe"]
+    assert (lobe["peticiones"], lobe["tarjetas"]) == (4, 7)
@@ -0,0 +1,86 @@
+# tests/test_motor.py
+# ────────────────────────────────────────────────────────────────
+"""Motor de extracción declarativo y enriquecimiento con fichas (scrapers._motor)."""
+
+import threading
+import time
+
+import pytest
+import requests
+from bs4 import BeautifulSoup
+
+from scrapers import _motor
+from scrapers._motor import Campo, Esquema, Estado, Ficha, enriquecer, extraer_tarjeta
+from utils import PROXIMAMENTE, SIN_NOMBRE, Promocion
+
+LISTADO = """
+<a href="/olivos"><div class="card">
+  <h3>Residencial Olivos</h3><span class="loc">PATERNA</span>
+  <p>Desde 215.000 €</p><p>2, 3 y 4 dormitorios</p>
+  <span class="badge">Próximamente</span>
+</div></a>
+<div class="card"><span class="loc">Mislata</span><p>Sin precio</p></div>
+"""
+
+ESQUEMA = Esquema(
+    "prueba", "https://x.es/", "div.card",
+    campos={
+        "nombre":      (Campo("h3"), Campo("h2", defecto=SIN_NOMBRE)),
+        "ubicacion":   Campo("span.loc", minusculas=True),
+        "precio":      Campo(texto=r"desde", numero="primero"),
+        "dormitorios": Campo("p", indice=1, patron=r"[\d ,y]+", numero="maximo"),
+        "url":         Campo(padre="a", atributo="href", prefijo="https://x.es"),
+    },
+    estados=(Estado("span.badge", "proximamente", PROXIMAMENTE),),
+)
+
+
+def _tarjetas():
+    return BeautifulSoup(LISTADO, "html.parser").select("div.card")
+
+
+def test_aplica_cada_campo():
+    olivos, mislata = (extraer_tarjeta(ESQUEMA, t) for t in _tarjetas())
+    assert repr(olivos) == repr(Promocion(
+        "prueba", "Residencial Olivos", "paterna", precio=215_000, dormitorios=4,
+        estado=PROXIMAMENTE, url="https://x.es/olivos"))
+    assert (mislata.nombre, mislata.ubicacion, mislata.precio, mislata.url) == (
+        SIN_NOMBRE, "mislata", None, None)
+
+
+def test_requeridos_y_campos_desconocidos():
+    estricto = Esquema("prueba", "https://x.es/", "div.card",
+                       campos={"nombre": Campo("h3"), "precio": Campo(texto="desde")},
+                       requeridos=("nombre", "precio"))
+    promos = [extraer_tarjeta(estricto, t) for t in _tarjetas()]
+    assert [p and p.nombre for p in promos] == ["Residencial Olivos", None]
+    with pytest.raises(ValueError, match="precio_m2"):
+        Esquema("prueba", "https://x.es/", "div.card", campos={"precio_m2": Campo("p")})
+
+
+def test_enriquece_en_paralelo_y_en_orden(monkeypatch):
+    esquema = Esquema("prueba", "https://x.es/", "div.card", campos={"nombre": Campo("h3")},
+                      ficha=Ficha({"precio": Campo("p.precio", numero="primero")}, concurrencia=3))
+    pedidas, lock = [], threading.Lock()
+
+    def http_get(url, sesion=None, fuente=None, ttl=None):
+        with lock:
+            pedidas.append(url)
+        time.sleep(0.05 if url.endswith("/0") else 0.01)     # la primera tarda más
+        if url.endswith("/3"):
+            raise requests.ConnectionError("caída")
+        r = requests.Response()
+        r.status_code, r.encoding = 200, "utf-8"
+        r._content = f'<p class="precio">{int(url[-1]) + 1}00.000 €</p>'.encode()
+        return r
+
+    monkeypatch.setattr(_motor, "http_get", http_get)
+    promos = [Promocion("prueba", f"P{i}", "Mislata", url=f"https://x.es/p/{i}") for i in range(5)]
+    promos.append(Promocion("prueba", "Torrent", "Torrent", url="https://x.es/p/9"))
+    promos.append(Promocion("prueba", "Con precio", "Mislata", precio=1, url="https://x.es/p/8"))
+    promos.append(Promocion("prueba", "Sin enlace", "Mislata", url="https://x.es/"))
+
+    salida = list(enriquecer(iter(promos), esquema, frozenset({"mislata"})))
+    assert [p.nombre for p in salida] == [p.nombre for p in promos]
+    assert [p.precio for p in salida] == [100_000, 200_000, 300_000, None, 500_000, None, 1, None]
+    assert sorted(pedidas) == [f"https://x.es/p/{i}" for i in range(5)]
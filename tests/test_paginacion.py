@@ -0,0 +1,71 @@
+# tests/test_paginacion.py
+# ────────────────────────────────────────────────────────────────
+"""Recorrido de listados paginados (utils.tarjetas_paginadas)."""
+
+from types import SimpleNamespace
+
+import pytest
+import requests
+
+import utils
+
+URL = "https://x.es/promociones"
+
+
+def _pagina(*nombres: str, siguiente: str | None = None) -> str:
+    enlace = f'<a rel="next" href="{siguiente}">›</a>' if siguiente else ""
+    return "".join(f'<div class="card">{n}</div>' for n in nombres) + enlace
+
+
+@pytest.fixture
+def web(monkeypatch):
+    """Sirve web.paginas (url → html; el resto es 404) y anota web.pedidas."""
+    paginas, pedidas = {}, []
+
+    def http_get(url, sesion=None, fuente=None):
+        pedidas.append(url)
+        r = requests.Response()
+        r.url, r.encoding = url, "utf-8"
+        r.status_code = 200 if url in paginas else 404
+        r._content = paginas.get(url, "").encode()
+        return r
+
+    monkeypatch.setattr(utils, "http_get", http_get)
+    return SimpleNamespace(paginas=paginas, pedidas=pedidas)
+
+
+def _nombres(url, **kwargs):
+    return [t.get_text() for t in utils.tarjetas_paginadas(url, "lobe", "div.card", **kwargs)]
+
+
+def test_sigue_el_enlace_siguiente(web):
+    web.paginas[URL] = _pagina("a", "b", siguiente="/promociones/page/2/")
+    web.paginas["https://x.es/promociones/page/2/"] = _pagina("c", siguiente=URL)  # al inicio
+    assert _nombres(URL) == ["a", "b", "c"]
+    assert web.pedidas == [URL, "https://x.es/promociones/page/2/"]
+
+
+def test_numera_la_query_hasta_que_se_repiten_las_tarjetas(web):
+    web.paginas[URL] = _pagina("a")
+    web.paginas[URL + "?page=2"] = _pagina("b")
+    web.paginas[URL + "?page=3"] = _pagina("b")          # la web ignora ?page: misma página
+    web.paginas[URL + "?page=4"] = _pagina("c")
+    assert _nombres(URL, parametro="page") == ["a", "b"]
+
+
+def test_404_es_el_final_y_el_limite_de_paginas(web):
+    web.paginas[URL] = _pagina("a")
+    web.paginas[URL + "?page=2"] = _pagina("b")
+    assert _nombres(URL, parametro="page") == ["a", "b"]
+    assert _nombres(URL, parametro="page", max_paginas=1) == ["a"]
+    with pytest.raises(requests.HTTPError):
+        _nombres(URL + "?otra=1")                       # el error de la primera página se propaga
+
+
+def test_las_tarjetas_salen_segun_llegan_las_paginas(web):
+    for n in range(1, 6):
+        web.paginas[URL + (f"?page={n}" if n > 1 else "")] = _pagina(str(n))
+    tarjetas = utils.tarjetas_paginadas(URL, "lobe", "div.card", parametro="page")
+    assert next(tarjetas).get_text() == "1"
+    assert len(web.pedidas) <= 2                        # la actual y, como mucho, la siguiente
+    tarjetas.close()
@@ -0,0 +1,32 @@
+# tests/test_parseo.py
+# ────────────────────────────────────────────────────────────────
+"""Parseo rápido: qué conserva FiltroTarjetas."""
+
+import utils
+from utils import FiltroTarjetas, parsear_html
+
+LISTADO = """
+<html><body>
+<nav><a href="/contacto">Contacto</a></nav>
+<div class="card destacada"><a href="/a"><h3>Torre A</h3></a><span>Mislata</span></div>
+<div class="cards-grid"><p>no es una tarjeta</p></div>
+<article data-id="7"><h3>Torre B</h3></article>
+<a class="next page-numbers" href="/page/2/">Siguiente</a>
+</body></html>
+"""
+
+FILTRO = FiltroTarjetas(("div", {"class": "card"}), ("article", {"data-id": True}))
+
+
+def test_conserva_solo_las_tarjetas(monkeypatch):
+    monkeypatch.setattr(utils, "PARSEO_RAPIDO", True)
+    soup = parsear_html(LISTADO, FILTRO)
+    assert [h.get_text() for h in soup.select("h3")] == ["Torre A", "Torre B"]
+    assert soup.select_one("div.card a")["href"] == "/a"        # con todo su subárbol
+    assert not soup.select("nav, .cards-grid")
+    assert [a["href"] for a in soup.select(utils.SELECTOR_SIGUIENTE)] == ["/page/2/"]
+
+
+def test_por_defecto_arbol_completo():
+    assert parsear_html(LISTADO, FILTRO).select_one("nav a")["href"] == "/contacto"
+
@@ -0,0 +1,35 @@
+# tests/test_perfiles.py
+# ────────────────────────────────────────────────────────────────
+"""Filtros de cada perfil de comprador."""
+
+import json
+import os
+
+import pytest
+
+from perfiles import cargar_perfiles
+from scrapers import atica
+from utils import Promocion
+
+EJEMPLO = os.path.join(os.path.dirname(__file__), os.pardir, "perfiles.ejemplo.json")
+
+
+def test_tope_de_precio_por_perfil():
+    principal, familia = cargar_perfiles(EJEMPLO)
+    p = Promocion("atica", "Residencial Olivos", "Paterna", precio=300_000, dormitorios=3,
+                  url="https://grupo-atica.com/olivos")
+    assert principal.motivo_descarte(p, atica.OBLIGATORIOS) == "precio"
+    assert familia.motivo_descarte(p, atica.OBLIGATORIOS) is None
+
+
+def test_atica_no_recorta_el_listado_por_precio():
+    # el tope lo pone cada perfil: el listado debe traer también lo que pasa de 270 000
+    assert "price=" not in atica.LISTADO_URL
+
+
+def test_localizacion_desconocida_detiene_la_carga(tmp_path):
+    ruta = tmp_path / "perfiles.json"
+    ruta.write_text(json.dumps({"perfiles": [
+        {"nombre": "ana", "localizaciones": ["paterna", "benaguasil"]}]}))
+    with pytest.raises(SystemExit, match="benaguasil"):
+        cargar_perfiles(str(ruta))
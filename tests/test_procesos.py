@@ -0,0 +1,50 @@
+# tests/test_procesos.py
+# ────────────────────────────────────────────────────────────────
+"""Parseo en el pool de procesos (utils.parsear_en_proceso)."""
+
+import os
+import pickle
+
+import pytest
+
+import utils
+from scrapers import aedas, ficsa
+
+URL = "https://www.ficsa.es/promociones/altamira/"
+with open(os.path.join(os.path.dirname(__file__), os.pardir, "bench", "fixtures", "ficsa",
+                       "altamira.html"), encoding="utf-8") as f:
+    FICHA = f.read()
+
+
+@pytest.fixture
+def pool(monkeypatch):
+    monkeypatch.setattr(utils, "PROCESOS_PARSEO", 1)
+    monkeypatch.setattr(utils, "_pool_parseo", None)
+    yield
+    if utils._pool_parseo is not None:
+        utils._pool_parseo.shutdown()
+
+
+def test_mismo_resultado_en_el_pool(pool, monkeypatch):
+    aqui = ficsa._promocion_de_html(FICHA, URL)
+    monkeypatch.setattr(utils, "MIN_BYTES_PROCESO", 0)
+    assert repr(utils.parsear_en_proceso(ficsa._promocion_de_html, FICHA, URL)) == repr(aqui)
+    assert utils._pool_parseo is not None
+
+
+def test_paginas_pequenas_se_parsean_aqui(pool, monkeypatch):
+    monkeypatch.setattr(utils, "MIN_BYTES_PROCESO", len(FICHA) + 1)
+    assert utils.parsear_en_proceso(ficsa._promocion_de_html, FICHA, URL).url == URL
+    assert utils._pool_parseo is None
+
+
+def test_lo_que_no_viaja_se_parsea_aqui(pool, monkeypatch):
+    monkeypatch.setattr(utils, "MIN_BYTES_PROCESO", 0)
+    assert utils.parsear_en_proceso(lambda html, n: len(html) + n, "abc", 1) == 4
+
+
+def test_filtros_y_esquemas_viajan_con_pickle():
+    filtro = pickle.loads(pickle.dumps(ficsa.FILTRO_FICHA))
+    assert filtro.reglas == ficsa.FILTRO_FICHA.reglas
+    assert filtro.huella(FICHA) == ficsa.FILTRO_FICHA.huella(FICHA)
+    assert pickle.loads(pickle.dumps(aedas.ESQUEMA)) is aedas.ESQUEMA
@@ -0,0 +1,46 @@
+# tests/test_promocion.py
+# ────────────────────────────────────────────────────────────────
+"""Registro Promocion y filtros comunes (utils)."""
+
+import pytest
+
+from utils import (
+    NUEVO_PROYECTO, ULTIMAS_UNIDADES, Promocion, fila_promocion, motivo_descarte,
+    promocion_desde_fila, renderizar,
+)
+
+
+def test_registro_con_slots_y_fila():
+    p = Promocion("lobe", "Torre A", "Mislata", precio=215_000, dormitorios=3,
+                  url="https://x.es/torre-a")
+    with pytest.raises(AttributeError):
+        p.otro = 1
+    q = promocion_desde_fila(fila_promocion(p))
+    assert repr(q) == repr(p)
+    assert q.municipio is None and q.obsoleta is None
+
+
+@pytest.mark.parametrize("promo, obligatorios, motivo", [
+    (Promocion("lobe", "A", "Torrent, Valencia", 200_000, 3), (), "ubicacion"),
+    (Promocion("lobe", "A", "Mislata", 300_000, 3), (), "precio"),
+    (Promocion("lobe", "A", "Mislata", 200_000, 1), (), "dormitorios"),
+    (Promocion("lobe", "A", "Mislata"), (), None),
+    (Promocion("lobe", "A", "Mislata"), ("precio",), "precio"),
+    (Promocion("lobe", "A", "Mislata", dormitorios=3), ("precio", "dormitorios"), "precio"),
+    (Promocion("lobe", "A", "Mislata", estado=ULTIMAS_UNIDADES, dormitorios=3),
+     ("precio", "dormitorios"), None),
+    (Promocion("lobe", "A", "Mislata", 900_000, 1, NUEVO_PROYECTO), ("precio",), None),
+])
+def test_motivo_descarte(promo, obligatorios, motivo):
+    assert motivo_descarte(promo, obligatorios) == motivo
+
+
+def test_renderiza_todos_los_campos():
+    # cada campo sale en su línea, aunque el anterior falte
+    p = Promocion("metrovacesa", "Jardín", "paterna", dormitorios=2, estado=ULTIMAS_UNIDADES)
+    assert renderizar(p).split("\n") == [
+        r"*Jardín \(Metrovacesa – Últimas unidades\)*",
+        "📍 Paterna",
+        "💶 Últimas unidades",
+        "🛏️ Dorms: 2",
+    ]
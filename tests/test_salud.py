@@ -0,0 +1,60 @@
+# tests/test_salud.py
+# ────────────────────────────────────────────────────────────────
+"""Salud de las fuentes: timeouts adaptativos, disyuntor y respaldo."""
+
+import types
+
+import run_scrapers
+import salud
+import scrapers
+from salud import Salud
+from utils import Promocion, fila_promocion
+
+COMUN = (10, 30)
+
+
+def test_timeout_segun_las_latencias(tmp_path):
+    s = Salud(str(tmp_path / "salud.sqlite"))
+    for _ in range(salud.MIN_MUESTRAS - 1):
+        s.anotar_latencia("lobe", 1.0)
+    assert s.timeout("lobe", COMUN) == COMUN                  # pocas muestras
+    s.anotar_latencia("lobe", 3.0)
+    assert s.timeout("lobe", COMUN) == (10, 9.0)              # 3 × p95
+    for _ in range(20):
+        s.anotar_latencia("aedas", 0.1)
+    assert s.timeout("aedas", COMUN) == (10, salud.TIMEOUT_MINIMO)
+    assert s.timeout(None, COMUN) == COMUN
+
+
+def test_disyuntor_y_respaldo_entre_ejecuciones(tmp_path):
+    ruta = str(tmp_path / "salud.sqlite")
+    s = Salud(ruta)
+    s.exito("lobe", [{"nombre": "Torre A"}])
+    for _ in range(salud.FALLOS_PARA_ABRIR - 1):
+        s.fallo("lobe")
+    assert s.permitir("lobe")
+    s.fallo("lobe")
+    assert not s.permitir("lobe")
+    s.guardar()
+
+    otra = Salud(ruta)
+    assert not otra.permitir("lobe")
+    assert otra.respaldo("lobe")[1] == [{"nombre": "Torre A"}]
+    otra.exito("lobe", [])
+    assert otra.permitir("lobe") and otra.respaldo("lobe")[1] == []
+
+
+def test_fuente_caida_se_sirve_del_respaldo(tmp_path, monkeypatch):
+    def iterar():
+        raise ConnectionError("caída")
+        yield
+
+    monkeypatch.setattr(scrapers, "cargar", lambda n: types.SimpleNamespace(iterar=iterar))
+    monkeypatch.setattr(run_scrapers, "SALUD", Salud(str(tmp_path / "salud.sqlite")))
+    p = Promocion("lobe", "Torre A", "Mislata", precio=200_000, url="https://x.es/a")
+    run_scrapers.SALUD.exito("lobe", [fila_promocion(p)])
+
+    assert run_scrapers.ejecutar_scrapers(["lobe"]) == {}
+    assert run_scrapers.SALUD._fuente("lobe").fallos == 1
+    (q,) = run_scrapers.respaldo("lobe")
+    assert repr(q) == repr(p) and q.obsoleta
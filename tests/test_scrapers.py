@@ -0,0 +1,37 @@
+# tests/test_scrapers.py
+# ────────────────────────────────────────────────────────────────
+"""Registro perezoso de scrapers y selección de fuentes."""
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+import scrapers
+
+RAIZ = os.path.join(os.path.dirname(__file__), os.pardir)
+
+
+def test_registro_en_orden():
+    assert scrapers.__all__ == ["aedas", "viacelere", "metrovacesa", "atica", "urbania",
+                                "albaluz", "lobe", "ficsa"]
+
+
+def test_seleccion_de_fuentes():
+    assert scrapers.seleccionar() == scrapers.__all__
+    assert scrapers.seleccionar(["ficsa", "aedas"]) == ["aedas", "ficsa"]
+    assert scrapers.seleccionar(omitir=["atica"]) == [n for n in scrapers.__all__ if n != "atica"]
+    with pytest.raises(KeyError, match="nada"):
+        scrapers.seleccionar(["aedas"], ["nada"])
+    with pytest.raises(KeyError):
+        scrapers.cargar("_motor")
+
+
+def test_solo_se_importa_lo_que_se_usa():
+    codigo = ("import sys, scrapers; scrapers.cargar('lobe'); "
+              "print(sorted(m for m in sys.modules if m.startswith('scrapers.')), "
+              "'cloudscraper' in sys.modules)")
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True,
+                            capture_output=True, text=True).stdout
+    assert salida.split() == ["['scrapers._motor',", "'scrapers.lobe']", "False"]
@@ -0,0 +1,78 @@
+# tests/test_telegram.py
+# ────────────────────────────────────────────────────────────────
+"""Texto de los mensajes de Telegram, troceado y reenvíos."""
+
+import utils
+from utils import Promocion, md, renderizar, texto_plano
+
+
+def test_texto_plano_deshace_md():
+    for texto in ("Residencial (Fase II) - 3.5 hab.!", r"a\b*c_d[e]f", "100% ~ `x` || y"):
+        assert texto_plano(md(texto)) == texto
+
+
+def test_texto_plano_de_una_tarjeta():
+    p = Promocion("lobe", "Torre_A (II)", "mislata", precio=215_000, dormitorios=3,
+                  url="https://x.es/torre-a(2)")
+    assert texto_plano(renderizar(p)).split("\n") == [
+        "Torre_A (II) (LOBE)",
+        "📍 Mislata",
+        "💶 Desde: 215.000€",
+        "🛏️ Dorms: 3",
+        "🔗 Ver promoción: https://x.es/torre-a(2)",
+    ]
+
+
+def test_markdownv2_escapa_cada_campo():
+    p = Promocion("lobe", "Torre_A (II)", "mislata", precio=215_000,
+                  url="https://x.es/torre-a(2)?p=1.5")
+    assert renderizar(p).split("\n") == [
+        r"*Torre\_A \(II\) \(LOBE\)*",
+        "📍 Mislata",
+        r"💶 Desde: 215\.000€",
+        r"🔗 [Ver promoción](https://x.es/torre-a(2\)?p=1.5)",
+    ]
+    assert md(r"\*") == r"\\\*"
+
+
+class _Respuesta:
+    def __init__(self, status_code):
+        self.status_code, self.ok, self.text = status_code, status_code == 200, "Bad Request"
+
+
+def test_400_se_reenvia_sin_escapes(monkeypatch):
+    enviados = []
+
+    def post(url, data):
+        enviados.append(dict(data))
+        return _Respuesta(400 if "parse_mode" in data else 200)
+
+    monkeypatch.setattr(utils, "http_post", post)
+    assert utils._enviar_trozo("https://api.telegram.org/botX/sendMessage", "123",
+                               md("Fase 2. ¡Desde 200.000€!"), "MarkdownV2")
+    assert enviados[-1]["text"] == "Fase 2. ¡Desde 200.000€!"
+    assert "parse_mode" not in enviados[-1]
+
+
+def test_trocea_entre_tarjetas():
+    tarjetas = [f"*Torre {i}*\nMislata" for i in range(10)]          # 16 caracteres
+    trozos = utils.trocear_mensaje("\n\n".join(tarjetas), limite=40)
+    assert trozos == ["\n\n".join(tarjetas[i:i + 2]) for i in range(0, 10, 2)]
+
+
+def test_tarjeta_que_no_cabe_se_parte_por_lineas_sin_romper_escapes():
+    tarjeta = "\n".join(["a" * 8, "b" * 8, "c" * 8, "d" * 9 + r"\." + "e" * 10])
+    trozos = utils.trocear_mensaje(tarjeta, limite=10)
+    assert all(len(t) <= 10 for t in trozos)
+    assert trozos[:3] == ["a" * 8, "b" * 8, "c" * 8]
+    assert "".join(trozos[3:]) == "d" * 9 + r"\." + "e" * 10
+    assert not any(t.endswith("\\") for t in trozos)
+
+
+def test_429_espera_lo_que_pide_telegram(monkeypatch):
+    esperas, respuestas = [], [_Respuesta(429), _Respuesta(200)]
+    respuestas[0].json = lambda: {"parameters": {"retry_after": 7}}
+    monkeypatch.setattr(utils, "http_post", lambda url, data: respuestas.pop(0))
+    monkeypatch.setattr(utils.time, "sleep", esperas.append)
+    assert utils._enviar_trozo("https://api.telegram.org/botX/sendMessage", "429", "hola", None)
+    assert 7 in esperas and not respuestas
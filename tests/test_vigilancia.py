@@ -0,0 +1,35 @@
+# tests/test_vigilancia.py
+# ────────────────────────────────────────────────────────────────
+"""Modo vigilancia: caché y disyuntor a la escala de cada intervalo."""
+
+import time
+
+import pytest
+
+import run_scrapers
+import salud
+from salud import Salud
+
+
+def test_ttl_y_enfriamiento_segun_el_intervalo(tmp_path, monkeypatch):
+    monkeypatch.setattr(run_scrapers, "SALUD", Salud(str(tmp_path / "salud.sqlite")))
+    monkeypatch.setattr(run_scrapers, "TTL_CACHE", {"lobe": 60})
+    monkeypatch.setattr(run_scrapers, "INTERVALOS", {"aedas": 600, "lobe": 600})
+    run_scrapers._ajustar_a_intervalos(["aedas", "lobe"])
+    assert run_scrapers.TTL_CACHE == {"aedas": 600 * (1 - run_scrapers.JITTER) / 2, "lobe": 60}
+
+    for _ in range(salud.FALLOS_PARA_ABRIR):
+        run_scrapers.SALUD.fallo("aedas")
+    espera = run_scrapers.SALUD.abierto_hasta("aedas") - time.time()
+    assert espera == pytest.approx(salud.ENFRIAMIENTO * 600 / salud.PERIODO, abs=1)
+
+
+def test_disyuntor_abierto_a_escala_diaria_se_acorta(tmp_path):
+    s = Salud(str(tmp_path / "salud.sqlite"))
+    for _ in range(salud.FALLOS_PARA_ABRIR):
+        s.fallo("lobe")
+    assert s.abierto_hasta("lobe") - time.time() == pytest.approx(salud.ENFRIAMIENTO, abs=1)
+    s.fijar_intervalo("lobe", salud.PERIODO / 4)
+    assert s.abierto_hasta("lobe") - time.time() == pytest.approx(salud.ENFRIAMIENTO / 4, abs=1)
+    s.fijar_intervalo("lobe", salud.PERIODO)                  # nunca se alarga
+    assert s.abierto_hasta("lobe") - time.time() == pytest.approx(salud.ENFRIAMIENTO / 4, abs=1)
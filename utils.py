@@ -2,9 +2,35 @@
 # ────────────────────────────────────────────────────────────────
 # Funciones y constantes compartidas por todos los scrapers
 # ────────────────────────────────────────────────────────────────
+import functools
+import hashlib
+import logging
+import multiprocessing
 import os
+import pickle
 import re
+import sys
+import threading
+import time
+import weakref
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Callable, Iterator
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+
 import requests
+import soupsieve
+from bs4 import BeautifulSoup, SoupStrainer, Tag
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import metricas
+from cache_http import CacheHTTP
+from huellas import MemoHuellas
+from localizaciones import municipio, municipios_de
+from salud import Salud
+
+log = logging.getLogger(__name__)
 
 # Cabecera genérica para engañar al servidor y que no bloquee los requests
 HEADERS = {
@@ -25,6 +51,571 @@ LOCALIZACIONES_DESEADAS = [
 PRECIO_MAXIMO        = 270_000         # euros
 HABITACIONES_MINIMAS = 2               # dormitorios mínimos
 
+# Estado persistente entre ejecuciones (caché, histórico…); en CI se
+# conserva con actions/cache
+DIR_ESTADO = os.getenv("SCRAPER_DIR_ESTADO", ".estado")
+
+# ────────────────────────────────────────────────────────────────
+# Cliente HTTP compartido
+# ────────────────────────────────────────────────────────────────
+TIMEOUT_HTTP         = (10, 30)        # (conexión, lectura) en segundos
+REINTENTOS_HTTP      = 3               # reintentos ante errores de red / 5xx
+BACKOFF_HTTP         = 0.5             # 0.5 s, 1 s, 2 s…
+CONEXIONES_POR_HOST  = 8               # conexiones keep-alive por host
+PETICIONES_SIMULTANEAS_POR_HOST = 4    # cortesía: peticiones en vuelo por host
+
+# Cortesía: cubo de tokens por host (peticiones/s sostenidas, ráfaga)
+LIMITAR_TASA    = True
+TASA_POR_HOST   = 3.0
+RAFAGA_POR_HOST = 4
+LIMITES_POR_HOST = {
+    "api.telegram.org": (30.0, 30),
+}
+
+# urllib3 sólo descomprime brotli si el paquete está instalado
+try:
+    import brotli  # noqa: F401
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    try:
+        import brotlicffi  # noqa: F401
+        ACCEPT_ENCODING = "gzip, deflate, br"
+    except ImportError:
+        ACCEPT_ENCODING = "gzip, deflate"
+
+# Caché HTTP en disco: TTL (s) durante el que se sirve sin revalidar
+USAR_CACHE_HTTP        = os.getenv("SCRAPER_SIN_CACHE") != "1"
+MAX_BYTES_CACHE_HTTP   = 50 * 1024 * 1024
+TTL_CACHE_POR_DEFECTO  = 3_600
+TTL_CACHE: dict[str, float] = {
+    # "lobe": 6 * 3_600,          # por fuente; si no, TTL_CACHE_POR_DEFECTO
+}
+CACHE_HTTP = CacheHTTP(os.path.join(DIR_ESTADO, "cache_http.sqlite"), MAX_BYTES_CACHE_HTTP)
+
+# Extracciones reutilizadas si la región de tarjetas no cambia (huellas.py)
+MEMO_HUELLAS = MemoHuellas(os.path.join(DIR_ESTADO, "huellas.sqlite"),
+                           activo=os.getenv("SCRAPER_SIN_HUELLAS") != "1")
+
+# Latencias, disyuntor y último resultado bueno de cada fuente (salud.py)
+SALUD = Salud(os.path.join(DIR_ESTADO, "salud.sqlite"))
+
+_sesiones: "weakref.WeakSet[requests.Session]" = weakref.WeakSet()
+_limites: dict[str, tuple[threading.BoundedSemaphore, "CuboTokens"]] = {}
+_limites_lock = threading.Lock()
+
+
+def _reintentos() -> Retry:
+    # Sólo GET/HEAD: un POST a Telegram nunca se duplica por un reintento
+    return Retry(
+        total=REINTENTOS_HTTP,
+        backoff_factor=BACKOFF_HTTP,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET", "HEAD"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+
+
+def preparar_sesion(sesion: requests.Session) -> requests.Session:
+    """
+    Aplica a 'sesion' la política común: pool keep-alive por host,
+    reintentos con backoff y negociación gzip/brotli.
+
+    Si la sesión ya trae un adaptador propio (p. ej. el CipherSuiteAdapter
+    de cloudscraper) se conserva y sólo se le configuran los reintentos.
+    """
+    for prefijo in ("https://", "http://"):
+        adaptador = sesion.get_adapter(prefijo)
+        if type(adaptador) is HTTPAdapter:
+            sesion.mount(prefijo, HTTPAdapter(
+                pool_connections=16,
+                pool_maxsize=CONEXIONES_POR_HOST,
+                max_retries=_reintentos(),
+            ))
+        else:
+            adaptador.max_retries = _reintentos()
+    sesion.headers.update(HEADERS)
+    sesion.headers["Accept-Encoding"] = ACCEPT_ENCODING
+    _sesiones.add(sesion)
+    return sesion
+
+
+SESION = preparar_sesion(requests.Session())
+
+
+class CuboTokens:
+    """Limitador de tasa: 'tasa' tokens/s con capacidad para 'rafaga'."""
+
+    def __init__(self, tasa: float, rafaga: int):
+        self.tasa   = tasa
+        self.rafaga = rafaga
+        self._tokens = float(rafaga)
+        self._t = time.monotonic()
+        self._lock = threading.Lock()
+
+    def esperar(self) -> None:
+        """Bloquea hasta que haya un token disponible y lo consume."""
+        while True:
+            with self._lock:
+                ahora = time.monotonic()
+                self._tokens = min(self.rafaga, self._tokens + (ahora - self._t) * self.tasa)
+                self._t = ahora
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.tasa
+            time.sleep(espera)
+
+
+def _limites_host(url: str) -> tuple[threading.BoundedSemaphore, CuboTokens]:
+    """Semáforo de concurrencia y cubo de tokens del host de 'url'."""
+    host = urlsplit(url).hostname or ""
+    with _limites_lock:
+        limites = _limites.get(host)
+        if limites is None:
+            tasa, rafaga = LIMITES_POR_HOST.get(host, (TASA_POR_HOST, RAFAGA_POR_HOST))
+            limites = _limites[host] = (
+                threading.BoundedSemaphore(PETICIONES_SIMULTANEAS_POR_HOST),
+                CuboTokens(tasa, rafaga),
+            )
+        return limites
+
+
+def _enviar(metodo, url: str, **kwargs) -> requests.Response:
+    """
+    Petición real a la red respetando los límites de cortesía del host.
+    Mide tiempos, bytes y errores para la fuente en curso (metricas) y
+    anota la latencia de las que salen bien para su timeout (SALUD).
+    """
+    semaforo, cubo = _limites_host(url)
+    with semaforo:
+        if LIMITAR_TASA:
+            cubo.esperar()
+        t0 = time.perf_counter()
+        try:
+            with metricas.peticion():
+                r = metodo(url, **kwargs)
+        except requests.RequestException:
+            metricas.sumar("errores_http")
+            raise
+    if r.status_code < 400:
+        SALUD.anotar_latencia(metricas.FUENTE.get(), time.perf_counter() - t0)
+    metricas.sumar("bytes", len(r.content))
+    if r.status_code >= 400:
+        metricas.sumar("errores_http")
+    return r
+
+
+def http_get(url: str, sesion: requests.Session | None = None,
+             fuente: str | None = None, ttl: float | None = None,
+             **kwargs) -> requests.Response:
+    """
+    GET con la sesión compartida (o 'sesion') y el timeout de la fuente
+    (el común acortado según sus latencias, ver salud.py).
+    Si se indica 'fuente' pasa por la caché HTTP con el TTL de esa fuente
+    (o 'ttl' si se da explícitamente).
+    """
+    kwargs.setdefault("timeout", SALUD.timeout(fuente or metricas.FUENTE.get(), TIMEOUT_HTTP))
+    sesion = sesion or SESION
+
+    def _get(u: str, **kw) -> requests.Response:
+        return _enviar(sesion.get, u, **kw)
+
+    with metricas.fuente(fuente):
+        if fuente and USAR_CACHE_HTTP:
+            if ttl is None:
+                ttl = TTL_CACHE.get(fuente, TTL_CACHE_POR_DEFECTO)
+            r = CACHE_HTTP.get(sesion, url, fuente=fuente, ttl=ttl, enviar=_get, **kwargs)
+            if getattr(r, "from_cache", False):
+                metricas.sumar("cache")
+            return r
+        return _get(url, **kwargs)
+
+
+def http_post(url: str, sesion: requests.Session | None = None, **kwargs) -> requests.Response:
+    """POST con la sesión compartida (o 'sesion') y el timeout común."""
+    kwargs.setdefault("timeout", TIMEOUT_HTTP)
+    return _enviar((sesion or SESION).post, url, **kwargs)
+
+
+def estadisticas_conexiones() -> dict[str, dict[str, int]]:
+    """
+    Devuelve {host: {"peticiones", "abiertas", "reutilizadas"}} sumando
+    los pools de todas las sesiones preparadas con preparar_sesion().
+    """
+    stats: dict[str, dict[str, int]] = {}
+    for sesion in list(_sesiones):
+        for adaptador in set(sesion.adapters.values()):
+            pools = getattr(getattr(adaptador, "poolmanager", None), "pools", None)
+            if pools is None:
+                continue
+            for clave in pools.keys():
+                pool = pools[clave]
+                s = stats.setdefault(pool.host, {"peticiones": 0, "abiertas": 0})
+                s["peticiones"] += pool.num_requests
+                s["abiertas"]   += pool.num_connections
+    for s in stats.values():
+        s["reutilizadas"] = max(0, s["peticiones"] - s["abiertas"])
+    return stats
+
+
+# ────────────────────────────────────────────────────────────────
+# Parseo HTML (modo rápido opcional: lxml + sólo las tarjetas)
+# ────────────────────────────────────────────────────────────────
+PARSEO_RAPIDO = os.getenv("SCRAPER_PARSEO_RAPIDO") == "1"
+
+try:
+    from lxml import etree as _etree
+    PARSER_RAPIDO = "lxml"
+except ImportError:
+    _etree = None
+    PARSER_RAPIDO = "html.parser"
+
+# Lo que cambia entre peticiones sin que cambien las tarjetas: atributos
+# con nonces/tokens y parámetros de seguimiento o de versión en las URLs
+_ATRIBUTO_VOLATIL = re.compile(r"nonce|token|csrf|session|^data-(?:ts|time|timestamp)$", re.I)
+_PARAMETRO_VOLATIL = re.compile(
+    r"(\?|&amp;|&)(?:utm_\w+|_gl|gclid|fbclid|_ga|ver|v|_wpnonce|nonce)=[^&#\"'\s]*", re.I)
+
+
+# Enlaces a la página siguiente de un listado: rel="next" en <link> o <a>,
+# o la clase "next" de los paginadores de WordPress
+SELECTOR_SIGUIENTE = "link[rel~=next][href], a[rel~=next][href], a.next[href]"
+_REGLAS_SIGUIENTE = (("link", {"rel": "next"}), ("a", {"rel": "next"}), ("a", {"class": "next"}))
+
+
+def _xpath_regla(regla: tuple[str, dict]) -> str:
+    """XPath equivalente a una regla (nombre, {atributo: valor}) de FiltroTarjetas."""
+    nombre, requisitos = regla
+    condiciones = []
+    for attr, esperado in requisitos.items():
+        if esperado is True:
+            condiciones.append(f"@{attr}")
+        elif attr in ("class", "rel"):
+            condiciones.append(f"contains(concat(' ', normalize-space(@{attr}), ' '), ' {esperado} ')")
+        else:
+            condiciones.append(f"@{attr}='{esperado}'")
+    return f"//{nombre}" + "".join(f"[{c}]" for c in condiciones)
+
+
+class FiltroTarjetas(SoupStrainer):
+    """
+    SoupStrainer que conserva una etiqueta (con todo su subárbol) si cumple
+    CUALQUIERA de las reglas (nombre, {atributo: valor}). Valor True = el
+    atributo existe; para "class" y "rel" basta con que contenga ese valor.
+    Conserva además los enlaces a la página siguiente (SELECTOR_SIGUIENTE).
+
+    Sirve tanto para bs4 ≥ 4.13 (allow_tag_creation) como para versiones
+    anteriores (search_tag).
+    """
+
+    def __init__(self, *reglas: tuple[str, dict]):
+        super().__init__()
+        self.reglas = reglas + _REGLAS_SIGUIENTE
+        self._xpath = _etree.XPath(" | ".join(map(_xpath_regla, self.reglas))) if _etree else None
+
+    def __reduce__(self):
+        # el XPath compilado no se puede enviar a otro proceso: se recompila allí
+        return type(self), self.reglas[:-len(_REGLAS_SIGUIENTE)]
+
+    def huella(self, html: str) -> tuple[str, frozenset[str]] | None:
+        """
+        Huella de la región de tarjetas de 'html' (lo que conserva este
+        filtro, sin scripts ni atributos/parámetros volátiles) y la de cada
+        elemento de la región. Con lxml no se construye ningún árbol de bs4;
+        sin lxml devuelve None.
+        """
+        if self._xpath is None:
+            return None
+        t0 = time.perf_counter()
+        try:
+            raiz = _etree.HTML(html)
+        except ValueError:                  # declaración de codificación en un str
+            raiz = _etree.HTML(html.encode("utf-8"))
+        total, claves = hashlib.blake2b(digest_size=16), set()
+        if raiz is not None:
+            region = self._xpath(raiz)
+            incluidos = set(region)
+            for el in region:
+                # los anidados ya van dentro de su antecesor
+                if any(a in incluidos for a in el.iterancestors()):
+                    continue
+                _etree.strip_elements(el, "script", "style", "noscript", with_tail=False)
+                for nodo in el.iter(_etree.Element):
+                    for attr in [a for a in nodo.attrib if _ATRIBUTO_VOLATIL.search(a)]:
+                        del nodo.attrib[attr]
+                marcado = _PARAMETRO_VOLATIL.sub(
+                    r"\1", _etree.tostring(el, method="html", encoding="unicode", with_tail=False))
+                total.update(marcado.encode())
+                claves.add(hashlib.blake2b(marcado.encode(), digest_size=8).hexdigest())
+        metricas.sumar("parseo_s", time.perf_counter() - t0)
+        return total.hexdigest(), frozenset(claves)
+
+    def _coincide(self, nombre: str | None, attrs) -> bool:
+        attrs = dict(attrs or {})
+        for nombre_regla, requisitos in self.reglas:
+            if nombre != nombre_regla:
+                continue
+            for attr, esperado in requisitos.items():
+                valor = attrs.get(attr)
+                if valor is None:
+                    break
+                if attr in ("class", "rel") and esperado is not True:
+                    clases = valor.split() if isinstance(valor, str) else valor
+                    if esperado not in clases:
+                        break
+                elif esperado is not True and valor != esperado:
+                    break
+            else:
+                return True
+        return False
+
+    # bs4 ≥ 4.13
+    def allow_tag_creation(self, nsprefix, name, attrs) -> bool:
+        return self._coincide(name, attrs)
+
+    def allow_string_creation(self, string) -> bool:
+        return False
+
+    # bs4 < 4.13
+    def search_tag(self, markup_name=None, markup_attrs={}):
+        return markup_name if self._coincide(markup_name, markup_attrs) else None
+
+
+def parsear_html(html: str, filtro: SoupStrainer | None = None) -> BeautifulSoup:
+    """
+    Construye el árbol de 'html'. Por defecto, árbol completo con
+    html.parser; con SCRAPER_PARSEO_RAPIDO=1 usa lxml (si está instalado)
+    y sólo las etiquetas que admite 'filtro' (las tarjetas del listado).
+    """
+    t0 = time.perf_counter()
+    if not PARSEO_RAPIDO:
+        soup = BeautifulSoup(html, "html.parser")
+    else:
+        soup = BeautifulSoup(html, PARSER_RAPIDO, parse_only=filtro)
+    metricas.sumar("parseo_s", time.perf_counter() - t0)
+    return soup
+
+
+# ────────────────────────────────────────────────────────────────
+# Parseo en otros procesos (opcional)
+# ────────────────────────────────────────────────────────────────
+# Con SCRAPER_PROCESOS_PARSEO=N el parseo y la extracción de las páginas
+# grandes se hacen en un pool de N procesos, los mismos para todas las
+# páginas y fuentes: se envía el HTML en bruto y vuelven Promociones, no
+# árboles. Así el parseo (Python puro, con el GIL) usa todos los núcleos.
+# Las páginas de menos de MIN_BYTES_PROCESO se parsean aquí: enviarlas
+# cuesta más de lo que se gana.
+PROCESOS_PARSEO   = int(os.getenv("SCRAPER_PROCESOS_PARSEO", "0"))
+MIN_BYTES_PROCESO = int(os.getenv("SCRAPER_MIN_BYTES_PROCESO", 32 * 1024))
+
+_pool_parseo: ProcessPoolExecutor | None = None
+_pool_parseo_lock = threading.Lock()
+
+
+def _pool() -> ProcessPoolExecutor | None:
+    global _pool_parseo
+    if PROCESOS_PARSEO <= 0:
+        return None
+    with _pool_parseo_lock:
+        if _pool_parseo is None:
+            # forkserver: no se hereda el estado (hilos, locks, conexiones) de este proceso
+            metodo = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            _pool_parseo = ProcessPoolExecutor(
+                PROCESOS_PARSEO, mp_context=multiprocessing.get_context(metodo))
+        return _pool_parseo
+
+
+def _en_trabajador(rapido: bool, funcion: Callable, html: str, args: tuple) -> tuple:
+    global PARSEO_RAPIDO
+    PARSEO_RAPIDO = rapido
+    t0 = time.perf_counter()
+    resultado = funcion(html, *args)
+    return resultado, time.perf_counter() - t0
+
+
+def parsear_en_proceso(funcion: Callable, html: str, *args):
+    """
+    funcion(html, *args) en el pool de parseo si está activo y 'html' es
+    grande; si no, en este proceso. 'funcion' y 'args' viajan con pickle
+    (funciones de módulo o functools.partial de ellas) y el resultado debe
+    ser compacto: Promociones o filas, nunca árboles de bs4.
+    """
+    global _pool_parseo
+    pool = _pool() if len(html) >= MIN_BYTES_PROCESO else None
+    if pool is None:
+        return funcion(html, *args)
+    try:
+        # sin el HTML cuesta poco; según la versión de Python lo que no se
+        # puede enviar da PicklingError, AttributeError o TypeError
+        pickle.dumps((funcion, args))
+    except (pickle.PicklingError, AttributeError, TypeError) as exc:
+        print(f"⚠️  {funcion!r} no se puede enviar a otro proceso, se parsea aquí → {exc!r}",
+              file=sys.stderr, flush=True)
+        return funcion(html, *args)
+    try:
+        resultado, segundos = pool.submit(_en_trabajador, PARSEO_RAPIDO, funcion, html, args).result()
+    except (BrokenProcessPool, pickle.PicklingError) as exc:
+        print(f"⚠️  Parseo en proceso fallido, se parsea aquí → {exc!r}", file=sys.stderr, flush=True)
+        if isinstance(exc, BrokenProcessPool):
+            with _pool_parseo_lock:
+                _pool_parseo = None         # el siguiente intento arranca otro pool
+        return funcion(html, *args)
+    metricas.sumar("parseo_s", segundos)
+    return resultado
+
+
+# ────────────────────────────────────────────────────────────────
+# Listados paginados
+# ────────────────────────────────────────────────────────────────
+MAX_PAGINAS     = int(os.getenv("SCRAPER_MAX_PAGINAS", "20"))        # por listado
+MAX_PROMOCIONES = int(os.getenv("SCRAPER_MAX_PROMOCIONES", "1000"))  # por fuente
+
+
+def _con_parametro(url: str, parametro: str, valor: int) -> str:
+    partes = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(partes.query, keep_blank_values=True) if k != parametro]
+    return urlunsplit(partes._replace(query=urlencode(query + [(parametro, str(valor))])))
+
+
+def _recorrer_listado(url: str, fuente: str, analizar: Callable[[str, str], tuple],
+                      parametro: str | None, sesion: requests.Session | None,
+                      max_paginas: int) -> Iterator:
+    """
+    Bucle de paginación común. analizar(url, html) devuelve
+    (elementos, nº de tarjetas, claves de las tarjetas, href siguiente, nota).
+    """
+    etiqueta = ETIQUETAS_FUENTE.get(fuente, fuente).upper()
+
+    def _descargar(u: str) -> requests.Response:
+        r = http_get(u, sesion=sesion, fuente=fuente)
+        r.raise_for_status()
+        return r
+
+    visitadas, vistas = {url}, set()
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"{fuente}-paginas") as pool:
+        actual, r = url, _descargar(url)
+        for n in range(1, max_paginas + 1):
+            elementos, num_tarjetas, claves, href, nota = analizar(actual, r.text)
+            log.debug("%s pág. %d → %d tarjetas%s", etiqueta, n, num_tarjetas, nota)
+            if not num_tarjetas or claves <= vistas:
+                return
+            vistas |= claves
+
+            if href:
+                siguiente = urljoin(actual, href)
+            else:
+                siguiente = _con_parametro(url, parametro, n + 1) if parametro else None
+            if n == max_paginas or not siguiente or siguiente in visitadas:
+                siguiente = None
+            futuro = pool.submit(_descargar, siguiente) if siguiente else None
+
+            yield from elementos
+
+            if futuro is None:
+                return
+            try:
+                actual, r = siguiente, futuro.result()
+            except requests.RequestException as exc:
+                if getattr(exc.response, "status_code", None) != 404:
+                    print(f"⚠️  {etiqueta}: paginación interrumpida en {siguiente} → {exc!r}",
+                          file=sys.stderr, flush=True)
+                return
+            visitadas.add(siguiente)
+
+
+def _siguiente(soup: BeautifulSoup) -> str | None:
+    enlace = soup.select_one(SELECTOR_SIGUIENTE)
+    return enlace["href"] if enlace else None
+
+
+def tarjetas_paginadas(url: str, fuente: str, selector: "str | soupsieve.SoupSieve",
+                       filtro: SoupStrainer | None = None, parametro: str | None = None,
+                       sesion: requests.Session | None = None,
+                       max_paginas: int = MAX_PAGINAS) -> Iterator[Tag]:
+    """
+    Recorre un listado y va devolviendo las tarjetas que casan con
+    'selector' (CSS en texto o ya compilado) según se parsea cada página.
+    La página siguiente sale del enlace SELECTOR_SIGUIENTE o, si no lo hay
+    y se da 'parametro', de numerarla en la query (?page=2…). Se descarga
+    mientras se procesa la actual.
+
+    Para en max_paginas, en una URL ya visitada, en una página sin
+    tarjetas nuevas y en un error a partir de la segunda página (un 404
+    es el final normal); el error de la primera página se propaga.
+    """
+    def _analizar(actual: str, html: str) -> tuple:
+        soup = parsear_html(html, filtro)
+        tarjetas = soup.select(selector)
+        return tarjetas, len(tarjetas), {hash(str(t)) for t in tarjetas}, _siguiente(soup), ""
+
+    return _recorrer_listado(url, fuente, _analizar, parametro, sesion, max_paginas)
+
+
+def promociones_paginadas(url: str, fuente: str, selector: "str | soupsieve.SoupSieve",
+                          procesar: Callable[[Tag], "Promocion | None"],
+                          filtro: FiltroTarjetas, version: str, parametro: str | None = None,
+                          sesion: requests.Session | None = None,
+                          max_paginas: int = MAX_PAGINAS) -> Iterator["Promocion"]:
+    """
+    Como tarjetas_paginadas, pero devuelve procesar(tarjeta) de cada una y
+    lo memoriza por página: si la huella de la región de tarjetas (ver
+    FiltroTarjetas.huella) coincide con la de la última vez y 'version'
+    (firma_codigo del extractor) no ha cambiado, se devuelven las mismas
+    promociones sin parsear la página con BeautifulSoup.
+
+    Con el pool de parseo activo (PROCESOS_PARSEO) las páginas grandes se
+    parsean en otro proceso: 'procesar' debe poder enviarse con pickle
+    (p. ej. functools.partial de una función de módulo, no una lambda).
+    """
+    def _analizar(actual: str, html: str) -> tuple:
+        huella = filtro.huella(html) if MEMO_HUELLAS.activo else None
+        clave = f"{fuente} {actual}"
+        if huella:
+            guardado = MEMO_HUELLAS.leer(clave, f"{version}:{huella[0]}")
+            if guardado is not None:
+                metricas.sumar("huellas")
+                filas, num_tarjetas, href = guardado
+                return ([promocion_desde_fila(f) for f in filas], num_tarjetas, huella[1],
+                        href, " (sin cambios)")
+
+        promos, num_tarjetas, claves, href = parsear_en_proceso(
+            _extraer_pagina, html, filtro, selector, procesar)
+        if huella:
+            MEMO_HUELLAS.guardar(clave, f"{version}:{huella[0]}",
+                                 [[fila_promocion(p) for p in promos], num_tarjetas, href])
+        return promos, num_tarjetas, huella[1] if huella else claves, href, ""
+
+    return _recorrer_listado(url, fuente, _analizar, parametro, sesion, max_paginas)
+
+
+def _extraer_pagina(html: str, filtro: FiltroTarjetas, selector: "str | soupsieve.SoupSieve",
+                    procesar: Callable[[Tag], "Promocion | None"]) -> tuple:
+    """
+    Promociones de una página de listado, nº de tarjetas, sus claves y el
+    href siguiente. Las claves son resúmenes estables (no hash()): la
+    página puede haberse parseado en otro proceso (parsear_en_proceso).
+    """
+    soup = parsear_html(html, filtro)
+    tarjetas = soup.select(selector)
+    promos = [p for p in map(procesar, tarjetas) if p]
+    claves = {hashlib.blake2b(str(t).encode(), digest_size=8).digest() for t in tarjetas}
+    return promos, len(tarjetas), claves, _siguiente(soup)
+
+
+@functools.lru_cache(maxsize=None)
+def firma_codigo(*rutas: str) -> str:
+    """
+    Resumen del código fuente de 'rutas' (y de este módulo): cambia en
+    cuanto cambia algo de lo que depende una extracción memorizada.
+    """
+    h = hashlib.blake2b(digest_size=8)
+    for ruta in (__file__, *rutas):
+        with open(ruta, "rb") as f:
+            h.update(f.read())
+    return h.hexdigest()
+
+
 # ────────────────────────────────────────────────────────────────
 # Helpers
 # ────────────────────────────────────────────────────────────────
@@ -39,73 +630,317 @@ def limpiar_y_convertir_a_numero(texto: str | None) -> int | None:
     return int(nums[0].replace(".", "")) if nums else None
 
 
-# ——— util para escapar Markdown ————————————————————————
-# ——— util para escapar Markdown SIN tocar la URL de los enlaces ———
-MD_SPECIALS = r"[_*~`>#+=|{}!]"
+# ────────────────────────────────────────────────────────────────
+# Promociones: registro, filtro y formato
+# ────────────────────────────────────────────────────────────────
+# Estados especiales (None = en venta)
+NUEVO_PROYECTO   = "Nuevo proyecto"
+PROXIMAMENTE     = "Próximamente"
+ULTIMAS_UNIDADES = "Últimas unidades"
+
+# Nombre que ponen los esquemas a las tarjetas que no lo traen: no
+# identifica nada (ni deduplicar.py ni run_scrapers.clave_propia lo usan como tal)
+SIN_NOMBRE = "SIN NOMBRE"
+
+# Nombre de cada fuente en los mensajes y en las trazas (única tabla)
+ETIQUETAS_FUENTE = {
+    "aedas":       "AEDAS",
+    "viacelere":   "Vía Célere",
+    "metrovacesa": "Metrovacesa",
+    "atica":       "Ática",
+    "urbania":     "Urbania",
+    "albaluz":     "Albaluz",
+    "lobe":        "LOBE",
+    "ficsa":       "FICSA",
+}
+
 
-def escapar_markdown(texto: str) -> str:
+class Promocion:
     """
-    • Escapa caracteres especiales en Markdown v2
-    • Mantiene intactas las URL dentro de [texto](url)
+    Promoción tal y como sale del listado, sin filtrar ni formatear.
+
+    'municipio' es el municipio canónico del nomenclátor (localizaciones.py)
+    que corresponde a 'ubicacion'; lo rellena cumple_filtros() si el
+    scraper no lo ha hecho.
+
+    'obsoleta' es el momento del último resultado bueno cuando la fuente
+    ha caído y la promoción viene de ahí (ver salud.py); None si es de hoy.
     """
-    def _escape_segment(seg: str) -> str:
-        return re.sub(MD_SPECIALS, lambda m: f"\\{m.group(0)}", seg)
+    __slots__ = ("fuente", "nombre", "ubicacion", "precio", "dormitorios",
+                 "estado", "url", "municipio", "obsoleta")
 
-    resultado, pos = [], 0
-    # Recorre el texto buscando patrones [label](url)
-    for m in re.finditer(r"\[[^\]]+\]\([^)]+\)", texto):
-        inicio, fin = m.span()
-        # Escapa la parte anterior al link
-        resultado.append(_escape_segment(texto[pos:inicio]))
-        label, url = re.match(r"\[([^\]]+)\]\(([^)]+)\)", m.group(0)).groups()
-        # Escapa SOLO el label
-        resultado.append(f"[{_escape_segment(label)}]({url})")
-        pos = fin
-    # Escapa el resto que queda después del último enlace
-    resultado.append(_escape_segment(texto[pos:]))
-    return "".join(resultado)
-# ——— envío robusto a Telegram ——————————————————————————
-def enviar_mensaje_telegram(texto: str) -> None:
+    def __init__(self, fuente: str, nombre: str, ubicacion: str,
+                 precio: int | None = None, dormitorios: int | None = None,
+                 estado: str | None = None, url: str | None = None,
+                 municipio: str | None = None):
+        self.fuente      = fuente
+        self.nombre      = nombre
+        self.ubicacion   = ubicacion
+        self.precio      = precio
+        self.dormitorios = dormitorios
+        self.estado      = estado
+        self.url         = url
+        self.municipio   = municipio
+        self.obsoleta: float | None = None
+
+    def __repr__(self) -> str:
+        return (f"Promocion({self.fuente!r}, {self.nombre!r}, {self.ubicacion!r}, "
+                f"precio={self.precio!r}, dormitorios={self.dormitorios!r}, "
+                f"estado={self.estado!r}, url={self.url!r})")
+
+
+# Campos que se guardan de una promoción (memo de huellas, respaldo de salud.py)
+CAMPOS_FILA = ("fuente", "nombre", "ubicacion", "precio", "dormitorios", "estado", "url")
+
+
+def fila_promocion(p: Promocion) -> dict:
+    return {c: getattr(p, c) for c in CAMPOS_FILA}
+
+
+def promocion_desde_fila(fila: dict) -> Promocion:
+    return Promocion(**fila)
+
+
+# Municipios canónicos de LOCALIZACIONES_DESEADAS (se resuelve una vez)
+MUNICIPIOS_DESEADOS = municipios_de(LOCALIZACIONES_DESEADAS)
+
+
+def motivo_descarte(p: Promocion, obligatorios: tuple[str, ...] = (),
+                    municipios: frozenset[str] = MUNICIPIOS_DESEADOS,
+                    precio_maximo: int = PRECIO_MAXIMO,
+                    habitaciones_minimas: int = HABITACIONES_MINIMAS) -> str | None:
     """
-    Envía 'texto' al chat definido en las variables de entorno:
-      • TELEGRAM_BOT_TOKEN
-      • TELEGRAM_CHAT_ID
+    Aplica LOCALIZACIONES_DESEADAS, PRECIO_MAXIMO y HABITACIONES_MINIMAS
+    (o los límites de un perfil, ver perfiles.py) y devuelve el filtro que
+    descarta la promoción ("ubicacion", "precio" o "dormitorios"), o None
+    si los cumple todos.
+
+    • La localización se resuelve con el nomenclátor: "Torrent, Valencia"
+      es Torrent, no la capital.
 
-    • Divide el mensaje en bloques ≤ 3 500 chars (margen sobre 4 096).
-    • Escapa caracteres Markdown problemáticos.
-    • Si Telegram devuelve 400, reenvía el bloque como texto plano.
+    • Los proyectos "Nuevo proyecto" / "Próximamente" sólo se filtran por
+      localización.
+    • Un precio o nº de dormitorios desconocido sólo descarta la promoción
+      si el campo está en 'obligatorios' (OBLIGATORIOS de cada scraper);
+      "Últimas unidades" exime de precio.
     """
-    token   = os.getenv("TELEGRAM_BOT_TOKEN")
-    chat_id = os.getenv("TELEGRAM_CHAT_ID")
-    if not token or not chat_id:
-        raise SystemExit("❌ Falta TELEGRAM_BOT_TOKEN o TELEGRAM_CHAT_ID")
+    if p.municipio is None:
+        p.municipio = municipio(p.ubicacion)
+    if p.municipio not in municipios:
+        return "ubicacion"
+    if p.estado in (NUEVO_PROYECTO, PROXIMAMENTE):
+        return None
+
+    if p.precio is None:
+        if "precio" in obligatorios and p.estado != ULTIMAS_UNIDADES:
+            return "precio"
+    elif p.precio > precio_maximo:
+        return "precio"
+
+    if p.dormitorios is None:
+        if "dormitorios" in obligatorios:
+            return "dormitorios"
+    elif p.dormitorios < habitaciones_minimas:
+        return "dormitorios"
+    return None
+
+
+def cumple_filtros(p: Promocion, obligatorios: tuple[str, ...] = ()) -> bool:
+    """True si la promoción pasa todos los filtros (ver motivo_descarte)."""
+    return motivo_descarte(p, obligatorios) is None
+
+
+def formatear_precio(precio: int) -> str:
+    return f"{precio:,}€".replace(",", ".")
+
+
+# ——— MarkdownV2: escape por campo al renderizar ————————————————
+# Telegram exige escapar estos caracteres en todo el texto y ')' y '\'
+# dentro de la URL de un enlace
+_TABLA_MD  = str.maketrans({c: "\\" + c for c in "\\_*[]()~`>#+-=|{}.!"})
+_TABLA_URL = str.maketrans({")": "\\)", "\\": "\\\\"})
+
+
+def md(texto: str) -> str:
+    """Escapa 'texto' como texto literal de MarkdownV2."""
+    return texto.translate(_TABLA_MD)
+
+
+# [texto](url); un escape (\x → x) o una marca de formato (* _ ~ ` ||)
+_ENLACE_MD = re.compile(r"\[((?:\\.|[^\]\\])*)\]\(((?:\\.|[^)\\])*)\)")
+_MARCA_MD  = re.compile(r"\\(.)|[*_~`]|\|\|", re.S)
+
+
+def texto_plano(texto: str) -> str:
+    """
+    Texto de un mensaje MarkdownV2 tal y como se lee: sin escapes ni
+    marcas de formato y con los enlaces como "texto: url".
+    """
+    texto = _ENLACE_MD.sub(lambda m: f"{m[1]}: {m[2]}", texto)
+    return _MARCA_MD.sub(lambda m: m[1] or "", texto)
+
+
+def renderizar(p: Promocion) -> str:
+    """Bloque MarkdownV2 de una promoción, con cada campo ya escapado."""
+    etiqueta = ETIQUETAS_FUENTE.get(p.fuente, p.fuente)
+    if p.estado:
+        etiqueta += f" – {p.estado}"
+
+    lineas = [f"*{md(f'{p.nombre} ({etiqueta})')}*", md(f"📍 {(p.ubicacion or '').title()}")]
+    if p.precio:
+        lineas.append(md(f"💶 Desde: {formatear_precio(p.precio)}"))
+    elif p.estado == ULTIMAS_UNIDADES:
+        lineas.append(md(f"💶 {ULTIMAS_UNIDADES}"))
+    if p.dormitorios:
+        lineas.append(md(f"🛏️ Dorms: {p.dormitorios}"))
+    if p.url:
+        lineas.append(f"🔗 [Ver promoción]({p.url.translate(_TABLA_URL)})")
+    if p.obsoleta:
+        lineas.append(md(f"🕒 Web caída: datos del {time.strftime('%d/%m %H:%M', time.localtime(p.obsoleta))}"))
+    return "\n".join(lineas)
 
-    texto = escapar_markdown(texto)
-    url   = f"https://api.telegram.org/bot{token}/sendMessage"
 
-    while texto:
-        bloque = texto[:3500]                      # margen de seguridad
-        corte  = bloque.rfind("\n")
-        if 0 < corte < 3200:                       # corta en línea completa
-            bloque = bloque[:corte]
-        texto = texto[len(bloque):]
+# ——— envío robusto a Telegram ——————————————————————————
+LIMITE_TROZO_TELEGRAM = 3_500          # margen sobre los 4 096 de Telegram
+REINTENTOS_TELEGRAM   = 4
+TASA_TELEGRAM_CHAT    = 1.0            # mensajes/s a un chat privado
+TASA_TELEGRAM_GRUPO   = 20 / 60        # mensajes/s a un grupo (20 por minuto)
+
+_cubos_chat: dict[str, CuboTokens] = {}
+_cubos_chat_lock = threading.Lock()
+
+
+def _cubo_chat(chat_id: str) -> CuboTokens:
+    """Límite de mensajes por chat (los grupos tienen id negativo)."""
+    with _cubos_chat_lock:
+        cubo = _cubos_chat.get(chat_id)
+        if cubo is None:
+            tasa = TASA_TELEGRAM_GRUPO if str(chat_id).startswith("-") else TASA_TELEGRAM_CHAT
+            cubo = _cubos_chat[chat_id] = CuboTokens(tasa, 3)
+        return cubo
+
+
+def _piezas(texto: str, limite: int):
+    """Tarjetas (separadas por línea en blanco); las que no caben, por líneas."""
+    for bloque in texto.split("\n\n"):
+        if len(bloque) <= limite:
+            yield bloque
+            continue
+        actual, largo = [], 0
+        for linea in bloque.split("\n"):
+            if actual and len(linea) > limite:       # lo acumulado sale antes
+                yield "\n".join(actual)
+                actual, largo = [], 0
+            while len(linea) > limite:               # línea imposible: a cuchillo
+                corte = limite - (linea[limite - 1] == "\\")   # sin partir un escape
+                yield linea[:corte]
+                linea = linea[corte:]
+            if actual and largo + 1 + len(linea) > limite:
+                yield "\n".join(actual)
+                actual, largo = [], 0
+            largo += len(linea) + (1 if actual else 0)
+            actual.append(linea)
+        if actual:
+            yield "\n".join(actual)
+
+
+def trocear_mensaje(texto: str, limite: int = LIMITE_TROZO_TELEGRAM) -> list[str]:
+    """
+    Parte 'texto' en trozos ≤ 'limite' en una sola pasada, cortando
+    siempre entre tarjetas (o entre líneas si una tarjeta no cabe sola).
+    """
+    trozos: list[str] = []
+    actual: list[str] = []
+    largo = 0
+    for pieza in _piezas(texto, limite):
+        extra = len(pieza) + (2 if actual else 0)
+        if actual and largo + extra > limite:
+            trozos.append("\n\n".join(actual))
+            actual, largo, extra = [], 0, len(pieza)
+        actual.append(pieza)
+        largo += extra
+    if actual:
+        trozos.append("\n\n".join(actual))
+    return trozos
+
+
+# Rechazos que no se arreglan reintentando más tarde (petición inválida,
+# chat inexistente, bot expulsado); un 401/404 es el token: se arregla
+# configurándolo y entonces todo lo pendiente debe salir
+_RECHAZOS_TELEGRAM = frozenset({400, 403})
 
-        payload = {
-            "chat_id": chat_id,
-            "text": bloque,
-            "parse_mode": "Markdown",
-            "disable_web_page_preview": True,
-        }
 
+def _enviar_trozo(url: str, chat_id: str, texto: str, parse_mode: str | None) -> bool | None:
+    """
+    Envía un trozo con sus propios reintentos. Respeta el límite del chat
+    y el retry_after de los 429; un 400 (Markdown inválido, no debería
+    ocurrir con renderizar/md) se reintenta como texto plano (texto_plano).
+    Devuelve False si no se pudo enviar y None si Telegram lo rechaza
+    para siempre (_RECHAZOS_TELEGRAM).
+    """
+    payload = {
+        "chat_id": chat_id,
+        "text": texto,
+        "disable_web_page_preview": True,
+    }
+    if parse_mode:
+        payload["parse_mode"] = parse_mode
+    cubo, error = _cubo_chat(chat_id), None
+    for intento in range(REINTENTOS_TELEGRAM + 1):
+        cubo.esperar()
         try:
-            r = requests.post(url, data=payload, timeout=20)
-            r.raise_for_status()
-        except requests.exceptions.HTTPError as http_exc:
-            # 400 Bad Request normalmente por Markdown mal escapado
-            print(f"⚠️  Telegram 400: reenvío bloque sin Markdown → {http_exc}")
-            payload.pop("parse_mode", None)
-            requests.post(url, data=payload, timeout=20).raise_for_status()
-        except Exception as exc:
-            raise SystemExit(f"❌ Error al enviar a Telegram: {exc}")
-
-    print("✅ Mensajes enviados a Telegram", flush=True)
+            with metricas.fuente("telegram"):
+                r = http_post(url, data=payload)
+        except requests.RequestException as exc:
+            error = exc
+        else:
+            if r.ok:
+                return True
+            if r.status_code == 429:
+                try:
+                    espera = r.json()["parameters"]["retry_after"]
+                except (ValueError, KeyError, TypeError):
+                    espera = 1
+                print(f"⚠️  Telegram 429: espero {espera}s", flush=True)
+                time.sleep(espera)
+                continue
+            if r.status_code == 400 and "parse_mode" in payload:
+                # 400 Bad Request normalmente por Markdown mal escapado
+                print(f"⚠️  Telegram 400: reenvío trozo sin Markdown → {r.text[:200]}")
+                if payload.pop("parse_mode") == "MarkdownV2":
+                    payload["text"] = texto_plano(texto)
+                continue
+            error = f"HTTP {r.status_code}: {r.text[:200]}"
+            if r.status_code in _RECHAZOS_TELEGRAM:
+                print(f"❌ Telegram: trozo rechazado → {error}", file=sys.stderr, flush=True)
+                return None
+            if r.status_code < 500:
+                break                                   # no se arregla reintentando ya
+        time.sleep(BACKOFF_HTTP * 2 ** intento)
+
+    print(f"❌ Telegram: trozo no enviado → {error}", file=sys.stderr, flush=True)
+    return False
+
+
+def resolver_chat(destino: str | None) -> str | None:
+    """chat_id de 'destino': tal cual o, si empieza por '$', el de esa variable de entorno."""
+    if destino and destino.startswith("$"):
+        return os.getenv(destino[1:])
+    return destino
+
+
+def enviar_trozo_telegram(destino: str, texto: str,
+                          parse_mode: str | None = "MarkdownV2") -> bool | None:
+    """
+    Envía un trozo ya troceado (≤ LIMITE_TROZO_TELEGRAM) a 'destino' (ver
+    resolver_chat). Sin token o sin chat no detiene nada: devuelve False,
+    como cualquier otro fallo, para que la bandeja lo reintente (bandeja.py);
+    None si Telegram lo rechaza para siempre.
+    """
+    token   = os.getenv("TELEGRAM_BOT_TOKEN")
+    chat_id = resolver_chat(destino)
+    if not token or not chat_id:
+        print(f"❌ Falta TELEGRAM_BOT_TOKEN o el chat de {destino}", file=sys.stderr, flush=True)
+        return False
+    return _enviar_trozo(f"https://api.telegram.org/bot{token}/sendMessage", chat_id, texto, parse_mode)
+